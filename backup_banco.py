@@ -0,0 +1,204 @@
+"""
+Backup online do banco do RASTREIA+
+Sistema de Gerenciamento de Frota - Manutenção do banco de dados
+
+Copia o banco pela API de backup do SQLite com o sistema em uso (CLI,
+servidor de telemetria, importações), em etapas de poucas páginas com uma
+pausa entre elas para não disputar E/S com as gravações. Cada snapshot
+recebe a data no nome (com um contador, se já houver outro no mesmo segundo)
+e os mais antigos além de --manter são removidos.
+
+Uso:
+    python backup_banco.py backups/ [--db frota.db | --particoes DIRETORIO] [--manter 7]
+    python backup_banco.py backups/ --intervalo 3600    # um snapshot por hora, até ser interrompido
+"""
+
+import argparse
+import datetime
+import glob
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import time
+from typing import Callable, List, Optional
+
+# Páginas copiadas por etapa (4 MB com páginas de 4 KB) e pausa entre as etapas, em segundos
+PAGINAS_POR_ETAPA = 1024
+PAUSA_ENTRE_ETAPAS = 0.005
+
+# Snapshots mantidos no diretório de destino
+SNAPSHOTS_MANTIDOS = 7
+
+FORMATO_DATA = "%Y%m%d-%H%M%S"
+
+
+def copiar_banco(origem: str, destino: str, paginas_por_etapa: int = PAGINAS_POR_ETAPA,
+                 pausa: float = PAUSA_ENTRE_ETAPAS,
+                 progresso: Optional[Callable[[int, int], None]] = None) -> int:
+    """Copia o banco `origem` para o arquivo `destino` e retorna o total de páginas
+    
+    Em modo WAL a cópia inteira lê um único snapshot (uma transação de
+    leitura aberta na conexão de origem): as escritas seguem sem bloqueio e
+    não reiniciam a cópia. Com isso os checkpoints não passam do snapshot
+    até o fim da cópia e o arquivo -wal cresce nesse intervalo. Sem WAL, o
+    lock de leitura é liberado entre as etapas e escritas de outras conexões
+    reiniciam a cópia.
+    
+    O arquivo só aparece em `destino` quando a cópia termina (é gravado em
+    <destino>.tmp e renomeado). progresso(copiadas, total) é chamado a cada etapa.
+    """
+    # sqlite3.connect criaria um banco vazio no lugar do que não existe
+    if not os.path.isfile(origem):
+        raise FileNotFoundError(f"banco não encontrado: {origem}")
+    
+    temporario = f"{destino}.tmp"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    
+    paginas = 0
+    fonte = sqlite3.connect(origem, isolation_level=None)
+    try:
+        fonte.execute("PRAGMA busy_timeout = 5000")
+        snapshot = fonte.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if snapshot:
+            fonte.execute("BEGIN")
+            fonte.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        
+        def etapa(status, restantes, total):
+            nonlocal paginas
+            paginas = total
+            if progresso is not None:
+                progresso(total - restantes, total)
+            if restantes and pausa:
+                time.sleep(pausa)
+        
+        alvo = sqlite3.connect(temporario)
+        try:
+            fonte.backup(alvo, pages=paginas_por_etapa, progress=etapa)
+        finally:
+            alvo.close()
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    finally:
+        fonte.close()  # Encerra também a transação de leitura
+    
+    os.replace(temporario, destino)
+    return paginas
+
+
+def listar_snapshots(diretorio: str, prefixo: str) -> List[str]:
+    """Snapshots com o prefixo no diretório, do mais antigo para o mais recente"""
+    padrao = re.compile(rf"{re.escape(prefixo)}-(\d{{8}}-\d{{6}})(?:-(\d+))?(\.db)?$")
+    if not os.path.isdir(diretorio):
+        return []
+    snapshots = []
+    for nome in os.listdir(diretorio):
+        encontrado = padrao.match(nome)
+        if encontrado:
+            instante, contador, _ = encontrado.groups()
+            snapshots.append((instante, int(contador or 1), os.path.join(diretorio, nome)))
+    return [caminho for *_, caminho in sorted(snapshots)]
+
+
+def nome_livre(diretorio: str, prefixo: str, instante: str, extensao: str = "") -> str:
+    """Caminho <prefixo>-<instante>[-N]<extensao> ainda não usado no diretório"""
+    caminho = os.path.join(diretorio, f"{prefixo}-{instante}{extensao}")
+    contador = 2
+    while os.path.exists(caminho) or os.path.exists(f"{caminho}.tmp"):
+        caminho = os.path.join(diretorio, f"{prefixo}-{instante}-{contador}{extensao}")
+        contador += 1
+    return caminho
+
+
+def rotacionar(diretorio: str, prefixo: str, manter: int = SNAPSHOTS_MANTIDOS) -> List[str]:
+    """Remove os snapshots mais antigos além dos `manter` mais recentes e retorna os removidos"""
+    snapshots = listar_snapshots(diretorio, prefixo)
+    removidos = snapshots[:max(0, len(snapshots) - manter)]
+    for caminho in removidos:
+        if os.path.isdir(caminho):
+            shutil.rmtree(caminho)
+        else:
+            os.remove(caminho)
+    return removidos
+
+
+def fazer_snapshot(diretorio: str, db_name: Optional[str] = None, particoes: Optional[str] = None,
+                   manter: int = SNAPSHOTS_MANTIDOS, paginas_por_etapa: int = PAGINAS_POR_ETAPA,
+                   pausa: float = PAUSA_ENTRE_ETAPAS, progresso=None) -> str:
+    """Grava um snapshot do banco (ou de cada partição) no diretório e aplica a retenção
+    
+    O snapshot de um banco único é <nome>-AAAAMMDD-HHMMSS.db. O de uma
+    frota particionada é o diretório particoes-<diretório>-AAAAMMDD-HHMMSS,
+    com uma cópia por partição, cada uma consistente por si (não há um
+    instante único entre as partições). Snapshots no mesmo segundo recebem
+    um contador (-2, -3...). Retorna o caminho do snapshot.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    instante = datetime.datetime.now().strftime(FORMATO_DATA)
+    
+    if particoes is None:
+        prefixo = os.path.splitext(os.path.basename(db_name))[0]
+        caminho = nome_livre(diretorio, prefixo, instante, ".db")
+        copiar_banco(db_name, caminho, paginas_por_etapa, pausa, progresso)
+    else:
+        from frota_particionada import EXTENSAO_PARTICAO
+        
+        if not os.path.isdir(particoes):
+            raise FileNotFoundError(f"diretório de partições não encontrado: {particoes}")
+        # Diretórios de partições diferentes no mesmo destino não se misturam na retenção
+        prefixo = f"particoes-{os.path.basename(os.path.normpath(os.path.abspath(particoes)))}"
+        caminho = nome_livre(diretorio, prefixo, instante)
+        temporario = f"{caminho}.tmp"
+        os.makedirs(temporario)
+        for origem in sorted(glob.glob(os.path.join(particoes, "*" + EXTENSAO_PARTICAO))):
+            copiar_banco(origem, os.path.join(temporario, os.path.basename(origem)),
+                         paginas_por_etapa, pausa, progresso)
+        os.replace(temporario, caminho)
+    
+    rotacionar(diretorio, prefixo, manter)
+    return caminho
+
+
+def imprimir_progresso(copiadas: int, total: int):
+    print(f"\r  {copiadas / total if total else 1:>6.1%} ({copiadas:,}/{total:,} páginas)",
+          end="", file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup online do banco do RASTREIA+")
+    parser.add_argument("destino", help="diretório dos snapshots")
+    parser.add_argument("--db", default="frota.db", help="banco de dados (padrão: frota.db)")
+    parser.add_argument("--particoes", metavar="DIRETORIO",
+                        help="copia a frota particionada por órgão deste diretório no lugar de --db")
+    parser.add_argument("--manter", type=int, default=SNAPSHOTS_MANTIDOS,
+                        help=f"snapshots mantidos (padrão: {SNAPSHOTS_MANTIDOS})")
+    parser.add_argument("--intervalo", type=float,
+                        help="repete o backup a cada INTERVALO segundos (padrão: um único backup)")
+    parser.add_argument("--paginas", type=int, default=PAGINAS_POR_ETAPA, help="páginas copiadas por etapa")
+    parser.add_argument("--pausa", type=float, default=PAUSA_ENTRE_ETAPAS,
+                        help="pausa entre as etapas, em segundos")
+    args = parser.parse_args()
+    
+    try:
+        while True:
+            inicio = time.perf_counter()
+            caminho = fazer_snapshot(args.destino, args.db, args.particoes, args.manter,
+                                     args.paginas, args.pausa, imprimir_progresso)
+            duracao = time.perf_counter() - inicio
+            print(f"\nSnapshot gravado em {caminho} ({duracao:.1f}s)", file=sys.stderr)
+            if args.intervalo is None:
+                break
+            time.sleep(max(0.0, args.intervalo - duracao))
+    except FileNotFoundError as erro:
+        print(f"Erro: {erro}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nBackup interrompido.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
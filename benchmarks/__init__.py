@@ -0,0 +1,5 @@
+"""Benchmarks do RASTREIA+
+
+Cada módulo pode ser executado a partir da raiz do projeto, por exemplo:
+    python -m benchmarks.conexao
+"""
@@ -0,0 +1,92 @@
+"""Benchmark do backup online: latência das escritas sem e com um backup em andamento
+
+Um processo copia o banco com backup_banco.copiar_banco (repetidamente, até o
+fim da medição) enquanto o processo principal atualiza odômetros, cada
+atualização em sua própria transação. Compara as latências com as de uma
+medição sem backup.
+
+Uso:
+    python -m benchmarks.backup [--viaturas 20000] [--leituras 30] [--duracao 10]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from backup_banco import PAGINAS_POR_ETAPA, PAUSA_ENTRE_ETAPAS, copiar_banco
+from dados_ficticios import gerar_frota
+from main import SistemaGerenciamentoFrota
+
+
+def copiar_ate(origem: str, destino: str, fim: float, paginas: int, pausa: float, copias):
+    while time.time() < fim:
+        inicio = time.perf_counter()
+        copiar_banco(origem, destino, paginas, pausa)
+        copias.put(time.perf_counter() - inicio)
+
+
+def medir_escritas(sistema: SistemaGerenciamentoFrota, numeros: list, duracao: float, deslocamento: int) -> dict:
+    """Latências (ms) de atualizar_odometro durante `duracao` segundos"""
+    latencias = []
+    fim = time.perf_counter() + duracao
+    i = 0
+    while time.perf_counter() < fim:
+        inicio = time.perf_counter()
+        sistema.atualizar_odometro(numeros[i % len(numeros)], deslocamento + i, "benchmark")
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        i += 1
+    latencias.sort()
+    return {
+        "escritas": len(latencias),
+        "p50_ms": statistics.median(latencias),
+        "p99_ms": latencias[int(len(latencias) * 0.99) - 1],
+        "max_ms": latencias[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--viaturas", type=int, default=20000)
+    parser.add_argument("--leituras", type=int, default=30, help="leituras por viatura")
+    parser.add_argument("--duracao", type=float, default=10, help="segundos de medição em cada cenário")
+    parser.add_argument("--paginas", type=int, default=PAGINAS_POR_ETAPA)
+    parser.add_argument("--pausa", type=float, default=PAUSA_ENTRE_ETAPAS)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        db_name = os.path.join(diretorio, "frota.db")
+        with SistemaGerenciamentoFrota(db_name) as sistema:
+            gerar_frota(sistema, args.viaturas, args.leituras)
+            numeros = [linha[0] for linha in sistema.listar_viaturas()]
+            tamanho = os.path.getsize(db_name)
+            
+            sem_backup = medir_escritas(sistema, numeros, args.duracao, 10_000_000)
+            
+            copias = multiprocessing.Queue()
+            processo = multiprocessing.Process(target=copiar_ate, args=(
+                db_name, os.path.join(diretorio, "copia.db"), time.time() + args.duracao,
+                args.paginas, args.pausa, copias))
+            processo.start()
+            com_backup = medir_escritas(sistema, numeros, args.duracao, 20_000_000)
+            processo.join()
+    
+    duracoes = []
+    while not copias.empty():
+        duracoes.append(copias.get())
+    
+    print(f"Backup online: banco de {tamanho / 1e6:,.0f} MB, {args.paginas} páginas por etapa, "
+          f"pausa de {args.pausa * 1000:g} ms")
+    if duracoes:
+        print(f"{len(duracoes)} cópias completas durante a medição, {statistics.mean(duracoes):.2f}s cada\n")
+    print(f"{'atualizar_odometro':<20} {'Escritas':>10} {'p50 ms':>10} {'p99 ms':>10} {'Máx ms':>10}")
+    print("-" * 64)
+    for nome, dados in (("sem backup", sem_backup), ("com backup", com_backup)):
+        print(f"{nome:<20} {dados['escritas']:>10,} {dados['p50_ms']:>10.3f} {dados['p99_ms']:>10.3f} "
+              f"{dados['max_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Teste de carga do servidor de telemetria
+
+Inicia o servidor_telemetria.py em um processo separado (um núcleo), com um
+banco temporário, e abre milhares de clientes HTTP concorrentes que enviam
+leituras continuamente por conexões keep-alive. Ao final mostra a vazão
+sustentada e as latências p50/p99 das requisições.
+
+Uso:
+    python -m benchmarks.carga_servidor [--clientes 2000] [--duracao 10] [--leituras-por-requisicao 1]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from main import SistemaGerenciamentoFrota
+from servidor_telemetria import aumentar_limite_arquivos
+
+
+async def cliente(numero: int, host: str, porta: int, fim: float, leituras_por_requisicao: int,
+                  latencias: list, erros: list):
+    """Envia leituras da viatura do cliente até o fim do teste"""
+    num_vtr = f"TL-{numero:05d}"
+    odometro = 0
+    try:
+        reader, writer = await asyncio.open_connection(host, porta)
+    except OSError as erro:
+        erros.append(str(erro))
+        return
+    
+    try:
+        while time.perf_counter() < fim:
+            leituras = []
+            for _ in range(leituras_por_requisicao):
+                odometro += 10
+                leituras.append({"num_vtr": num_vtr, "odometro": odometro})
+            corpo = json.dumps(leituras).encode()
+            requisicao = (f"POST /leituras HTTP/1.1\r\nHost: {host}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(corpo)}\r\n\r\n").encode() + corpo
+            
+            inicio = time.perf_counter()
+            writer.write(requisicao)
+            await writer.drain()
+            
+            status = await reader.readline()
+            tamanho = 0
+            while True:
+                linha = await reader.readline()
+                if linha in (b"\r\n", b""):
+                    break
+                if linha.lower().startswith(b"content-length:"):
+                    tamanho = int(linha.split(b":")[1])
+            await reader.readexactly(tamanho)
+            latencias.append(time.perf_counter() - inicio)
+            
+            if b" 200 " not in status:
+                erros.append(status.decode().strip())
+    except (ConnectionError, asyncio.IncompleteReadError) as erro:
+        erros.append(str(erro))
+    finally:
+        writer.close()
+
+
+async def carga(host: str, porta: int, clientes: int, duracao: float, leituras_por_requisicao: int):
+    latencias, erros = [], []
+    fim = time.perf_counter() + duracao
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(n, host, porta, fim, leituras_por_requisicao, latencias, erros)
+                           for n in range(clientes)))
+    return latencias, erros, time.perf_counter() - inicio
+
+
+async def aguardar_servidor(host: str, porta: int, limite: float = 10.0):
+    prazo = time.perf_counter() + limite
+    while time.perf_counter() < prazo:
+        try:
+            _, writer = await asyncio.open_connection(host, porta)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("servidor não iniciou")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de telemetria")
+    parser.add_argument("--clientes", type=int, default=2000)
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos de carga")
+    parser.add_argument("--leituras-por-requisicao", type=int, default=1)
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args()
+    host = "127.0.0.1"
+    
+    aumentar_limite_arquivos()
+    with tempfile.TemporaryDirectory() as diretorio:
+        db_name = os.path.join(diretorio, "carga.db")
+        with SistemaGerenciamentoFrota(db_name) as sistema:
+            with sistema.transacao():
+                for n in range(args.clientes):
+                    sistema.cadastrar_viatura(f"TL-{n:05d}", "Modelo", 2024, "P. Militar")
+        
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        servidor = subprocess.Popen([sys.executable, os.path.join(raiz, "servidor_telemetria.py"),
+                                     "--host", host, "--porta", str(args.porta), "--db", db_name],
+                                    stdout=subprocess.DEVNULL)
+        try:
+            asyncio.run(aguardar_servidor(host, args.porta))
+            latencias, erros, duracao = asyncio.run(
+                carga(host, args.porta, args.clientes, args.duracao, args.leituras_por_requisicao))
+        finally:
+            servidor.terminate()
+            servidor.wait()
+    
+    latencias.sort()
+    if not latencias:
+        print(f"Nenhuma requisição concluída ({len(erros)} erros)")
+        return
+    p50 = latencias[len(latencias) // 2] * 1000
+    p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000
+    print(f"{args.clientes} clientes, {duracao:.1f}s, {args.leituras_por_requisicao} leitura(s) por requisição")
+    print(f"  Requisições: {len(latencias):,} ({len(latencias) / duracao:,.0f}/s)")
+    print(f"  Leituras:    {len(latencias) * args.leituras_por_requisicao / duracao:,.0f}/s")
+    print(f"  Latência:    p50 {p50:.1f} ms   p99 {p99:.1f} ms")
+    print(f"  Erros:       {len(erros)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark de escritas concorrentes: conexões independentes x escritor em grupo
+
+Várias threads atualizam odômetros ao mesmo tempo. No modo padrão cada thread
+grava pela própria conexão e disputa o lock de escrita do SQLite; no modo
+concorrente as escritas passam pela thread escritora e são confirmadas em grupo.
+
+Uso:
+    python -m benchmarks.concorrencia [--threads 16] [--escritas 300]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from main import SistemaGerenciamentoFrota
+
+
+def executar(db_name: str, threads: int, escritas: int, modo_concorrente: bool) -> dict:
+    """Dispara as threads de escrita e retorna vazão e contagem de erros"""
+    erros = []
+    rejeitadas = []
+    
+    with SistemaGerenciamentoFrota(db_name, modo_concorrente=modo_concorrente,
+                                   pragmas={"busy_timeout": 1000}) as sistema:
+        def trabalhador(numero: int):
+            num_vtr = f"CC-{numero:04d}"
+            base = int(time.time() * 1000) * 10
+            for i in range(escritas):
+                try:
+                    if not sistema.atualizar_odometro(num_vtr, base + i, "concorrência"):
+                        rejeitadas.append(num_vtr)
+                except sqlite3.OperationalError as erro:
+                    erros.append(str(erro))
+        
+        inicio = time.perf_counter()
+        grupo = [threading.Thread(target=trabalhador, args=(n,)) for n in range(threads)]
+        for thread in grupo:
+            thread.start()
+        for thread in grupo:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+        
+        commits = sistema.escritor.commits if sistema.escritor else None
+    
+    total = threads * escritas
+    return {"duracao": duracao, "vazao": total / duracao, "erros": len(erros),
+            "rejeitadas": len(rejeitadas), "commits": commits}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escritas concorrentes no SistemaGerenciamentoFrota")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--escritas", type=int, default=300, help="escritas por thread")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        db_name = os.path.join(diretorio, "concorrencia.db")
+        with SistemaGerenciamentoFrota(db_name) as sistema:
+            for n in range(args.threads):
+                sistema.cadastrar_viatura(f"CC-{n:04d}", "Modelo", 2024, "P. Militar")
+        
+        print(f"{args.threads} threads x {args.escritas} escritas")
+        for nome, modo in (("Conexões independentes", False), ("Escritor em grupo", True)):
+            r = executar(db_name, args.threads, args.escritas, modo)
+            commits = f"   commits {r['commits']:,}" if r["commits"] is not None else ""
+            print(f"  {nome:<24} {r['vazao']:>9,.0f} escritas/s   erros {r['erros']:>5}   "
+                  f"rejeitadas {r['rejeitadas']:>4}{commits}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark de latência por chamada: conexão por chamada x conexão persistente
+
+Compara o padrão antigo (abrir, executar, confirmar e fechar uma conexão a
+cada chamada) com o SistemaGerenciamentoFrota usando conexão de longa duração.
+
+Uso:
+    python -m benchmarks.conexao [--chamadas 2000] [--viaturas 200]
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from main import SistemaGerenciamentoFrota
+
+
+def medir(funcao, chamadas: int) -> list:
+    """Executa a função várias vezes e retorna as latências em microssegundos"""
+    latencias = []
+    for i in range(chamadas):
+        inicio = time.perf_counter()
+        funcao(i)
+        latencias.append((time.perf_counter() - inicio) * 1_000_000)
+    return latencias
+
+
+def resumir(nome: str, latencias: list):
+    """Imprime mediana, p95 e média de uma série de latências"""
+    latencias = sorted(latencias)
+    p95 = latencias[int(len(latencias) * 0.95) - 1]
+    print(f"  {nome:<38} mediana {statistics.median(latencias):>9.1f} µs   "
+          f"p95 {p95:>9.1f} µs   média {statistics.mean(latencias):>9.1f} µs")
+
+
+def leitura_por_chamada(db_name: str):
+    """Reproduz listar_viaturas com uma conexão nova a cada chamada"""
+    def executar(_):
+        conn = sqlite3.connect(db_name)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro
+            FROM viaturas WHERE ativa = 1 ORDER BY num_vtr
+        ''')
+        cursor.fetchall()
+        conn.close()
+    return executar
+
+
+def escrita_por_chamada(db_name: str, viaturas: int):
+    """Reproduz atualizar_odometro com uma conexão nova a cada chamada"""
+    def executar(i):
+        num_vtr = f"BM-{i % viaturas:05d}"
+        conn = sqlite3.connect(db_name)
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, odometro_atual FROM viaturas WHERE num_vtr = ? AND ativa = 1', (num_vtr,))
+        viatura_id, odometro_atual = cursor.fetchone()
+        data_atual = int(time.time())
+        cursor.execute('UPDATE viaturas SET odometro_atual = ? WHERE id = ?', (odometro_atual + 10, viatura_id))
+        cursor.execute('''
+            INSERT INTO registros_odometro (viatura_id, odometro, data_registro, observacoes)
+            VALUES (?, ?, ?, ?)
+        ''', (viatura_id, odometro_atual + 10, data_atual, "benchmark"))
+        conn.commit()
+        conn.close()
+    return executar
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chamadas", type=int, default=2000)
+    parser.add_argument("--viaturas", type=int, default=200)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        db_name = os.path.join(diretorio, "benchmark.db")
+        
+        with SistemaGerenciamentoFrota(db_name) as sistema:
+            for i in range(args.viaturas):
+                sistema.cadastrar_viatura(f"BM-{i:05d}", "Modelo Benchmark", 2022, "P. Militar", 1000)
+        
+        print(f"Latência por chamada ({args.chamadas} chamadas, {args.viaturas} viaturas)")
+        print("\nAntes (conexão por chamada):")
+        resumir("listar_viaturas", medir(leitura_por_chamada(db_name), args.chamadas))
+        resumir("atualizar_odometro", medir(escrita_por_chamada(db_name, args.viaturas), args.chamadas))
+        
+        with SistemaGerenciamentoFrota(db_name) as sistema:
+            print("\nDepois (conexão persistente):")
+            resumir("listar_viaturas", medir(lambda _: sistema.listar_viaturas(), args.chamadas))
+            resumir("atualizar_odometro", medir(
+                lambda i: sistema.atualizar_odometro(f"BM-{i % args.viaturas:05d}", 10_000_000 + i, "benchmark"),
+                args.chamadas))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark do formato das datas: texto (strftime) x inteiro (segundos desde 1970)
+
+Monta a mesma tabela de leituras nos dois formatos e mede as operações que
+mudaram com a migração para epoch: filtro por intervalo usando o índice,
+cálculo de dias restantes por linha (julianday x aritmética inteira),
+ordenação e decodificação das linhas em datetime no Python.
+
+Uso:
+    python -m benchmarks.datas [--linhas 500000] [--repeticoes 5]
+"""
+
+import argparse
+import datetime
+import random
+import sqlite3
+import statistics
+import time
+
+
+def criar_tabelas(linhas: int) -> sqlite3.Connection:
+    """Cria as tabelas leituras_texto e leituras_epoch com as mesmas datas"""
+    conn = sqlite3.connect(":memory:")
+    rng = random.Random(42)
+    agora = int(time.time())
+    epochs = [agora - rng.randint(0, 5 * 365 * 86400) for _ in range(linhas)]
+    
+    conn.execute("CREATE TABLE leituras_texto (id INTEGER PRIMARY KEY, viatura_id INTEGER, data TEXT NOT NULL)")
+    conn.execute("CREATE TABLE leituras_epoch (id INTEGER PRIMARY KEY, viatura_id INTEGER, data INTEGER NOT NULL)")
+    conn.executemany("INSERT INTO leituras_texto (viatura_id, data) VALUES (?, ?)",
+                     ((i % 1000, datetime.datetime.fromtimestamp(e).strftime("%Y-%m-%d %H:%M:%S"))
+                      for i, e in enumerate(epochs)))
+    conn.executemany("INSERT INTO leituras_epoch (viatura_id, data) VALUES (?, ?)",
+                     ((i % 1000, e) for i, e in enumerate(epochs)))
+    conn.execute("CREATE INDEX idx_leituras_texto_data ON leituras_texto (data)")
+    conn.execute("CREATE INDEX idx_leituras_epoch_data ON leituras_epoch (data)")
+    conn.commit()
+    return conn
+
+
+def medir(funcao, repeticoes: int) -> float:
+    """Mediana do tempo de execução em milissegundos"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def casos(conn: sqlite3.Connection) -> list:
+    """Retorna [(descrição, função com texto, função com epoch)]"""
+    agora = datetime.datetime.now().replace(microsecond=0)
+    inicio = agora - datetime.timedelta(days=400)
+    fim = agora - datetime.timedelta(days=365)
+    agora_txt, inicio_txt, fim_txt = (d.strftime("%Y-%m-%d %H:%M:%S") for d in (agora, inicio, fim))
+    agora_ep, inicio_ep, fim_ep = (int(d.timestamp()) for d in (agora, inicio, fim))
+    
+    def consultar(sql, parametros=()):
+        return lambda: conn.execute(sql, parametros).fetchall()
+    
+    return [
+        ("intervalo pelo índice (35 dias)",
+         consultar("SELECT COUNT(*) FROM leituras_texto WHERE data BETWEEN ? AND ?", (inicio_txt, fim_txt)),
+         consultar("SELECT COUNT(*) FROM leituras_epoch WHERE data BETWEEN ? AND ?", (inicio_ep, fim_ep))),
+        ("dias restantes por linha",
+         consultar("SELECT COUNT(*) FROM leituras_texto WHERE julianday(data) - julianday(?) > -30", (agora_txt,)),
+         consultar("SELECT COUNT(*) FROM leituras_epoch WHERE (data - ?) / 86400.0 > -30", (agora_ep,))),
+        ("ordenação sem índice (por viatura e data)",
+         consultar("SELECT MAX(data) FROM (SELECT viatura_id, data FROM leituras_texto ORDER BY viatura_id, data)"),
+         consultar("SELECT MAX(data) FROM (SELECT viatura_id, data FROM leituras_epoch ORDER BY viatura_id, data)")),
+        ("leitura das linhas (fetchall)",
+         consultar("SELECT id, data FROM leituras_texto"),
+         consultar("SELECT id, data FROM leituras_epoch")),
+        ("decodificação para datetime",
+         lambda: [datetime.datetime.strptime(data, "%Y-%m-%d %H:%M:%S")
+                  for _, data in conn.execute("SELECT id, data FROM leituras_texto")],
+         lambda: [datetime.datetime.fromtimestamp(data)
+                  for _, data in conn.execute("SELECT id, data FROM leituras_epoch")]),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=500000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    
+    conn = criar_tabelas(args.linhas)
+    print(f"Datas em texto x inteiro ({args.linhas:,} linhas, mediana de {args.repeticoes} execuções)\n")
+    print(f"{'Operação':<45} {'Texto':>12} {'Epoch':>12} {'Ganho':>8}")
+    print("-" * 80)
+    
+    for descricao, texto, epoch in casos(conn):
+        tempo_texto = medir(texto, args.repeticoes)
+        tempo_epoch = medir(epoch, args.repeticoes)
+        print(f"{descricao:<45} {tempo_texto:>9.2f} ms {tempo_epoch:>9.2f} ms {tempo_texto / tempo_epoch:>7.1f}x")
+    
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark de inicialização a frio: importação, primeira consulta e CLI
+
+Cada medida roda em um interpretador novo, como acontece em cada execução da
+CLI, de scripts em lote e de processos de trabalho. O tempo do interpretador
+vazio (python -c pass) é descontado, e cada etapa é comparada com o orçamento
+em ORCAMENTO_MS; o código de saída é 1 se alguma etapa estourar.
+
+Uso:
+    python -m benchmarks.inicializacao [--execucoes 15] [--viaturas 1000]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Orçamento de inicialização (ms acima do interpretador vazio, mediana)
+ORCAMENTO_MS = {
+    "import main": 30,
+    "primeira consulta (banco atual)": 40,
+    "primeira consulta (banco novo)": 80,
+    "CLI (abrir e sair)": 50,
+}
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cronometrar(argumentos: list, execucoes: int, entrada: str = "", preparar=None, cwd: str = RAIZ) -> float:
+    """Mediana, em ms, do tempo de execução de um processo Python novo"""
+    tempos = []
+    for _ in range(execucoes):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, *argumentos], input=entrada, text=True, cwd=cwd,
+                       stdout=subprocess.DEVNULL, check=True,
+                       env={**os.environ, "PYTHONPATH": RAIZ})
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--execucoes", type=int, default=15)
+    parser.add_argument("--viaturas", type=int, default=1000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        db_atual = os.path.join(diretorio, "frota.db")
+        db_novo = os.path.join(diretorio, "novo.db")
+        subprocess.run([sys.executable, "dados_ficticios.py", "--viaturas", str(args.viaturas), "--db", db_atual],
+                       cwd=RAIZ, stdout=subprocess.DEVNULL, check=True)
+        
+        def remover_db_novo():
+            for sufixo in ("", "-wal", "-shm"):
+                if os.path.exists(db_novo + sufixo):
+                    os.remove(db_novo + sufixo)
+        
+        consulta = "from main import SistemaGerenciamentoFrota; SistemaGerenciamentoFrota({!r}).obter_viatura('X')"
+        base = cronometrar(["-c", "pass"], args.execucoes)
+        medidas = {
+            "import main": cronometrar(["-c", "import main"], args.execucoes),
+            "primeira consulta (banco atual)": cronometrar(["-c", consulta.format(db_atual)], args.execucoes),
+            "primeira consulta (banco novo)": cronometrar(["-c", consulta.format(db_novo)], args.execucoes,
+                                                          preparar=remover_db_novo),
+            "CLI (abrir e sair)": cronometrar([os.path.join(RAIZ, "main.py")], args.execucoes,
+                                              entrada="0\n", cwd=diretorio),
+        }
+    
+    print(f"Inicialização a frio (mediana de {args.execucoes} execuções, "
+          f"descontados {base:.1f} ms do interpretador vazio)\n")
+    print(f"{'Etapa':<35} {'Tempo':>10} {'Orçamento':>10}")
+    print("-" * 60)
+    
+    estourou = False
+    for etapa, tempo in medidas.items():
+        liquido = tempo - base
+        orcamento = ORCAMENTO_MS[etapa]
+        situacao = "ok" if liquido <= orcamento else "ACIMA"
+        estourou |= liquido > orcamento
+        print(f"{etapa:<35} {liquido:>7.1f} ms {orcamento:>7} ms  {situacao}")
+    
+    sys.exit(1 if estourou else 0)
+
+
+if __name__ == "__main__":
+    main()
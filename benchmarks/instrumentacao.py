@@ -0,0 +1,68 @@
+"""Benchmark do custo da instrumentação: desativada x ativada
+
+Mede a latência por chamada de operações curtas (onde o custo relativo da
+instrumentação é maior) com a instrumentação desativada e ativada.
+
+Uso:
+    python -m benchmarks.instrumentacao [--chamadas 5000] [--viaturas 1000]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from dados_ficticios import gerar_frota
+from main import SistemaGerenciamentoFrota
+
+
+def medir(funcao, chamadas: int) -> float:
+    """Mediana da latência por chamada em microssegundos"""
+    latencias = []
+    for i in range(chamadas):
+        inicio = time.perf_counter()
+        funcao(i)
+        latencias.append((time.perf_counter() - inicio) * 1_000_000)
+    return statistics.median(latencias)
+
+
+def operacoes(sistema: SistemaGerenciamentoFrota, numeros: list, deslocamento: int) -> dict:
+    return {
+        "obter_viatura": lambda i: sistema.obter_viatura(numeros[i % len(numeros)]),
+        "obter_historico_viatura": lambda i: sistema.obter_historico_viatura(numeros[i % len(numeros)]),
+        "pagina_viaturas": lambda i: sistema.pagina_viaturas(limite=20),
+        "atualizar_odometro": lambda i: sistema.atualizar_odometro(
+            numeros[i % len(numeros)], deslocamento + i, "benchmark"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chamadas", type=int, default=5000)
+    parser.add_argument("--viaturas", type=int, default=1000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        with SistemaGerenciamentoFrota(os.path.join(diretorio, "benchmark.db")) as sistema:
+            gerar_frota(sistema, args.viaturas)
+            numeros = [linha[0] for linha in sistema.listar_viaturas()]
+            
+            desativada = {nome: medir(funcao, args.chamadas)
+                          for nome, funcao in operacoes(sistema, numeros, 10_000_000).items()}
+            sistema.ativar_instrumentacao()
+            ativada = {nome: medir(funcao, args.chamadas)
+                       for nome, funcao in operacoes(sistema, numeros, 20_000_000).items()}
+            estatisticas = sistema.desativar_instrumentacao()
+    
+    print(f"Latência por chamada, mediana em µs ({args.chamadas} chamadas, {args.viaturas} viaturas)\n")
+    print(f"{'Operação':<28} {'Desativada':>12} {'Ativada':>12} {'Custo':>10}")
+    print("-" * 66)
+    for nome in desativada:
+        custo = ativada[nome] - desativada[nome]
+        print(f"{nome:<28} {desativada[nome]:>12.1f} {ativada[nome]:>12.1f} {custo:>+9.1f}")
+    print(f"\nComandos SQL registrados com a instrumentação ativada: {estatisticas['sql']['comandos']:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark de atualizar_odometro com vários processos gravando nas mesmas viaturas
+
+Compara o caminho anterior (SELECT do odômetro atual, comparação em Python,
+UPDATE e INSERT) com o atual, em que a verificação está no INSERT do
+histórico. Cada processo grava leituras com o relógio monotônico no instante
+da chamada, de modo que leituras concorrentes de uma viatura chegam fora de
+ordem e parte delas é recusada. Ao final, confere que o histórico de cada
+viatura nunca diminui e termina no odômetro atual.
+
+Uso:
+    python -m benchmarks.odometro [--processos 4] [--viaturas 50] [--escritas 2000]
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from main import ResultadoLeitura, SistemaGerenciamentoFrota
+
+
+def atualizar_odometro_anterior(sistema: SistemaGerenciamentoFrota, num_vtr: str, novo_odometro: int,
+                                observacoes: str = "") -> ResultadoLeitura:
+    """Reproduz atualizar_odometro antes da verificação no INSERT (sem chave de idempotência)"""
+    viatura = sistema._viatura_em_cache(num_vtr)
+    if viatura is None or not viatura[1]:
+        return ResultadoLeitura.VIATURA_NAO_ENCONTRADA
+    viatura_id = viatura[0]
+    
+    with sistema.transacao() as cursor:
+        cursor.execute('SELECT odometro_atual, orgao FROM viaturas WHERE id = ? AND ativa = 1', (viatura_id,))
+        resultado = cursor.fetchone()
+        if not resultado:
+            return ResultadoLeitura.VIATURA_NAO_ENCONTRADA
+        odometro_atual, orgao = resultado
+        if novo_odometro < odometro_atual:
+            return ResultadoLeitura.DESATUALIZADA
+        
+        data_atual = int(time.time())
+        cursor.execute('UPDATE viaturas SET odometro_atual = ? WHERE id = ?', (novo_odometro, viatura_id))
+        cursor.execute('''
+            INSERT INTO registros_odometro (viatura_id, odometro, data_registro, observacoes)
+            VALUES (?, ?, ?, ?)
+        ''', (viatura_id, novo_odometro, data_atual, observacoes))
+        sistema._acumular_uso(cursor, [(viatura_id, orgao, data_atual, novo_odometro - odometro_atual)])
+        sistema._recalcular_alertas(cursor, [viatura_id])
+    return ResultadoLeitura.ACEITA
+
+
+def escrever(db_name: str, anterior: bool, viaturas: int, escritas: int, semente: int, resultados):
+    """Grava `escritas` leituras em viaturas sorteadas e devolve contagens e latências (µs)"""
+    rng = random.Random(semente)
+    contagem = {resultado.name: 0 for resultado in ResultadoLeitura}
+    latencias = []
+    with SistemaGerenciamentoFrota(db_name) as sistema:
+        for _ in range(escritas):
+            num_vtr = f"OD-{rng.randrange(viaturas):04d}"
+            inicio = time.perf_counter()
+            odometro = time.monotonic_ns() // 1000
+            if anterior:
+                resultado = atualizar_odometro_anterior(sistema, num_vtr, odometro, "benchmark")
+            else:
+                resultado = sistema.atualizar_odometro(num_vtr, odometro, "benchmark")
+            latencias.append((time.perf_counter() - inicio) * 1_000_000)
+            contagem[resultado.name] += 1
+    resultados.put((contagem, latencias))
+
+
+def conferir_historico(db_name: str) -> int:
+    """Viaturas cujo histórico diminui em algum ponto ou não termina no odômetro atual"""
+    with SistemaGerenciamentoFrota(db_name) as sistema:
+        ultimo, invalidas = {}, set()
+        for viatura_id, odometro in sistema.conexao.execute(
+                'SELECT viatura_id, odometro FROM registros_odometro ORDER BY id'):
+            if odometro < ultimo.get(viatura_id, 0):
+                invalidas.add(viatura_id)
+            ultimo[viatura_id] = odometro
+        for viatura_id, odometro_atual in sistema.conexao.execute('SELECT id, odometro_atual FROM viaturas'):
+            if ultimo.get(viatura_id, 0) != odometro_atual:
+                invalidas.add(viatura_id)
+    return len(invalidas)
+
+
+def executar(db_name: str, anterior: bool, processos: int, viaturas: int, escritas: int) -> dict:
+    resultados = multiprocessing.Queue()
+    grupo = [multiprocessing.Process(target=escrever, args=(db_name, anterior, viaturas, escritas, semente, resultados))
+             for semente in range(processos)]
+    inicio = time.perf_counter()
+    for processo in grupo:
+        processo.start()
+    coletados = [resultados.get() for _ in grupo]
+    for processo in grupo:
+        processo.join()
+    duracao = time.perf_counter() - inicio
+    
+    contagem = {resultado.name: sum(c[resultado.name] for c, _ in coletados) for resultado in ResultadoLeitura}
+    latencias = sorted(latencia for _, valores in coletados for latencia in valores)
+    return {
+        "vazao": len(latencias) / duracao,
+        "p50_us": statistics.median(latencias),
+        "p99_us": latencias[int(len(latencias) * 0.99) - 1],
+        "contagem": contagem,
+        "historicos_invalidos": conferir_historico(db_name),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processos", type=int, default=4)
+    parser.add_argument("--viaturas", type=int, default=50, help="viaturas disputadas pelos processos")
+    parser.add_argument("--escritas", type=int, default=2000, help="escritas por processo")
+    args = parser.parse_args()
+    
+    print(f"{args.processos} processos x {args.escritas} escritas em {args.viaturas} viaturas")
+    print(f"  {'Caminho':<22} {'Escritas/s':>10} {'p50 µs':>9} {'p99 µs':>9} {'Aceitas':>8} "
+          f"{'Antigas':>8} {'Históricos inválidos':>21}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        for nome, anterior in (("SELECT + UPDATE", True), ("INSERT condicional", False)):
+            db_name = os.path.join(diretorio, f"odometro-{int(anterior)}.db")
+            with SistemaGerenciamentoFrota(db_name) as sistema:
+                for numero in range(args.viaturas):
+                    sistema.cadastrar_viatura(f"OD-{numero:04d}", "Modelo", 2020, f"Órgão {numero % 4}", 1)
+                    sistema.registrar_manutencao(f"OD-{numero:04d}", "Troca de Óleo", datetime.datetime.now())
+            
+            r = executar(db_name, anterior, args.processos, args.viaturas, args.escritas)
+            print(f"  {nome:<22} {r['vazao']:>10,.0f} {r['p50_us']:>9.0f} {r['p99_us']:>9.0f} "
+                  f"{r['contagem']['ACEITA']:>8,} {r['contagem']['DESATUALIZADA']:>8,} "
+                  f"{r['historicos_invalidos']:>21}")
+
+
+if __name__ == "__main__":
+    main()
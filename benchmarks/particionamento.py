@@ -0,0 +1,105 @@
+"""Benchmark da frota particionada por órgão: banco único x uma partição por órgão
+
+Um processo por órgão atualiza odômetros das suas viaturas, cada atualização em
+sua própria transação. No banco único todos disputam o mesmo lock de escrita;
+particionado, cada processo grava no arquivo do seu órgão. Também mede as
+leituras da frota inteira, que no modo particionado rodam em paralelo e são
+combinadas em ordem.
+
+Uso:
+    python -m benchmarks.particionamento [--orgaos 4] [--viaturas 500] [--escritas 500]
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from frota_particionada import SistemaParticionado
+from main import SistemaGerenciamentoFrota
+
+
+# synchronous=FULL: cada commit espera o fsync, como em um servidor que não pode perder leituras
+PRAGMAS = {"synchronous": "FULL"}
+
+
+def abrir(destino: str, particionado: bool):
+    """Abre o banco único ou o diretório de partições"""
+    if particionado:
+        return SistemaParticionado(destino, pragmas=PRAGMAS)
+    return SistemaGerenciamentoFrota(destino, pragmas=PRAGMAS)
+
+
+def preparar(destino: str, particionado: bool, orgaos: int, viaturas: int):
+    with abrir(destino, particionado) as sistema:
+        for orgao in range(orgaos):
+            for numero in range(viaturas):
+                sistema.cadastrar_viatura(f"O{orgao}-{numero:05d}", "Modelo", 2020, f"Órgão {orgao}", 1000)
+            for numero in range(0, viaturas, 3):
+                sistema.registrar_manutencao(f"O{orgao}-{numero:05d}", "Troca de Óleo",
+                                             datetime.datetime.now() - datetime.timedelta(days=350))
+
+
+def escrever(destino: str, particionado: bool, orgao: int, viaturas: int, escritas: int):
+    with abrir(destino, particionado) as sistema:
+        for i in range(escritas):
+            sistema.atualizar_odometro(f"O{orgao}-{i % viaturas:05d}", 2000 + i, "benchmark")
+
+
+def medir_escritas(destino: str, particionado: bool, orgaos: int, viaturas: int, escritas: int) -> float:
+    """Escritas por segundo somando todos os processos"""
+    processos = [multiprocessing.Process(target=escrever, args=(destino, particionado, orgao, viaturas, escritas))
+                 for orgao in range(orgaos)]
+    inicio = time.perf_counter()
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join()
+    return orgaos * escritas / (time.perf_counter() - inicio)
+
+
+def medir_leitura(funcao, repeticoes: int = 20) -> float:
+    """Mediana do tempo de execução em milissegundos"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orgaos", type=int, default=4)
+    parser.add_argument("--viaturas", type=int, default=500, help="viaturas por órgão")
+    parser.add_argument("--escritas", type=int, default=500, help="atualizações por processo")
+    args = parser.parse_args()
+    
+    resultados = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        for particionado, destino in ((False, os.path.join(diretorio, "frota.db")),
+                                      (True, os.path.join(diretorio, "particoes"))):
+            preparar(destino, particionado, args.orgaos, args.viaturas)
+            vazao = medir_escritas(destino, particionado, args.orgaos, args.viaturas, args.escritas)
+            with abrir(destino, particionado) as sistema:
+                resultados[particionado] = {
+                    "escritas/s": vazao,
+                    "listar_viaturas (ms)": medir_leitura(sistema.listar_viaturas),
+                    "obter_alertas_manutencao (ms)": medir_leitura(sistema.obter_alertas_manutencao),
+                    "pagina_viaturas (ms)": medir_leitura(lambda: sistema.pagina_viaturas(limite=100)),
+                }
+    
+    print(f"Frota particionada ({args.orgaos} órgãos x {args.viaturas} viaturas, "
+          f"{args.escritas} atualizações por processo)\n")
+    print(f"{'Medida':<32} {'Banco único':>14} {'Particionado':>14} {'Razão':>8}")
+    print("-" * 72)
+    for medida in resultados[False]:
+        unico, particionado = resultados[False][medida], resultados[True][medida]
+        print(f"{medida:<32} {unico:>14.1f} {particionado:>14.1f} {particionado / unico:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
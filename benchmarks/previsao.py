@@ -0,0 +1,51 @@
+"""Benchmark da previsão de vencimentos para a frota inteira
+
+Uso:
+    python -m benchmarks.previsao [--viaturas 100000] [--leituras 24]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import previsao
+from dados_ficticios import gerar_frota
+from main import SistemaGerenciamentoFrota
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da previsão de vencimentos")
+    parser.add_argument("--viaturas", type=int, default=100000)
+    parser.add_argument("--leituras", type=int, default=24)
+    parser.add_argument("--manutencoes", type=int, default=4)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as diretorio:
+        with SistemaGerenciamentoFrota(os.path.join(diretorio, "previsao.db")) as sistema:
+            gerar_frota(sistema, args.viaturas, args.leituras, args.manutencoes)
+            previsor = previsao.PrevisorManutencoes(sistema, janela_dias=365)
+            
+            inicio = time.perf_counter()
+            leituras, pares, agora = previsor._carregar()
+            carga = time.perf_counter() - inicio
+            
+            calcular = previsor._calcular_numpy if previsao.np is not None else previsor._calcular_python
+            inicio = time.perf_counter()
+            resultado = calcular(leituras, pares, agora)
+            calculo = time.perf_counter() - inicio
+            
+            previsor.prever()
+            inicio = time.perf_counter()
+            previsor.prever()
+            em_cache = time.perf_counter() - inicio
+    
+    motor = "NumPy" if previsao.np is not None else "Python puro"
+    print(f"{args.viaturas:,} viaturas, {len(leituras):,} leituras na janela, {len(resultado):,} pares ({motor})")
+    print(f"  Leitura do banco:     {carga * 1000:>8.1f} ms")
+    print(f"  Regressão + projeção: {calculo * 1000:>8.1f} ms")
+    print(f"  Consulta em cache:    {em_cache * 1000:>8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
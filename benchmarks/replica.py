@@ -0,0 +1,122 @@
+"""Benchmark da réplica de leitura: latência das consultas de painel com ingestão concorrente
+
+Um processo grava leituras de odômetro em lotes (atualizar_odometro_lote, a
+uma taxa fixa) enquanto o processo principal repete listar_viaturas,
+obter_alertas_manutencao e listar_tipos_manutencao, lidas do banco e da
+réplica em memória. Também mede as consultas sem escritas e a memória da réplica.
+
+Uso:
+    python -m benchmarks.replica [--viaturas 20000] [--leituras 12] [--taxa 2000] [--duracao 10]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from dados_ficticios import gerar_frota
+from main import SistemaGerenciamentoFrota
+
+CONSULTAS = ("listar_viaturas", "obter_alertas_manutencao", "listar_tipos_manutencao")
+
+# Leituras gravadas por transação pelo processo de ingestão
+LEITURAS_POR_LOTE = 100
+
+
+def ingerir(db_name: str, numeros: list, taxa: int, parar, gravadas):
+    """Grava `taxa` leituras por segundo, em lotes, até `parar` ser sinalizado"""
+    rng = random.Random(7)
+    intervalo = LEITURAS_POR_LOTE / taxa
+    odometro = 10_000_000
+    total = 0
+    with SistemaGerenciamentoFrota(db_name) as sistema:
+        proximo = time.perf_counter()
+        while not parar.is_set():
+            lote = []
+            for _ in range(LEITURAS_POR_LOTE):
+                odometro += 1
+                lote.append((rng.choice(numeros), odometro, "benchmark"))
+            sistema.atualizar_odometro_lote(lote)
+            total += len(lote)
+            proximo += intervalo
+            time.sleep(max(0.0, proximo - time.perf_counter()))
+    gravadas.value = total
+
+
+def medir_consultas(sistema: SistemaGerenciamentoFrota, duracao: float) -> dict:
+    """Latências (ms) de cada consulta, chamadas em rodízio durante `duracao` segundos"""
+    latencias = {nome: [] for nome in CONSULTAS}
+    fim = time.perf_counter() + duracao
+    while time.perf_counter() < fim:
+        for nome in CONSULTAS:
+            inicio = time.perf_counter()
+            getattr(sistema, nome)()
+            latencias[nome].append((time.perf_counter() - inicio) * 1000)
+    
+    resultados = {}
+    for nome, valores in latencias.items():
+        valores.sort()
+        resultados[nome] = {
+            "chamadas": len(valores),
+            "p50_ms": statistics.median(valores),
+            "p99_ms": valores[max(0, int(len(valores) * 0.99) - 1)],
+            "max_ms": valores[-1],
+        }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--viaturas", type=int, default=20000)
+    parser.add_argument("--leituras", type=int, default=12, help="leituras por viatura")
+    parser.add_argument("--taxa", type=int, default=2000, help="leituras gravadas por segundo durante a medição")
+    parser.add_argument("--duracao", type=float, default=10, help="segundos de medição em cada cenário")
+    args = parser.parse_args()
+    
+    resultados = {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        db_name = os.path.join(diretorio, "frota.db")
+        with SistemaGerenciamentoFrota(db_name) as sistema:
+            gerar_frota(sistema, args.viaturas, args.leituras)
+            numeros = [linha[0] for linha in sistema.listar_viaturas()]
+        
+        for replica in (False, True):
+            with SistemaGerenciamentoFrota(db_name, replica_leitura=replica) as sistema:
+                inicio = time.perf_counter()
+                sistema.listar_tipos_manutencao()  # carrega a réplica
+                carga = time.perf_counter() - inicio
+                origem = "réplica" if replica else "banco"
+                resultados[(origem, "sem escritas")] = medir_consultas(sistema, args.duracao)
+                
+                parar, gravadas = multiprocessing.Event(), multiprocessing.Value("q", 0)
+                processo = multiprocessing.Process(target=ingerir, args=(db_name, numeros, args.taxa, parar, gravadas))
+                processo.start()
+                resultados[(origem, "com ingestão")] = medir_consultas(sistema, args.duracao)
+                parar.set()
+                processo.join()
+                
+                if replica:
+                    memoria = sistema.estatisticas_replica()
+    
+    print(f"Réplica de leitura: {args.viaturas:,} viaturas, ingestão de {args.taxa:,} leituras/s "
+          f"({gravadas.value:,} gravadas na última medição)")
+    print(f"Carga inicial da réplica: {carga:.2f}s; {memoria['viaturas']:,} viaturas e {memoria['alertas']:,} alertas "
+          f"em {memoria['total_bytes'] / 1e6:.1f} MB ({memoria['bytes_por_viatura']:.0f} bytes por viatura)")
+    for nome, tamanho in memoria["bytes"].items():
+        print(f"  {nome:<10} {tamanho / 1e6:>8.1f} MB")
+    print(f"  {memoria['sincronizacoes']:,} sincronizações, {memoria['viaturas_recarregadas']:,} viaturas recarregadas\n")
+    
+    print(f"{'Consulta':<28} {'Origem':<9} {'Cenário':<14} {'Chamadas':>9} {'p50 ms':>9} {'p99 ms':>9} {'Máx ms':>9}")
+    print("-" * 94)
+    for nome in CONSULTAS:
+        for (origem, cenario), medicoes in resultados.items():
+            dados = medicoes[nome]
+            print(f"{nome:<28} {origem:<9} {cenario:<14} {dados['chamadas']:>9,} {dados['p50_ms']:>9.3f} "
+                  f"{dados['p99_ms']:>9.3f} {dados['max_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
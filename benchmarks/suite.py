@@ -0,0 +1,188 @@
+"""Suíte de benchmarks dos métodos públicos do SistemaGerenciamentoFrota
+
+Gera frotas sintéticas (dados_ficticios.gerar_frota) em cada tamanho pedido,
+mede cada método público e grava os resultados em JSON para comparação entre
+commits.
+
+Uso:
+    python -m benchmarks.suite [--tamanhos 1000,10000,100000] [--saida resultados.json]
+    python -m benchmarks.suite --tamanhos 1000 --comparar resultados_anteriores.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+
+from dados_ficticios import gerar_frota
+from main import SistemaGerenciamentoFrota
+
+# Métodos que não são operações de negócio e por isso não são medidos
+METODOS_IGNORADOS = {"close", "transacao", "init_database", "submeter",
+                     "ativar_instrumentacao", "desativar_instrumentacao", "estatisticas",
+                     "estatisticas_cache", "invalidar_caches", "estatisticas_replica",
+                     "ativar_vacuum_incremental"}
+
+
+def casos_de_teste():
+    """Retorna {método: (função(sistema, contexto, i), repetições)}"""
+    agora = datetime.datetime.now()
+    return {
+        # Leituras primeiro: as escritas alteram o banco
+        "listar_viaturas": (lambda s, c, i: s.listar_viaturas(), 5),
+        "listar_tipos_manutencao": (lambda s, c, i: s.listar_tipos_manutencao(), 200),
+        "obter_alertas_manutencao": (lambda s, c, i: s.obter_alertas_manutencao(), 10),
+        "obter_alertas_manutencao[60d,1000km]": (lambda s, c, i: s.obter_alertas_manutencao(60, 1000), 5),
+        "obter_historico_viatura": (lambda s, c, i: s.obter_historico_viatura(c["viatura"](i)), 200),
+        "obter_viatura": (lambda s, c, i: s.obter_viatura(c["viatura"](i)), 500),
+        "pagina_viaturas": (lambda s, c, i: s.pagina_viaturas(c["viatura"](i), 100), 200),
+        "iterar_viaturas[primeira página]": (lambda s, c, i: next(s.iterar_viaturas()), 200),
+        "pagina_historico_odometro": (lambda s, c, i: s.pagina_historico_odometro(c["viatura"](i), limite=20), 200),
+        "iterar_historico_odometro": (lambda s, c, i: list(s.iterar_historico_odometro(c["viatura"](i))), 200),
+        "pagina_historico_manutencoes": (lambda s, c, i: s.pagina_historico_manutencoes(c["viatura"](i), limite=20), 200),
+        "iterar_historico_manutencoes": (lambda s, c, i: list(s.iterar_historico_manutencoes(c["viatura"](i))), 200),
+        "proximos_vencimentos": (lambda s, c, i: s.proximos_vencimentos(10), 500),
+        "proximos_vencimentos[órgão]": (lambda s, c, i: s.proximos_vencimentos(1, orgao="P. Militar"), 500),
+        "proximos_vencimentos[até data]": (lambda s, c, i: s.proximos_vencimentos(
+            None, ate=agora - datetime.timedelta(days=365 * 3)), 50),
+        "relatorio_uso": (lambda s, c, i: s.relatorio_uso(), 50),
+        "relatorio_uso[viaturas, mês atual]": (lambda s, c, i: s.relatorio_uso(
+            "mes", por="viatura", inicio=agora, fim=agora), 20),
+        "relatorio_manutencoes": (lambda s, c, i: s.relatorio_manutencoes(), 50),
+        "estado_em[frota, 1 ano atrás]": (lambda s, c, i: s.estado_em(agora - datetime.timedelta(days=365)), 5),
+        "estado_em[viatura]": (lambda s, c, i: s.estado_em(
+            agora - datetime.timedelta(days=i % 1000), c["viatura"](i)), 500),
+        "buscar_por_prefixo": (lambda s, c, i: s.buscar_por_prefixo(c["viatura"](i)[:-2]), 500),
+        "buscar_viaturas[modelo]": (lambda s, c, i: s.buscar_viaturas("hilux"), 200),
+        "buscar_viaturas[observações]": (lambda s, c, i: s.buscar_viaturas("manutencao ger"), 50),
+        "varrer_alertas": (lambda s, c, i: s.varrer_alertas(), 50),
+        "recalcular_alertas": (lambda s, c, i: s.recalcular_alertas(), 3),
+        "recalcular_resumos_uso": (lambda s, c, i: s.recalcular_resumos_uso(), 3),
+        "cadastrar_viatura": (lambda s, c, i: s.cadastrar_viatura(f"BENCH-{i:07d}", "Modelo", 2024, "P. Militar", 100), 200),
+        "atualizar_odometro": (lambda s, c, i: s.atualizar_odometro(c["viatura"](i), 10_000_000 + i, "benchmark"), 500),
+        "atualizar_odometro_lote[1000]": (lambda s, c, i: s.atualizar_odometro_lote(
+            (c["viatura"](i * 1000 + j), 20_000_000 + i * 1000 + j) for j in range(1000)), 20),
+        # Só a primeira repetição grava; as demais medem o reconhecimento dos reenvios
+        "atualizar_odometro_lote[1000, reenvio]": (lambda s, c, i: s.atualizar_odometro_lote(
+            (c["viatura"](j), 30_000_000 + j, "benchmark", None, f"bench:{j}") for j in range(1000)), 20),
+        "registrar_manutencao": (lambda s, c, i: s.registrar_manutencao(
+            c["viatura"](i), c["tipos"][i % len(c["tipos"])], agora, "benchmark"), 200),
+        "registrar_manutencao_lote[500]": (lambda s, c, i: s.registrar_manutencao_lote(
+            (c["viatura"](i * 500 + j), c["tipos"][j % len(c["tipos"])], agora, "campanha") for j in range(500)), 10),
+        "expurgar_chaves_leitura": (lambda s, c, i: s.expurgar_chaves_leitura(0), 1),
+        "compactar_registros_odometro": (lambda s, c, i: s.compactar_registros_odometro(365), 1),
+    }
+
+
+def medir(funcao, repeticoes: int) -> dict:
+    """Executa a função e resume as latências em milissegundos"""
+    tempos = []
+    for i in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(i)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        "repeticoes": repeticoes,
+        "min_ms": round(tempos[0], 4),
+        "mediana_ms": round(statistics.median(tempos), 4),
+        "p95_ms": round(tempos[max(0, int(len(tempos) * 0.95) - 1)], 4),
+        "media_ms": round(statistics.mean(tempos), 4),
+    }
+
+
+def commit_atual() -> str:
+    """Identificador do commit atual (ou 'desconhecido' fora de um repositório git)"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def executar_tamanho(diretorio: str, tamanho: int, args) -> list:
+    """Gera a frota de um tamanho e mede todos os casos"""
+    db_name = os.path.join(diretorio, f"frota_{tamanho}.db")
+    resultados = []
+    
+    with SistemaGerenciamentoFrota(db_name) as sistema:
+        inicio = time.perf_counter()
+        gerar_frota(sistema, tamanho, args.leituras, args.manutencoes, args.semente)
+        print(f"\n{tamanho:,} viaturas (geradas em {time.perf_counter() - inicio:.1f}s)")
+        
+        numeros = [linha[0] for linha in sistema.conexao.execute('SELECT num_vtr FROM viaturas ORDER BY id')]
+        contexto = {
+            "viatura": lambda i: numeros[(i * 7919) % len(numeros)],
+            "tipos": [tipo[0] for tipo in sistema.listar_tipos_manutencao()],
+        }
+        
+        casos = casos_de_teste()
+        publicos = {nome for nome in dir(SistemaGerenciamentoFrota)
+                    if not nome.startswith("_") and callable(getattr(SistemaGerenciamentoFrota, nome))}
+        medidos = {nome.split("[")[0] for nome in casos}
+        for nome in sorted(publicos - medidos - METODOS_IGNORADOS):
+            print(f"  (aviso: método público sem caso de benchmark: {nome})")
+        
+        for nome, (funcao, repeticoes) in casos.items():
+            resumo = medir(lambda i: funcao(sistema, contexto, i), repeticoes)
+            resultados.append({"tamanho": tamanho, "metodo": nome, **resumo})
+            print(f"  {nome:<40} mediana {resumo['mediana_ms']:>10.3f} ms   p95 {resumo['p95_ms']:>10.3f} ms")
+    
+    return resultados
+
+
+def comparar(resultados: list, arquivo_base: str):
+    """Imprime a razão entre as medianas atuais e as de um arquivo anterior"""
+    with open(arquivo_base, encoding="utf-8") as arquivo:
+        base = json.load(arquivo)
+    anteriores = {(r["tamanho"], r["metodo"]): r["mediana_ms"] for r in base["resultados"]}
+    
+    print(f"\nComparação com {arquivo_base} (commit {base.get('commit', '?')})")
+    for r in resultados:
+        anterior = anteriores.get((r["tamanho"], r["metodo"]))
+        if anterior:
+            razao = r["mediana_ms"] / anterior
+            marca = "  <-- regressão" if razao > 1.2 else ""
+            print(f"  {r['tamanho']:>7,} {r['metodo']:<40} {razao:>6.2f}x{marca}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do SistemaGerenciamentoFrota")
+    parser.add_argument("--tamanhos", default="1000,10000,100000", help="quantidades de viaturas")
+    parser.add_argument("--leituras", type=int, default=12, help="leituras de odômetro por viatura")
+    parser.add_argument("--manutencoes", type=int, default=3, help="manutenções por viatura")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", default="resultados_benchmark.json")
+    parser.add_argument("--comparar", help="arquivo JSON de uma execução anterior")
+    args = parser.parse_args()
+    
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for tamanho in (int(t) for t in args.tamanhos.split(",")):
+            resultados.extend(executar_tamanho(diretorio, tamanho, args))
+    
+    relatorio = {
+        "commit": commit_atual(),
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "parametros": {"leituras": args.leituras, "manutencoes": args.manutencoes, "semente": args.semente},
+        "resultados": resultados,
+    }
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados gravados em {args.saida}")
+    
+    if args.comparar:
+        comparar(resultados, args.comparar)
+
+
+if __name__ == "__main__":
+    main()
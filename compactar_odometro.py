@@ -0,0 +1,66 @@
+"""
+Compactação do histórico de odômetro
+Sistema de Gerenciamento de Frota - Manutenção do banco de dados
+
+Mantém as leituras recentes com resolução total e resume as mais antigas
+por dia ou por mês. Também expurga as chaves de idempotência das leituras
+fora da janela de retenção. Pode ser agendado (cron, Agendador de Tarefas) e
+executado com o sistema em uso.
+
+Bancos criados antes do auto_vacuum incremental não diminuem de tamanho: o
+espaço liberado só é reaproveitado por novas gravações. --converter os passa
+para auto_vacuum=INCREMENTAL com um VACUUM completo (uma única vez, com o
+sistema parado) antes de compactar.
+
+Uso:
+    python compactar_odometro.py [--dias 90] [--granularidade dia|mes] [--dias-chaves 7] [--db frota.db]
+    python compactar_odometro.py --converter    # uma vez, em bancos antigos
+"""
+
+import argparse
+import os
+import time
+
+from main import SistemaGerenciamentoFrota, DIAS_RETENCAO_CHAVES_LEITURA, DIAS_RETENCAO_ODOMETRO
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compacta leituras antigas de odômetro")
+    parser.add_argument("--db", default="frota.db", help="banco de dados (padrão: frota.db)")
+    parser.add_argument("--dias", type=int, default=DIAS_RETENCAO_ODOMETRO,
+                        help=f"dias mantidos com resolução total (padrão: {DIAS_RETENCAO_ODOMETRO})")
+    parser.add_argument("--granularidade", choices=["dia", "mes"], default="dia",
+                        help="período de agregação das leituras antigas")
+    parser.add_argument("--dias-chaves", type=int, default=DIAS_RETENCAO_CHAVES_LEITURA,
+                        help=f"dias em que reenvios de leituras são reconhecidos (padrão: {DIAS_RETENCAO_CHAVES_LEITURA})")
+    parser.add_argument("--converter", action="store_true",
+                        help="ativa o auto_vacuum incremental em um banco antigo (VACUUM completo, sistema parado)")
+    args = parser.parse_args()
+    
+    tamanho_antes = os.path.getsize(args.db) if os.path.exists(args.db) else 0
+    
+    with SistemaGerenciamentoFrota(args.db) as sistema:
+        if args.converter:
+            inicio = time.perf_counter()
+            if sistema.ativar_vacuum_incremental():
+                print(f"auto_vacuum incremental ativado ({time.perf_counter() - inicio:.1f}s)")
+            else:
+                print("O banco já estava com auto_vacuum incremental")
+        
+        inicio = time.perf_counter()
+        totais = sistema.compactar_registros_odometro(args.dias, args.granularidade)
+        chaves = sistema.expurgar_chaves_leitura(args.dias_chaves)
+        duracao = time.perf_counter() - inicio
+    
+    tamanho_depois = os.path.getsize(args.db)
+    print(f"{totais['leituras_compactadas']:,} leituras resumidas em {totais['resumos']:,} "
+          f"resumos ({totais['etapas']} etapas, {duracao:.1f}s)")
+    print(f"{chaves:,} chaves de idempotência expurgadas")
+    print(f"Tamanho do banco: {tamanho_antes / 1e6:.1f} MB -> {tamanho_depois / 1e6:.1f} MB")
+    if not totais["vacuum_incremental"] and totais["paginas_livres"]:
+        print(f"Nenhum espaço devolvido ao disco: o banco não tem auto_vacuum incremental e "
+              f"{totais['paginas_livres']:,} páginas livres ficaram no arquivo (rode uma vez com --converter)")
+
+
+if __name__ == "__main__":
+    main()
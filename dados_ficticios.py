@@ -1,21 +1,118 @@
 """
 Script para popular o banco de dados com dados fictícios
 Sistema de Gerenciamento de Frota - Demonstração
+
+Uso:
+    python dados_ficticios.py                      (6 viaturas de demonstração)
+    python dados_ficticios.py --viaturas 10000 --leituras 24 --manutencoes 4 --semente 7 --db frota_grande.db
 """
 
+import argparse
 import random
 import datetime
-import sqlite3
-from main import SistemaGerenciamentoFrota
+import time
+from main import SistemaGerenciamentoFrota, data_para_epoch
+
+# Perfis de uso por órgão: (órgão, sigla, participação na frota, km médios por dia, modelos)
+PERFIS_ORGAOS = [
+    ("P. Militar", "PM", 0.42, 120, ["Chevrolet Tracker", "Hyundai Creta", "Toyota Hilux", "Chevrolet Spin"]),
+    ("P. Militar - ROCAM", "PM", 0.06, 90, ["Honda CB 600", "Yamaha XT 660", "Honda XRE 300"]),
+    ("P. Civil", "PC", 0.18, 60, ["Volkswagen Amarok", "Renault Duster", "Fiat Cronos"]),
+    ("Corpo de Bombeiros", "CBM", 0.14, 40, ["Mercedes Sprinter", "Iveco Daily", "Ford Cargo"]),
+    ("P. Federal", "PF", 0.10, 90, ["Ford Ranger", "Toyota SW4", "Mitsubishi L200"]),
+    ("P. Rodoviária Federal", "PRF", 0.10, 200, ["Chevrolet Trailblazer", "Toyota Corolla Cross"]),
+]
+
+# Viaturas geradas e gravadas por transação na carga em massa
+VIATURAS_POR_TRANSACAO = 5000
 
-def popular_dados_exemplo():
+
+def gerar_frota(sistema: SistemaGerenciamentoFrota, viaturas: int, leituras_por_viatura: int = 12,
+                manutencoes_por_viatura: int = 3, semente: int = 42) -> dict:
+    """Gera uma frota sintética reprodutível e a grava diretamente no banco
+    
+    Cada viatura recebe um perfil de uso do seu órgão, `leituras_por_viatura`
+    leituras crescentes de odômetro desde o cadastro e até
+    `manutencoes_por_viatura` manutenções feitas em momentos dessas leituras.
+    """
+    rng = random.Random(semente)
+    agora = datetime.datetime.now().replace(microsecond=0)
+    pesos = [perfil[2] for perfil in PERFIS_ORGAOS]
+    
+    tipos = sistema.conexao.execute(
+        'SELECT id, intervalo_km, intervalo_dias FROM tipos_manutencao ORDER BY id'
+    ).fetchall()
+    proximo_id = sistema.conexao.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM viaturas').fetchone()[0]
+    totais = {"viaturas": 0, "leituras": 0, "manutencoes": 0}
+    
+    for inicio in range(0, viaturas, VIATURAS_POR_TRANSACAO):
+        linhas_viaturas, linhas_leituras, linhas_manutencoes = [], [], []
+        
+        for viatura_id in range(proximo_id + inicio, proximo_id + min(inicio + VIATURAS_POR_TRANSACAO, viaturas)):
+            orgao, sigla, _, km_por_dia, modelos = rng.choices(PERFIS_ORGAOS, pesos)[0]
+            ano = rng.randint(agora.year - 8, agora.year)
+            dias_em_uso = rng.randint(30, 30 + 365 * (agora.year - ano))
+            cadastro = agora - datetime.timedelta(days=dias_em_uso)
+            
+            # Uso individual varia em torno da média do órgão (distribuição log-normal)
+            km_por_dia *= rng.lognormvariate(0, 0.35)
+            odometro = rng.randint(0, 5000)
+            
+            momentos = sorted(rng.uniform(0, dias_em_uso) for _ in range(leituras_por_viatura))
+            leituras = []
+            anterior = 0.0
+            for dia in momentos:
+                odometro += int(km_por_dia * (dia - anterior) * rng.uniform(0.6, 1.4))
+                anterior = dia
+                data = cadastro + datetime.timedelta(days=dia)
+                leituras.append((odometro, data))
+                linhas_leituras.append((viatura_id, odometro, data_para_epoch(data), "Telemetria"))
+            
+            if leituras:
+                for odometro_manutencao, data in sorted(rng.sample(leituras, min(manutencoes_por_viatura, len(leituras))),
+                                                        key=lambda leitura: leitura[1]):
+                    tipo_id, intervalo_km, intervalo_dias = rng.choice(tipos)
+                    proxima_data = data + datetime.timedelta(days=intervalo_dias)
+                    linhas_manutencoes.append((viatura_id, tipo_id, odometro_manutencao, data_para_epoch(data),
+                                               odometro_manutencao + intervalo_km, data_para_epoch(proxima_data),
+                                               "Manutenção gerada"))
+            
+            linhas_viaturas.append((viatura_id, f"{sigla}-{viatura_id:05d}", rng.choice(modelos), ano,
+                                    orgao, odometro, data_para_epoch(cadastro)))
+        
+        with sistema.transacao() as cursor:
+            cursor.executemany('''
+                INSERT INTO viaturas (id, num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', linhas_viaturas)
+            cursor.executemany('''
+                INSERT INTO registros_odometro (viatura_id, odometro, data_registro, observacoes)
+                VALUES (?, ?, ?, ?)
+            ''', linhas_leituras)
+            cursor.executemany('''
+                INSERT INTO manutencoes (viatura_id, tipo_manutencao_id, odometro_realizada,
+                                         data_realizada, proximo_odometro, proxima_data, observacoes)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', linhas_manutencoes)
+        
+        totais["viaturas"] += len(linhas_viaturas)
+        totais["leituras"] += len(linhas_leituras)
+        totais["manutencoes"] += len(linhas_manutencoes)
+    
+    # A carga em massa não passa pelos métodos do sistema
+    sistema.recalcular_alertas()
+    sistema.recalcular_resumos_uso()
+    return totais
+
+
+def popular_dados_exemplo(db_name: str = "frota.db"):
     """Popula o banco com dados de exemplo"""
     
     print("Populando banco de dados com dados de exemplo...")
     print("=" * 50)
     
     # Inicializar sistema
-    sistema = SistemaGerenciamentoFrota()
+    sistema = SistemaGerenciamentoFrota(db_name)
     
     # Viaturas de exemplo com dados 
     viaturas = [
@@ -57,12 +154,9 @@ def popular_dados_exemplo():
         data_manutencao = datetime.datetime.now() - datetime.timedelta(days=dias_atras)
         
         # Ajustar temporariamente o odômetro para o valor na época da manutenção
-        conn = sqlite3.connect("frota.db")
-        cursor = conn.cursor()
-        cursor.execute("UPDATE viaturas SET odometro_atual = ? WHERE num_vtr = ?", 
-                      (odometro_manutencao, num_vtr.upper()))
-        conn.commit()
-        conn.close()
+        with sistema.transacao() as cursor:
+            cursor.execute("UPDATE viaturas SET odometro_atual = ? WHERE num_vtr = ?", 
+                          (odometro_manutencao, num_vtr.upper()))
         
         # Registrar a manutenção
         sistema.registrar_manutencao(num_vtr, tipo, data_manutencao, 
@@ -94,18 +188,41 @@ def popular_dados_exemplo():
             sistema.atualizar_odometro(num_vtr, incremento, obs)
         
         # Definir odômetro final específico
-        conn = sqlite3.connect("frota.db")
-        cursor = conn.cursor()
-        cursor.execute("UPDATE viaturas SET odometro_atual = ? WHERE num_vtr = ?", 
-                      (odometro_atual, num_vtr.upper()))
-        conn.commit()
-        conn.close()
+        with sistema.transacao() as cursor:
+            cursor.execute("UPDATE viaturas SET odometro_atual = ? WHERE num_vtr = ?", 
+                          (odometro_atual, num_vtr.upper()))
         
         print(f"  {num_vtr}: {odometro_atual:,} km")
     
+    # Os odômetros foram ajustados diretamente no banco
+    sistema.recalcular_alertas()
+    sistema.close()
+    
     print("\n" + "=" * 50)
     print("Dados de exemplo inseridos com sucesso!")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Popula o banco com dados fictícios")
+    parser.add_argument("--db", default="frota.db", help="banco de dados (padrão: frota.db)")
+    parser.add_argument("--viaturas", type=int, help="gera uma frota sintética com N viaturas")
+    parser.add_argument("--leituras", type=int, default=12, help="leituras de odômetro por viatura")
+    parser.add_argument("--manutencoes", type=int, default=3, help="manutenções por viatura")
+    parser.add_argument("--semente", type=int, default=42, help="semente do gerador aleatório")
+    args = parser.parse_args()
+    
+    if args.viaturas is None:
+        popular_dados_exemplo(args.db)
+        return
+    
+    with SistemaGerenciamentoFrota(args.db) as sistema:
+        inicio = time.perf_counter()
+        totais = gerar_frota(sistema, args.viaturas, args.leituras, args.manutencoes, args.semente)
+        duracao = time.perf_counter() - inicio
+    
+    print(f"Frota gerada em {duracao:.1f}s: {totais['viaturas']:,} viaturas, "
+          f"{totais['leituras']:,} leituras, {totais['manutencoes']:,} manutenções")
+
+
 if __name__ == "__main__":
-    popular_dados_exemplo()
+    main()
@@ -0,0 +1,456 @@
+"""RASTREIA+ - Frota particionada por órgão
+
+Cada órgão fica em seu próprio arquivo SQLite (<diretorio>/<órgão>.db), com um
+SistemaGerenciamentoFrota por partição. SistemaParticionado expõe a mesma API:
+as operações de uma viatura vão direto para a partição dela e as operações da
+frota inteira rodam em paralelo em todas as partições, com os resultados
+combinados na mesma ordem do banco único.
+
+Cada partição tem seu próprio arquivo, WAL e lock de escrita: gravações em
+órgãos diferentes nunca esperam umas pelas outras.
+
+    with SistemaParticionado("particoes") as sistema:
+        sistema.cadastrar_viatura("PM-0001", "Hilux", 2023, "Polícia Militar")
+        sistema.obter_alertas_manutencao()
+"""
+
+import glob
+import heapq
+import itertools
+import os
+import re
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Tuple, Optional
+
+from main import (
+    MAX_PARAMETROS_SQL,
+    TAMANHO_BLOCO_LOTE,
+    TAMANHO_PAGINA,
+    TAMANHO_BUSCA,
+    DIAS_RETENCAO_ODOMETRO,
+    LEITURAS_POR_ETAPA_COMPACTACAO,
+    DIAS_RETENCAO_CHAVES_LEITURA,
+    CHAVES_POR_ETAPA_EXPURGO,
+    ResultadoLeitura,
+    SistemaGerenciamentoFrota,
+    data_para_epoch,
+)
+
+EXTENSAO_PARTICAO = ".db"
+
+
+def nome_particao(orgao: str) -> str:
+    """Nome do arquivo da partição de um órgão (sem acentos, espaços ou símbolos)"""
+    texto = unicodedata.normalize("NFKD", orgao).encode("ascii", "ignore").decode().lower()
+    nome = re.sub(r"[^a-z0-9]+", "_", texto).strip("_")
+    if not nome:
+        raise ValueError(f"órgão inválido: {orgao!r}")
+    return nome
+
+
+class SistemaParticionado:
+    """Roteador com a API do SistemaGerenciamentoFrota sobre uma partição por órgão
+    
+    Os ids retornados (ex.: obter_viatura) são locais à partição; num_vtr
+    continua único na frota inteira. transacao(), conexao e submeter() não
+    fazem parte do roteador: cada partição tem as suas.
+    """
+    
+    def __init__(self, diretorio: str, pragmas: Optional[dict] = None, modo_concorrente: bool = False,
+                 instrumentar: bool = False, max_threads: Optional[int] = None, cache_entre_processos: bool = False,
+                 replica_leitura: bool = False):
+        """Abre as partições já existentes no diretório (criado se não existir)
+        
+        As partições de novos órgãos são criadas no primeiro cadastro. As
+        operações da frota inteira usam até `max_threads` threads (o SQLite
+        libera o GIL durante as consultas).
+        """
+        os.makedirs(diretorio, exist_ok=True)
+        self.diretorio = diretorio
+        self._opcoes = {"pragmas": pragmas, "modo_concorrente": modo_concorrente, "instrumentar": instrumentar,
+                        "cache_entre_processos": cache_entre_processos, "replica_leitura": replica_leitura}
+        
+        self._particoes = {}           # nome -> SistemaGerenciamentoFrota
+        self._viaturas = {}            # num_vtr -> nome da partição
+        self._lock = threading.Lock()
+        self._lock_cadastro = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="rastreia-particao")
+        self._descobrir_particoes()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @property
+    def particoes(self) -> dict:
+        """Partições abertas, por nome"""
+        with self._lock:
+            return dict(self._particoes)
+    
+    def _descobrir_particoes(self):
+        """Abre as partições criadas por outros processos desde a última verificação"""
+        for caminho in glob.glob(os.path.join(self.diretorio, "*" + EXTENSAO_PARTICAO)):
+            nome = os.path.basename(caminho)[:-len(EXTENSAO_PARTICAO)]
+            if nome not in self._particoes:
+                self._particao(nome)
+    
+    def _particao(self, nome: str) -> SistemaGerenciamentoFrota:
+        """Partição pelo nome, criada se ainda não existir (a conexão só abre no primeiro uso)"""
+        particao = self._particoes.get(nome)
+        if particao is None:
+            with self._lock:
+                particao = self._particoes.get(nome)
+                if particao is None:
+                    caminho = os.path.join(self.diretorio, nome + EXTENSAO_PARTICAO)
+                    particao = SistemaGerenciamentoFrota(caminho, **self._opcoes)
+                    self._particoes[nome] = particao
+        return particao
+    
+    def _particao_do_orgao(self, orgao: str) -> Optional[SistemaGerenciamentoFrota]:
+        self._descobrir_particoes()
+        return self._particoes.get(nome_particao(orgao))
+    
+    def _em_paralelo(self, funcao, itens: list) -> list:
+        """Aplica a função a cada item no pool de threads, mantendo a ordem"""
+        if len(itens) <= 1:
+            return [funcao(item) for item in itens]
+        return list(self._executor.map(funcao, itens))
+    
+    def _em_todas(self, funcao) -> dict:
+        """Executa funcao(particao) em todas as partições e retorna {nome: resultado}"""
+        self._descobrir_particoes()
+        with self._lock:
+            particoes = list(self._particoes.items())
+        resultados = self._em_paralelo(lambda item: funcao(item[1]), particoes)
+        return {nome: resultado for (nome, _), resultado in zip(particoes, resultados)}
+    
+    def _localizar(self, numeros: Iterable[str]) -> dict:
+        """Partição de cada num_vtr (já em maiúsculas); os não encontrados ficam de fora
+        
+        Viaturas não mudam de partição, então cada número é procurado uma única vez.
+        """
+        numeros = set(numeros)
+        faltantes = [num for num in numeros if num not in self._viaturas]
+        if faltantes:
+            def procurar(particao):
+                encontrados = []
+                for i in range(0, len(faltantes), MAX_PARAMETROS_SQL):
+                    parte = faltantes[i:i + MAX_PARAMETROS_SQL]
+                    cursor = particao.conexao.execute(
+                        f'SELECT num_vtr FROM viaturas WHERE num_vtr IN ({",".join("?" * len(parte))})', parte)
+                    encontrados.extend(linha[0] for linha in cursor)
+                return encontrados
+            
+            for nome, encontrados in self._em_todas(procurar).items():
+                for num_vtr in encontrados:
+                    self._viaturas[num_vtr] = nome
+        
+        return {num: self._viaturas[num] for num in numeros if num in self._viaturas}
+    
+    def _particao_da_viatura(self, num_vtr: str) -> Optional[SistemaGerenciamentoFrota]:
+        nome = self._localizar([num_vtr.upper()]).get(num_vtr.upper())
+        return None if nome is None else self._particoes[nome]
+    
+    def ativar_instrumentacao(self, snapshot: Optional[str] = None, intervalo: Optional[float] = None) -> dict:
+        """Ativa a instrumentação em cada partição
+        
+        Com `snapshot`, cada partição grava o seu arquivo (<raiz>-<partição><extensão>).
+        """
+        raiz, extensao = os.path.splitext(snapshot) if snapshot else (None, None)
+        
+        def ativar(particao):
+            nome = os.path.splitext(os.path.basename(particao.db_name))[0]
+            return particao.ativar_instrumentacao(None if raiz is None else f"{raiz}-{nome}{extensao}", intervalo)
+        
+        return self._em_todas(ativar)
+    
+    def desativar_instrumentacao(self) -> dict:
+        """Remove a instrumentação e retorna as estatísticas finais de cada partição"""
+        return self._em_todas(lambda particao: particao.desativar_instrumentacao())
+    
+    def estatisticas(self, comandos_sql: int = 20) -> dict:
+        """Estatísticas de cada partição, por nome"""
+        return self._em_todas(lambda particao: particao.estatisticas(comandos_sql))
+    
+    def estatisticas_cache(self) -> dict:
+        """Estatísticas dos caches de cada partição, por nome"""
+        return self._em_todas(lambda particao: particao.estatisticas_cache())
+    
+    def estatisticas_replica(self) -> dict:
+        """Estatísticas da réplica de leitura de cada partição, por nome (None se desativada)"""
+        return self._em_todas(lambda particao: particao.estatisticas_replica())
+    
+    def invalidar_caches(self):
+        """Esvazia os caches de todas as partições e o mapa de viaturas por partição"""
+        self._em_todas(lambda particao: particao.invalidar_caches())
+        self._viaturas.clear()
+    
+    def close(self):
+        """Fecha todas as partições e encerra o pool de threads"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for particao in self._particoes.values():
+                particao.close()
+    
+    def init_database(self):
+        """Verifica o esquema de todas as partições"""
+        self._em_todas(lambda particao: particao.init_database())
+    
+    def recalcular_alertas(self):
+        self._em_todas(lambda particao: particao.recalcular_alertas())
+    
+    def varrer_alertas(self) -> int:
+        return sum(self._em_todas(lambda particao: particao.varrer_alertas()).values())
+    
+    def recalcular_resumos_uso(self):
+        self._em_todas(lambda particao: particao.recalcular_resumos_uso())
+    
+    def cadastrar_viatura(self, num_vtr: str, modelo: str, ano: int, orgao: str, odometro_inicial: int = 0) -> bool:
+        """Cadastra a viatura na partição do órgão (criada se for a primeira dele)
+        
+        O número é verificado em todas as partições. A verificação só é
+        atômica dentro deste processo: dois processos cadastrando o mesmo
+        número em órgãos diferentes ao mesmo tempo não são detectados.
+        """
+        num_vtr = num_vtr.upper()
+        with self._lock_cadastro:
+            if self._localizar([num_vtr]):
+                return False
+            # Só depois da verificação: um número repetido não deixa partição vazia para trás
+            particao = self._particao(nome_particao(orgao))
+            if not particao.cadastrar_viatura(num_vtr, modelo, ano, orgao, odometro_inicial):
+                return False
+            self._viaturas[num_vtr] = nome_particao(orgao)
+        return True
+    
+    def atualizar_odometro(self, num_vtr: str, novo_odometro: int, observacoes: str = "",
+                           chave: Optional[str] = None) -> ResultadoLeitura:
+        # As leituras de uma viatura vão sempre para a mesma partição, junto com as suas chaves
+        particao = self._particao_da_viatura(num_vtr)
+        if particao is None:
+            return ResultadoLeitura.VIATURA_NAO_ENCONTRADA
+        return particao.atualizar_odometro(num_vtr, novo_odometro, observacoes, chave)
+    
+    def atualizar_odometro_lote(self, leituras: Iterable, tamanho_bloco: int = TAMANHO_BLOCO_LOTE) -> List[Tuple]:
+        """Separa as leituras por partição e grava as partições em paralelo
+        
+        Mesmo formato de entrada e de relatório do SistemaGerenciamentoFrota;
+        a ordem das leituras de cada viatura é preservada.
+        """
+        def motivo_sem_viatura(leitura):
+            try:
+                int(leitura[1])
+            except (IndexError, TypeError, ValueError):
+                return "odômetro inválido"
+            return "viatura não encontrada"
+        
+        return self._distribuir_lote(leituras, motivo_sem_viatura,
+                                     lambda particao, parte: particao.atualizar_odometro_lote(parte, tamanho_bloco))
+    
+    def _distribuir_lote(self, itens: Iterable, motivo_sem_viatura, gravar) -> List[Tuple]:
+        """Separa os itens (com o num_vtr na primeira posição) por partição e os grava em paralelo
+        
+        gravar(particao, itens) retorna o relatório (indice, num_vtr, aceito, motivo)
+        da partição; os índices são convertidos de volta para a posição original.
+        """
+        itens = list(itens)
+        numeros = [str(item[0]).upper() if item else "" for item in itens]
+        localizadas = self._localizar(numeros)
+        
+        relatorio = []
+        grupos = {}    # nome da partição -> índices dos itens
+        for indice, num_vtr in enumerate(numeros):
+            nome = localizadas.get(num_vtr)
+            if nome is None:
+                relatorio.append((indice, num_vtr, False, motivo_sem_viatura(itens[indice])))
+            else:
+                grupos.setdefault(nome, []).append(indice)
+        
+        def gravar_grupo(grupo):
+            nome, indices = grupo
+            parcial = gravar(self._particoes[nome], [itens[i] for i in indices])
+            return [(indices[i], num_vtr, aceito, motivo) for i, num_vtr, aceito, motivo in parcial]
+        
+        for parcial in self._em_paralelo(gravar_grupo, list(grupos.items())):
+            relatorio.extend(parcial)
+        relatorio.sort(key=itemgetter(0))
+        return relatorio
+    
+    def registrar_manutencao(self, num_vtr: str, tipo_manutencao: str, data_manutencao, observacoes: str = "") -> bool:
+        particao = self._particao_da_viatura(num_vtr)
+        return particao is not None and particao.registrar_manutencao(
+            num_vtr, tipo_manutencao, data_manutencao, observacoes)
+    
+    def registrar_manutencao_lote(self, manutencoes: Iterable, tamanho_bloco: int = TAMANHO_BLOCO_LOTE) -> List[Tuple]:
+        """Separa as manutenções por partição e grava as partições em paralelo"""
+        def motivo_sem_viatura(item):
+            if len(item or ()) < 2 or not isinstance(item[1], str):
+                return "registro inválido"
+            return "viatura não encontrada"
+        
+        return self._distribuir_lote(manutencoes, motivo_sem_viatura,
+                                     lambda particao, parte: particao.registrar_manutencao_lote(parte, tamanho_bloco))
+    
+    def listar_viaturas(self) -> List[Tuple]:
+        """Lista todas as viaturas ativas, em ordem de num_vtr"""
+        listas = self._em_todas(lambda particao: particao.listar_viaturas()).values()
+        return list(heapq.merge(*listas, key=itemgetter(0)))
+    
+    def pagina_viaturas(self, apos: Optional[str] = None, limite: int = TAMANHO_PAGINA,
+                        orgao: Optional[str] = None, ativa: Optional[bool] = True) -> Tuple[List[Tuple], Optional[str]]:
+        """Página de viaturas ordenada por num_vtr (mesmo cursor do banco único)
+        
+        Com `orgao`, consulta só a partição dele; sem, pede uma página a cada
+        partição e combina as primeiras `limite` linhas.
+        """
+        if orgao is not None:
+            particao = self._particao_do_orgao(orgao)
+            if particao is None:
+                return [], None
+            return particao.pagina_viaturas(apos, limite, orgao, ativa)
+        
+        paginas = self._em_todas(lambda particao: particao.pagina_viaturas(apos, limite, None, ativa)[0])
+        linhas = list(itertools.islice(heapq.merge(*paginas.values(), key=itemgetter(0)), limite))
+        return linhas, (linhas[-1][0] if len(linhas) == limite else None)
+    
+    def iterar_viaturas(self, orgao: Optional[str] = None, ativa: Optional[bool] = True,
+                        tamanho_pagina: int = TAMANHO_PAGINA) -> Iterator[Tuple]:
+        return SistemaGerenciamentoFrota._iterar_paginas(self.pagina_viaturas, tamanho_pagina,
+                                                         orgao=orgao, ativa=ativa)
+    
+    def buscar_por_prefixo(self, prefixo: str, limite: int = TAMANHO_BUSCA,
+                           ativa: Optional[bool] = True) -> List[Tuple]:
+        """Viaturas de todas as partições com o prefixo, em ordem de num_vtr"""
+        listas = self._em_todas(lambda particao: particao.buscar_por_prefixo(prefixo, limite, ativa)).values()
+        return list(itertools.islice(heapq.merge(*listas, key=itemgetter(0)), limite))
+    
+    def buscar_viaturas(self, texto: str, limite: int = TAMANHO_BUSCA) -> List[Tuple]:
+        """Busca textual em todas as partições, combinada pela relevância
+        
+        O bm25 de cada partição usa as estatísticas do próprio índice: a
+        ordem entre partições é aproximada.
+        """
+        listas = self._em_todas(lambda particao: particao.buscar_viaturas(texto, limite)).values()
+        return list(itertools.islice(heapq.merge(*listas, key=itemgetter(4)), limite))
+    
+    def obter_alertas_manutencao(self, dias_antecedencia: int = 30, km_antecedencia: int = 500) -> List[Tuple]:
+        """Alertas de todas as partições, ordenados por dias e km restantes"""
+        listas = self._em_todas(
+            lambda particao: particao.obter_alertas_manutencao(dias_antecedencia, km_antecedencia)).values()
+        return list(heapq.merge(*listas, key=itemgetter(7, 6)))
+    
+    def proximos_vencimentos(self, quantidade: Optional[int] = 10, ate=None,
+                             orgao: Optional[str] = None) -> List[Tuple]:
+        """Próximas manutenções a vencer na frota, em ordem de prazo"""
+        if quantidade is None and ate is None:
+            raise ValueError("informe a quantidade ou a data limite")
+        if ate is not None:
+            ate = data_para_epoch(ate)
+        
+        if orgao is not None:
+            particao = self._particao_do_orgao(orgao)
+            return [] if particao is None else particao.proximos_vencimentos(quantidade, ate, orgao)
+        
+        listas = self._em_todas(lambda particao: particao.proximos_vencimentos(quantidade, ate)).values()
+        return list(itertools.islice(heapq.merge(*listas, key=itemgetter(3)), quantidade))
+    
+    def estado_em(self, data, num_vtr: Optional[str] = None, orgao: Optional[str] = None) -> List[Tuple]:
+        """Estado na data de uma viatura, de um órgão ou da frota inteira, em ordem de viatura"""
+        if num_vtr is not None:
+            particao = self._particao_da_viatura(num_vtr)
+            return [] if particao is None else particao.estado_em(data, num_vtr, orgao)
+        if orgao is not None:
+            particao = self._particao_do_orgao(orgao)
+            return [] if particao is None else particao.estado_em(data, None, orgao)
+        
+        # Cada viatura fica em uma única partição: basta intercalar pelo número
+        listas = self._em_todas(lambda particao: particao.estado_em(data)).values()
+        return list(heapq.merge(*listas, key=itemgetter(0)))
+    
+    def obter_viatura(self, num_vtr: str) -> Optional[Tuple]:
+        particao = self._particao_da_viatura(num_vtr)
+        return None if particao is None else particao.obter_viatura(num_vtr)
+    
+    def obter_historico_viatura(self, num_vtr: str) -> dict:
+        particao = self._particao_da_viatura(num_vtr)
+        return {} if particao is None else particao.obter_historico_viatura(num_vtr)
+    
+    def pagina_historico_odometro(self, num_vtr: str, apos: Optional[Tuple] = None,
+                                  limite: int = TAMANHO_PAGINA) -> Tuple[List[Tuple], Optional[Tuple]]:
+        particao = self._particao_da_viatura(num_vtr)
+        return ([], None) if particao is None else particao.pagina_historico_odometro(num_vtr, apos, limite)
+    
+    def iterar_historico_odometro(self, num_vtr: str, tamanho_pagina: int = TAMANHO_PAGINA) -> Iterator[Tuple]:
+        particao = self._particao_da_viatura(num_vtr)
+        return iter(()) if particao is None else particao.iterar_historico_odometro(num_vtr, tamanho_pagina)
+    
+    def pagina_historico_manutencoes(self, num_vtr: str, apos: Optional[Tuple] = None,
+                                     limite: int = TAMANHO_PAGINA) -> Tuple[List[Tuple], Optional[Tuple]]:
+        particao = self._particao_da_viatura(num_vtr)
+        return ([], None) if particao is None else particao.pagina_historico_manutencoes(num_vtr, apos, limite)
+    
+    def iterar_historico_manutencoes(self, num_vtr: str, tamanho_pagina: int = TAMANHO_PAGINA) -> Iterator[Tuple]:
+        particao = self._particao_da_viatura(num_vtr)
+        return iter(()) if particao is None else particao.iterar_historico_manutencoes(num_vtr, tamanho_pagina)
+    
+    def compactar_registros_odometro(self, dias_retencao: int = DIAS_RETENCAO_ODOMETRO,
+                                     granularidade: str = "dia",
+                                     leituras_por_etapa: int = LEITURAS_POR_ETAPA_COMPACTACAO) -> dict:
+        """Compacta todas as partições em paralelo e soma os totais
+        
+        vacuum_incremental só é verdadeiro se todas as partições estiverem em INCREMENTAL.
+        """
+        totais = {"leituras_compactadas": 0, "resumos": 0, "etapas": 0, "paginas_livres": 0}
+        incremental = True
+        for parcial in self._em_todas(lambda particao: particao.compactar_registros_odometro(
+                dias_retencao, granularidade, leituras_por_etapa)).values():
+            for chave in totais:
+                totais[chave] += parcial[chave]
+            incremental = incremental and parcial["vacuum_incremental"]
+        totais["vacuum_incremental"] = incremental
+        return totais
+    
+    def ativar_vacuum_incremental(self) -> bool:
+        """Converte as partições criadas sem auto_vacuum; True se alguma foi convertida"""
+        return any(self._em_todas(lambda particao: particao.ativar_vacuum_incremental()).values())
+    
+    def expurgar_chaves_leitura(self, dias_retencao: int = DIAS_RETENCAO_CHAVES_LEITURA,
+                                chaves_por_etapa: int = CHAVES_POR_ETAPA_EXPURGO) -> int:
+        """Expurga as chaves de idempotência de todas as partições e soma as removidas"""
+        return sum(self._em_todas(lambda particao: particao.expurgar_chaves_leitura(
+            dias_retencao, chaves_por_etapa)).values())
+    
+    def relatorio_uso(self, granularidade: str = "mes", por: str = "orgao", orgao: Optional[str] = None,
+                      inicio=None, fim=None) -> List[Tuple]:
+        """Relatório de uso de todas as partições (ou só a do órgão), em ordem de período"""
+        if orgao is not None:
+            particao = self._particao_do_orgao(orgao)
+            return [] if particao is None else particao.relatorio_uso(granularidade, por, orgao, inicio, fim)
+        
+        listas = self._em_todas(lambda particao: particao.relatorio_uso(granularidade, por, None, inicio, fim))
+        return list(heapq.merge(*listas.values(), key=itemgetter(0, 1)))
+    
+    def relatorio_manutencoes(self, inicio=None, fim=None, orgao: Optional[str] = None) -> List[Tuple]:
+        """Manutenções por trimestre, modelo e tipo, somadas entre as partições"""
+        if orgao is not None:
+            particao = self._particao_do_orgao(orgao)
+            return [] if particao is None else particao.relatorio_manutencoes(inicio, fim, orgao)
+        
+        totais = {}
+        for linhas in self._em_todas(lambda particao: particao.relatorio_manutencoes(inicio, fim)).values():
+            for trimestre, modelo, manutencao, quantidade in linhas:
+                chave = (trimestre, modelo, manutencao)
+                totais[chave] = totais.get(chave, 0) + quantidade
+        return [(*chave, quantidade) for chave, quantidade in sorted(totais.items())]
+    
+    def listar_tipos_manutencao(self) -> List[Tuple]:
+        """Tipos de manutenção (os mesmos em todas as partições)"""
+        particoes = self.particoes
+        if not particoes:
+            return []
+        return particoes[min(particoes)].listar_tipos_manutencao()
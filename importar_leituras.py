@@ -0,0 +1,129 @@
+"""
+Importação em lote de leituras de odômetro (CSV ou JSONL)
+Sistema de Gerenciamento de Frota - Integração com telemetria
+
+Formato CSV (com cabeçalho):
+    num_vtr,odometro,observacoes,data
+    PM-0001,26950,Telemetria,2024-05-01 08:00:00
+
+Formato JSONL (um objeto por linha):
+    {"num_vtr": "PM-0001", "odometro": 26950, "observacoes": "Telemetria"}
+
+Com a coluna/campo "chave" (ou "dispositivo" e "sequencia"), reimportar o
+mesmo arquivo não duplica as leituras já aplicadas.
+
+Uso:
+    python importar_leituras.py leituras.csv [--db frota.db | --particoes DIRETORIO] [--rejeitadas rejeitadas.csv]
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from typing import Iterator, Tuple
+
+from main import SistemaGerenciamentoFrota, TAMANHO_BLOCO_LOTE, chave_de_leitura
+
+# Quantidade de leituras mantidas em memória por chamada a atualizar_odometro_lote
+LEITURAS_POR_ETAPA = 100_000
+
+
+def ler_csv(arquivo) -> Iterator[Tuple]:
+    """Lê as leituras de um arquivo CSV com cabeçalho"""
+    for linha in csv.DictReader(arquivo):
+        yield (linha.get("num_vtr"), linha.get("odometro"), linha.get("observacoes"), linha.get("data"),
+               chave_de_leitura(linha.get("chave"), linha.get("dispositivo"), linha.get("sequencia")))
+
+
+def ler_jsonl(arquivo) -> Iterator[Tuple]:
+    """Lê as leituras de um arquivo JSONL (linhas em branco são ignoradas)"""
+    for linha in arquivo:
+        if not linha.strip():
+            continue
+        try:
+            item = json.loads(linha)
+        except json.JSONDecodeError:
+            item = None
+        if not isinstance(item, dict):
+            yield ()  # Rejeitada como leitura inválida
+            continue
+        yield (item.get("num_vtr"), item.get("odometro"), item.get("observacoes"), item.get("data"),
+               chave_de_leitura(item.get("chave"), item.get("dispositivo"), item.get("sequencia")))
+
+
+def em_etapas(leituras: Iterator[Tuple], tamanho: int) -> Iterator[list]:
+    """Agrupa as leituras em listas de até `tamanho` elementos"""
+    etapa = []
+    for leitura in leituras:
+        etapa.append(leitura)
+        if len(etapa) >= tamanho:
+            yield etapa
+            etapa = []
+    if etapa:
+        yield etapa
+
+
+def importar(sistema: SistemaGerenciamentoFrota, leituras: Iterator[Tuple],
+             tamanho_bloco: int = TAMANHO_BLOCO_LOTE, rejeitadas=None) -> Tuple[int, int]:
+    """Importa as leituras e retorna (aceitas, rejeitadas)"""
+    aceitas = recusadas = deslocamento = 0
+    escritor = csv.writer(rejeitadas) if rejeitadas else None
+    if escritor:
+        escritor.writerow(["linha", "num_vtr", "motivo"])
+    
+    for etapa in em_etapas(leituras, LEITURAS_POR_ETAPA):
+        for indice, num_vtr, aceita, motivo in sistema.atualizar_odometro_lote(etapa, tamanho_bloco):
+            if aceita:
+                aceitas += 1
+            else:
+                recusadas += 1
+                if escritor:
+                    escritor.writerow([deslocamento + indice + 1, num_vtr, motivo])
+        deslocamento += len(etapa)
+    
+    return aceitas, recusadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa leituras de odômetro em lote")
+    parser.add_argument("arquivo", help="arquivo .csv ou .jsonl ('-' para entrada padrão)")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], help="formato do arquivo (padrão: pela extensão)")
+    parser.add_argument("--db", default="frota.db", help="banco de dados (padrão: frota.db)")
+    parser.add_argument("--particoes", metavar="DIRETORIO",
+                        help="usa a frota particionada por órgão deste diretório no lugar de --db")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO_LOTE, help="leituras por transação")
+    parser.add_argument("--rejeitadas", help="grava as leituras rejeitadas neste arquivo CSV")
+    args = parser.parse_args()
+    
+    formato = args.formato or ("jsonl" if args.arquivo.endswith((".jsonl", ".ndjson")) else "csv")
+    leitor = ler_jsonl if formato == "jsonl" else ler_csv
+    
+    arquivo = sys.stdin if args.arquivo == "-" else open(args.arquivo, newline="", encoding="utf-8")
+    rejeitadas = open(args.rejeitadas, "w", newline="", encoding="utf-8") if args.rejeitadas else None
+    
+    try:
+        if args.particoes:
+            from frota_particionada import SistemaParticionado
+            sistema = SistemaParticionado(args.particoes)
+        else:
+            sistema = SistemaGerenciamentoFrota(args.db)
+        with sistema:
+            inicio = time.perf_counter()
+            aceitas, recusadas = importar(sistema, leitor(arquivo), args.bloco, rejeitadas)
+            duracao = time.perf_counter() - inicio
+    finally:
+        if arquivo is not sys.stdin:
+            arquivo.close()
+        if rejeitadas:
+            rejeitadas.close()
+    
+    total = aceitas + recusadas
+    taxa = total / duracao if duracao > 0 else 0
+    print(f"{total:,} leituras processadas em {duracao:.2f}s ({taxa:,.0f} leituras/s)")
+    print(f"  Aceitas:    {aceitas:,}")
+    print(f"  Rejeitadas: {recusadas:,}")
+
+
+if __name__ == "__main__":
+    main()
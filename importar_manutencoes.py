@@ -0,0 +1,120 @@
+"""
+Importação em lote de manutenções (CSV ou JSONL)
+Sistema de Gerenciamento de Frota - Campanhas de manutenção
+
+Formato CSV (com cabeçalho; data e observacoes são opcionais):
+    num_vtr,tipo,data,observacoes
+    PM-0001,Troca de Óleo,2024-05-01,Campanha do 1º Batalhão
+
+Formato JSONL (um objeto por linha):
+    {"num_vtr": "PM-0001", "tipo": "Troca de Óleo", "data": "2024-05-01"}
+
+Uso:
+    python importar_manutencoes.py campanha.csv [--db frota.db | --particoes DIRETORIO] [--rejeitadas rejeitadas.csv]
+    python importar_manutencoes.py --tipo "Troca de Óleo" --data 2024-05-01 viaturas.txt
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from typing import Iterator, Optional, Tuple
+
+from main import SistemaGerenciamentoFrota, TAMANHO_BLOCO_LOTE
+
+
+def ler_csv(arquivo) -> Iterator[Tuple]:
+    """Lê as manutenções de um arquivo CSV com cabeçalho"""
+    for linha in csv.DictReader(arquivo):
+        yield (linha.get("num_vtr"), linha.get("tipo"), linha.get("data"), linha.get("observacoes"))
+
+
+def ler_jsonl(arquivo) -> Iterator[Tuple]:
+    """Lê as manutenções de um arquivo JSONL (linhas em branco são ignoradas)"""
+    for linha in arquivo:
+        if not linha.strip():
+            continue
+        try:
+            item = json.loads(linha)
+        except json.JSONDecodeError:
+            item = None
+        if not isinstance(item, dict):
+            yield ()  # Rejeitada como registro inválido
+            continue
+        yield (item.get("num_vtr"), item.get("tipo"), item.get("data"), item.get("observacoes"))
+
+
+def ler_campanha(arquivo, tipo: str, data: Optional[str], observacoes: Optional[str]) -> Iterator[Tuple]:
+    """Lê uma viatura por linha e aplica a todas o mesmo tipo, data e observações"""
+    for linha in arquivo:
+        num_vtr = linha.strip()
+        if num_vtr:
+            yield (num_vtr, tipo, data, observacoes)
+
+
+def importar(sistema: SistemaGerenciamentoFrota, manutencoes: Iterator[Tuple],
+             tamanho_bloco: int = TAMANHO_BLOCO_LOTE, rejeitadas=None) -> Tuple[int, int]:
+    """Importa as manutenções e retorna (aceitas, rejeitadas)"""
+    aceitas = recusadas = 0
+    escritor = csv.writer(rejeitadas) if rejeitadas else None
+    if escritor:
+        escritor.writerow(["linha", "num_vtr", "motivo"])
+    
+    for indice, num_vtr, aceita, motivo in sistema.registrar_manutencao_lote(manutencoes, tamanho_bloco):
+        if aceita:
+            aceitas += 1
+        else:
+            recusadas += 1
+            if escritor:
+                escritor.writerow([indice + 1, num_vtr, motivo])
+    
+    return aceitas, recusadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa manutenções em lote (campanhas de manutenção)")
+    parser.add_argument("arquivo", help="arquivo .csv, .jsonl ou lista de viaturas ('-' para entrada padrão)")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], help="formato do arquivo (padrão: pela extensão)")
+    parser.add_argument("--tipo", help="campanha: o arquivo tem uma viatura por linha, todas com este tipo")
+    parser.add_argument("--data", help="campanha: data da manutenção (padrão: agora)")
+    parser.add_argument("--observacoes", help="campanha: observações de todas as manutenções")
+    parser.add_argument("--db", default="frota.db", help="banco de dados (padrão: frota.db)")
+    parser.add_argument("--particoes", metavar="DIRETORIO",
+                        help="usa a frota particionada por órgão deste diretório no lugar de --db")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO_LOTE, help="manutenções por transação")
+    parser.add_argument("--rejeitadas", help="grava as manutenções rejeitadas neste arquivo CSV")
+    args = parser.parse_args()
+    
+    arquivo = sys.stdin if args.arquivo == "-" else open(args.arquivo, newline="", encoding="utf-8")
+    rejeitadas = open(args.rejeitadas, "w", newline="", encoding="utf-8") if args.rejeitadas else None
+    
+    if args.tipo:
+        manutencoes = ler_campanha(arquivo, args.tipo, args.data, args.observacoes)
+    else:
+        formato = args.formato or ("jsonl" if args.arquivo.endswith((".jsonl", ".ndjson")) else "csv")
+        manutencoes = (ler_jsonl if formato == "jsonl" else ler_csv)(arquivo)
+    
+    try:
+        if args.particoes:
+            from frota_particionada import SistemaParticionado
+            sistema = SistemaParticionado(args.particoes)
+        else:
+            sistema = SistemaGerenciamentoFrota(args.db)
+        with sistema:
+            inicio = time.perf_counter()
+            aceitas, recusadas = importar(sistema, manutencoes, args.bloco, rejeitadas)
+            duracao = time.perf_counter() - inicio
+    finally:
+        if arquivo is not sys.stdin:
+            arquivo.close()
+        if rejeitadas:
+            rejeitadas.close()
+    
+    print(f"{aceitas + recusadas:,} manutenções processadas em {duracao:.2f}s")
+    print(f"  Aceitas:    {aceitas:,}")
+    print(f"  Rejeitadas: {recusadas:,}")
+
+
+if __name__ == "__main__":
+    main()
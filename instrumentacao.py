@@ -0,0 +1,222 @@
+"""Instrumentação opcional do SistemaGerenciamentoFrota
+
+Registra a latência de cada método público (histograma em escala logarítmica),
+as linhas retornadas, a duração das transações e os comandos SQL executados
+(pelo trace callback do sqlite3). Só existe enquanto estiver ativada:
+
+    sistema.ativar_instrumentacao()
+    sistema.estatisticas()
+
+Desativada, nenhum método é envolvido e nenhum callback é instalado.
+"""
+
+import datetime
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+# Comandos SQL distintos mantidos nas estatísticas (os demais são somados em "outros")
+MAX_COMANDOS_SQL = 200
+
+# Intervalo padrão entre os snapshots JSON, em segundos
+INTERVALO_SNAPSHOT = 60
+
+# Comandos já normalizados, pela forma com os dígitos mascarados (ver registrar_sql)
+MAX_CACHE_NORMALIZACAO = 10000
+
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+_DIGITOS = bytes.maketrans(b"0123456789", b"##########")
+
+
+def normalizar_sql(sql: str) -> str:
+    """Troca literais por ? e agrupa listas IN, para somar execuções do mesmo comando"""
+    sql = _LITERAIS.sub("?", " ".join(sql.split()))
+    return _LISTAS.sub("(?, ...)", sql)
+
+
+def contar_linhas(resultado) -> Optional[int]:
+    """Linhas retornadas por um método do sistema (None se não se aplica)"""
+    if isinstance(resultado, list):
+        return len(resultado)
+    if isinstance(resultado, tuple) and len(resultado) == 2 and isinstance(resultado[0], list):
+        return len(resultado[0])  # páginas: (linhas, cursor)
+    if isinstance(resultado, dict):
+        return sum(len(valor) for valor in resultado.values() if isinstance(valor, list))
+    return None
+
+
+class Histograma:
+    """Histograma de latências com faixas em potências de 2 microssegundos"""
+    
+    def __init__(self):
+        self.faixas = [0] * 40
+        self.quantidade = 0
+        self.total = 0.0
+        self.maximo = 0.0
+    
+    def registrar(self, segundos: float):
+        microssegundos = int(segundos * 1_000_000)
+        self.faixas[min(microssegundos.bit_length(), len(self.faixas) - 1)] += 1
+        self.quantidade += 1
+        self.total += segundos
+        self.maximo = max(self.maximo, segundos)
+    
+    def percentil(self, fracao: float) -> float:
+        """Limite superior (em ms) da faixa que contém o percentil"""
+        alvo = fracao * self.quantidade
+        acumulado = 0
+        for faixa, quantidade in enumerate(self.faixas):
+            acumulado += quantidade
+            if quantidade and acumulado >= alvo:
+                return min((1 << faixa) / 1000, self.maximo * 1000)
+        return self.maximo * 1000
+    
+    def resumo(self) -> dict:
+        if not self.quantidade:
+            return {"chamadas": 0}
+        return {
+            "chamadas": self.quantidade,
+            "total_ms": round(self.total * 1000, 3),
+            "media_ms": round(self.total * 1000 / self.quantidade, 3),
+            "p50_ms": round(self.percentil(0.50), 3),
+            "p95_ms": round(self.percentil(0.95), 3),
+            "p99_ms": round(self.percentil(0.99), 3),
+            "max_ms": round(self.maximo * 1000, 3),
+            "histograma": {f"<={(1 << faixa) / 1000:g}ms": quantidade
+                           for faixa, quantidade in enumerate(self.faixas) if quantidade},
+        }
+
+
+class Instrumentacao:
+    """Coletor das estatísticas de um SistemaGerenciamentoFrota"""
+    
+    def __init__(self):
+        self.inicio = datetime.datetime.now()
+        self.metodos = []       # nomes envolvidos no sistema (ver ativar_instrumentacao)
+        self._lock = threading.Lock()
+        self._metodos = {}      # nome -> [Histograma, linhas, erros]
+        self._transacoes = Histograma()
+        self._transacoes_desfeitas = 0
+        self._sql = {}
+        self._sql_total = 0
+        self._normalizados = {}
+        self._exportador = None
+        self._parar_exportador = threading.Event()
+    
+    def envolver(self, nome: str, metodo):
+        """Retorna o método envolvido pela medição de latência e linhas"""
+        def medido(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = metodo(*args, **kwargs)
+            except BaseException:
+                self._registrar_metodo(nome, time.perf_counter() - inicio, None, erro=True)
+                raise
+            self._registrar_metodo(nome, time.perf_counter() - inicio, contar_linhas(resultado))
+            return resultado
+        
+        medido.__name__ = getattr(metodo, "__name__", nome)
+        medido.__doc__ = getattr(metodo, "__doc__", None)
+        medido.__wrapped__ = metodo
+        return medido
+    
+    def _registrar_metodo(self, nome: str, segundos: float, linhas: Optional[int], erro: bool = False):
+        with self._lock:
+            dados = self._metodos.get(nome)
+            if dados is None:
+                dados = self._metodos[nome] = [Histograma(), 0, 0]
+            dados[0].registrar(segundos)
+            if linhas is not None:
+                dados[1] += linhas
+            if erro:
+                dados[2] += 1
+    
+    def registrar_transacao(self, segundos: float, confirmada: bool):
+        with self._lock:
+            self._transacoes.registrar(segundos)
+            if not confirmada:
+                self._transacoes_desfeitas += 1
+    
+    def registrar_sql(self, sql: str):
+        """Trace callback das conexões (recebe o comando já com os valores)"""
+        # As regex custam ~10 µs por comando; a chave com os dígitos mascarados
+        # repete entre chamadas e evita refazer o trabalho (bytes.translate é
+        # bem mais rápido que str.translate em textos com acentos)
+        chave = sql.encode().translate(_DIGITOS)
+        comando = self._normalizados.get(chave)
+        if comando is None:
+            comando = normalizar_sql(sql)
+            if len(self._normalizados) >= MAX_CACHE_NORMALIZACAO:
+                self._normalizados.clear()
+            self._normalizados[chave] = comando
+        
+        with self._lock:
+            self._sql_total += 1
+            if comando not in self._sql and len(self._sql) >= MAX_COMANDOS_SQL:
+                comando = "outros"
+            self._sql[comando] = self._sql.get(comando, 0) + 1
+    
+    def estatisticas(self, comandos_sql: int = 20) -> dict:
+        """Resumo das medições, com os `comandos_sql` comandos mais executados"""
+        with self._lock:
+            metodos = {}
+            for nome, (histograma, linhas, erros) in sorted(self._metodos.items()):
+                resumo = histograma.resumo()
+                resumo["linhas"] = linhas
+                resumo["erros"] = erros
+                metodos[nome] = resumo
+            
+            transacoes = self._transacoes.resumo()
+            transacoes["desfeitas"] = self._transacoes_desfeitas
+            
+            mais_executados = sorted(self._sql.items(), key=lambda item: item[1], reverse=True)[:comandos_sql]
+            return {
+                "inicio": self.inicio.isoformat(" ", "seconds"),
+                "gerado_em": datetime.datetime.now().isoformat(" ", "seconds"),
+                "metodos": metodos,
+                "transacoes": transacoes,
+                "sql": {
+                    "comandos": self._sql_total,
+                    "distintos": len(self._sql),
+                    "mais_executados": [{"sql": sql, "execucoes": n} for sql, n in mais_executados],
+                },
+            }
+    
+    def zerar(self):
+        with self._lock:
+            self.inicio = datetime.datetime.now()
+            self._metodos.clear()
+            self._transacoes = Histograma()
+            self._transacoes_desfeitas = 0
+            self._sql.clear()
+            self._sql_total = 0
+    
+    def exportar(self, caminho: str):
+        """Grava o snapshot JSON de forma atômica (arquivo temporário + rename)"""
+        temporario = f"{caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(self.estatisticas(), arquivo, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+    
+    def exportar_periodicamente(self, caminho: str, intervalo: float = INTERVALO_SNAPSHOT):
+        """Grava um snapshot a cada `intervalo` segundos em uma thread de fundo"""
+        self.parar_exportacao()
+        self._parar_exportador.clear()
+        
+        def executar():
+            while not self._parar_exportador.wait(intervalo):
+                self.exportar(caminho)
+            self.exportar(caminho)  # snapshot final ao parar
+        
+        self._exportador = threading.Thread(target=executar, name="rastreia-snapshot", daemon=True)
+        self._exportador.start()
+    
+    def parar_exportacao(self):
+        if self._exportador is not None:
+            self._parar_exportador.set()
+            self._exportador.join()
+            self._exportador = None
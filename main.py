@@ -5,214 +5,1763 @@ A ser exibido em seminário do curso de Ciência da Computação
 
 import sqlite3
 import datetime
-from typing import List, Tuple, Optional
+import bisect
+import enum
+import functools
+import collections
+import heapq
+import itertools
+import math
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Tuple, Optional, Union
+
+from migracoes import VERSAO_ESQUEMA, aplicar_migracoes, versao_do_banco
+
+if TYPE_CHECKING:
+    # concurrent.futures (e o logging que ele carrega) só é importado no modo concorrente
+    from concurrent.futures import Future
+
+# PRAGMAs aplicados a cada conexão aberta pelo sistema (None desativa o PRAGMA)
+PRAGMAS_PADRAO = {
+    # Só tem efeito em bancos novos e precisa vir antes do journal_mode
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,        # ~16 MB de cache de páginas
+    "mmap_size": 268435456,      # 256 MB mapeados em memória
+    "busy_timeout": 5000,
+}
+
+# Quantidade de leituras gravadas por transação em atualizar_odometro_lote
+TAMANHO_BLOCO_LOTE = 5000
+
+# Limite de parâmetros por cláusula IN (abaixo do limite padrão do SQLite)
+MAX_PARAMETROS_SQL = 900
+
+# Tamanho padrão das páginas nas listagens paginadas
+TAMANHO_PAGINA = 100
+
+# Busca de viaturas: resultados retornados e, na busca textual, ocorrências
+# examinadas por resultado (várias observações podem ser da mesma viatura)
+TAMANHO_BUSCA = 20
+OCORRENCIAS_POR_RESULTADO = 5
+
+# Ocorrências mais recentes ranqueadas pelo bm25 em cada índice de texto
+OCORRENCIAS_RANQUEADAS = 2000
+
+# Índices de texto (FTS5): sem diferenciar acentos e maiúsculas, com índices
+# auxiliares para os prefixos curtos
+OPCOES_FTS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+# Modo concorrente: operações enfileiradas e máximo de operações por commit
+TAMANHO_FILA_ESCRITA = 10000
+OPERACOES_POR_COMMIT = 500
+
+# Caches em memória de num_vtr -> (id, ativa) e nome do tipo -> (id, intervalo_km, intervalo_dias)
+TAMANHO_CACHE_VIATURAS = 50000
+TAMANHO_CACHE_TIPOS = 256
+
+# Compactação de registros_odometro: janela mantida com resolução total,
+# leituras resumidas por transação e páginas devolvidas ao disco a cada etapa
+DIAS_RETENCAO_ODOMETRO = 90
+LEITURAS_POR_ETAPA_COMPACTACAO = 20000
+PAGINAS_VACUUM_POR_ETAPA = 500
+
+# Valor de PRAGMA auto_vacuum nos bancos com vacuum incremental
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Chaves de idempotência das leituras: dias mantidos e chaves removidas por transação
+DIAS_RETENCAO_CHAVES_LEITURA = 7
+CHAVES_POR_ETAPA_EXPURGO = 20000
+
+# Métodos públicos que a instrumentação não mede (controle e infraestrutura)
+METODOS_NAO_INSTRUMENTADOS = {
+    "ativar_instrumentacao", "desativar_instrumentacao", "estatisticas",
+    "close", "transacao", "init_database", "submeter",
+    "estatisticas_cache", "invalidar_caches", "estatisticas_replica",
+}
+
+# Limites (dias, km) de cada status de alerta, do mais grave para o mais leve
+LIMITES_ALERTA = (
+    ("VENCIDO", 0, 0),
+    ("URGENTE", 14, 250),
+    ("ATENÇÃO", 30, 500),
+)
+
+
+def data_para_epoch(data: Union[datetime.datetime, str, int, float]) -> int:
+    """Converte uma data local (datetime, texto ISO ou epoch) para o formato gravado no banco
+    
+    As datas são gravadas como segundos desde 1970 (UTC); levanta ValueError
+    se o texto não for uma data ISO válida.
+    """
+    if isinstance(data, datetime.datetime):
+        return int(data.timestamp())
+    if isinstance(data, (int, float)):
+        return int(data)
+    return int(datetime.datetime.fromisoformat(str(data).strip()).timestamp())
+
+
+def epoch_para_data(segundos: int) -> datetime.datetime:
+    """Converte uma data gravada no banco para datetime local"""
+    return datetime.datetime.fromtimestamp(segundos)
+
+
+def classificar_alerta(km_restantes: float, dias_restantes: float) -> Optional[str]:
+    """Retorna o status de alerta de uma manutenção (None se não houver alerta)"""
+    for status, limite_dias, limite_km in LIMITES_ALERTA:
+        if dias_restantes <= limite_dias or km_restantes <= limite_km:
+            return status
+    return None
+
+
+def periodos_uso(segundos: int) -> Tuple[str, str]:
+    """Dia e mês ('AAAA-MM-DD' e 'AAAA-MM-01') de uma data gravada no banco, no fuso local"""
+    dia = time.strftime("%Y-%m-%d", time.localtime(segundos))
+    return dia, dia[:8] + "01"
+
+
+def trimestre_de(segundos: int) -> str:
+    """Trimestre ('AAAA-Tn') de uma data gravada no banco, no fuso local"""
+    data = time.localtime(segundos)
+    return f"{data.tm_year}-T{(data.tm_mon + 2) // 3}"
+
+
+def _trimestre_sql(coluna: str) -> str:
+    """Expressão SQL equivalente a trimestre_de"""
+    return (f"strftime('%Y', {coluna}, 'unixepoch', 'localtime') || '-T' || "
+            f"((CAST(strftime('%m', {coluna}, 'unixepoch', 'localtime') AS INTEGER) + 2) / 3)")
+
+
+def _operacao_escrita(metodo):
+    """Encaminha a chamada para o escritor em grupo quando o modo concorrente está ativo"""
+    @functools.wraps(metodo)
+    def encaminhar(self, *args, **kwargs):
+        escritor = self.escritor
+        if escritor is None or escritor.na_thread_escritora():
+            return metodo(self, *args, **kwargs)
+        return escritor.submeter(metodo, self, *args, **kwargs).result()
+    return encaminhar
+
+
+def _operacao_isolada(metodo):
+    """Como _operacao_escrita, mas a operação roda sozinha e fora de transação (ex.: VACUUM)"""
+    @functools.wraps(metodo)
+    def encaminhar(self, *args, **kwargs):
+        escritor = self.escritor
+        if escritor is None or escritor.na_thread_escritora():
+            return metodo(self, *args, **kwargs)
+        return escritor.submeter_isolada(metodo, self, *args, **kwargs).result()
+    return encaminhar
+
+
+def chave_de_leitura(chave=None, dispositivo=None, sequencia=None) -> Optional[str]:
+    """Chave de idempotência de uma leitura: a informada pelo cliente ou dispositivo:sequência"""
+    if chave not in (None, ""):
+        return str(chave)
+    if dispositivo not in (None, "") and sequencia not in (None, ""):
+        return f"{dispositivo}:{sequencia}"
+    return None
+
+
+def _expressao_fts(texto: str) -> Optional[str]:
+    """Converte o texto digitado em uma consulta FTS5 em que todas as palavras são obrigatórias
+    
+    A última palavra também casa como início de palavra ("vazamento ole"
+    encontra "vazamento de óleo"), desde que tenha ao menos duas letras: um
+    prefixo custa bem mais que um termo exato. Aspas, operadores e demais
+    sinais são descartados (None se não sobrar nenhuma palavra).
+    """
+    palavras = re.findall(r"\w+", texto)
+    if not palavras:
+        return None
+    termos = [f'"{palavra}"' for palavra in palavras]
+    if len(palavras[-1]) > 1:
+        termos[-1] += "*"
+    return " ".join(termos)
+
+
+class ResultadoLeitura(str, enum.Enum):
+    """Resultado de atualizar_odometro; verdadeiro quando a leitura está aplicada
+    
+    Os valores são os motivos usados no relatório de atualizar_odometro_lote.
+    """
+    
+    ACEITA = "aceita"
+    REPETIDA = "leitura repetida"
+    DESATUALIZADA = "odômetro menor que o atual"
+    VIATURA_NAO_ENCONTRADA = "viatura não encontrada"
+    
+    def __bool__(self) -> bool:
+        return self in (ResultadoLeitura.ACEITA, ResultadoLeitura.REPETIDA)
+    
+    def __str__(self) -> str:
+        return self.value
+
+
+class EscritorEmGrupo:
+    """Thread única de escrita que agrupa as operações enfileiradas em um só commit
+    
+    Cada operação roda em um savepoint próprio: uma falha desfaz apenas aquela
+    operação e é entregue ao chamador pelo Future correspondente. Operações
+    isoladas (submeter_isolada) rodam sozinhas, entre dois grupos.
+    """
+    
+    def __init__(self, sistema: "SistemaGerenciamentoFrota", tamanho_fila: int = TAMANHO_FILA_ESCRITA,
+                 operacoes_por_commit: int = OPERACOES_POR_COMMIT):
+        self.sistema = sistema
+        self.operacoes_por_commit = operacoes_por_commit
+        self.commits = 0
+        self.operacoes = 0
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self._thread = threading.Thread(target=self._executar, name="rastreia-escritor", daemon=True)
+        self._thread.start()
+    
+    def na_thread_escritora(self) -> bool:
+        return threading.current_thread() is self._thread
+    
+    def submeter(self, funcao, *args, **kwargs) -> "Future":
+        """Enfileira uma operação de escrita (bloqueia se a fila estiver cheia)"""
+        from concurrent.futures import Future
+        
+        if not self._thread.is_alive():
+            raise RuntimeError("Escritor encerrado")
+        future = Future()
+        self._fila.put((future, funcao, args, kwargs, False))
+        return future
+    
+    def submeter_isolada(self, funcao, *args, **kwargs) -> "Future":
+        """Enfileira uma operação que precisa rodar fora de transação"""
+        from concurrent.futures import Future
+        
+        if not self._thread.is_alive():
+            raise RuntimeError("Escritor encerrado")
+        future = Future()
+        self._fila.put((future, funcao, args, kwargs, True))
+        return future
+    
+    def encerrar(self):
+        """Aplica as operações pendentes e encerra a thread"""
+        if self._thread.is_alive():
+            self._fila.put(None)
+            self._thread.join()
+    
+    def _executar(self):
+        encerrar = False
+        pendente = None
+        while not encerrar:
+            item = pendente if pendente is not None else self._fila.get()
+            pendente = None
+            if item is None:
+                break
+            if item[4]:
+                self._aplicar_isolada(item)
+                continue
+            
+            # Tudo o que chegou enquanto o commit anterior era gravado entra no mesmo grupo,
+            # então a latência fica limitada ao tempo de um commit
+            grupo = [item]
+            while len(grupo) < self.operacoes_por_commit:
+                try:
+                    item = self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    encerrar = True
+                    break
+                if item[4]:
+                    # Fica para depois do commit deste grupo
+                    pendente = item
+                    break
+                grupo.append(item)
+            
+            self._aplicar(grupo)
+    
+    @staticmethod
+    def _aplicar_isolada(item: tuple):
+        future, funcao, args, kwargs, _ = item
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(funcao(*args, **kwargs))
+        except Exception as erro:
+            future.set_exception(erro)
+    
+    def _aplicar(self, grupo: list):
+        resultados = []
+        try:
+            with self.sistema.transacao():
+                for future, funcao, args, kwargs, _ in grupo:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with self.sistema.transacao():
+                            resultados.append((future, funcao(*args, **kwargs), None))
+                    except Exception as erro:
+                        resultados.append((future, None, erro))
+        except Exception as erro:
+            # Falha no BEGIN/COMMIT: nenhuma operação do grupo foi gravada
+            for future, _, _ in resultados:
+                future.set_exception(erro)
+            for future, *_ in grupo:
+                if not future.done():
+                    future.set_exception(erro)
+            return
+        
+        self.commits += 1
+        self.operacoes += len(resultados)
+        for future, resultado, erro in resultados:
+            if erro is None:
+                future.set_result(resultado)
+            else:
+                future.set_exception(erro)
+
+
+class AgendaVencimentos:
+    """Fila de prioridade em memória com o próximo vencimento de cada (viatura, tipo)
+    
+    Espelho da tabela agenda_vencimentos: cada regravação da tabela recebe um id
+    crescente, então basta aplicar as linhas com id maior que o último visto.
+    Entradas substituídas continuam no heap e são descartadas ao chegarem ao topo;
+    as de viaturas desativadas saem da agenda da mesma forma.
+    """
+    
+    def __init__(self):
+        self.ultimo_id = 0
+        self._atual = {}       # (viatura_id, tipo_id) -> (id, orgao, prazo)
+        self._heap = []        # (prazo, viatura_id, tipo_id, id)
+        self._por_orgao = {}   # orgao -> heap no mesmo formato
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._atual)
+    
+    def aplicar(self, linhas: Iterable[Tuple]):
+        """Aplica linhas (id, viatura_id, tipo_id, orgao, prazo, ativa) lidas de agenda_vencimentos"""
+        with self._lock:
+            for id_, viatura_id, tipo_id, orgao, prazo, ativa in linhas:
+                self.ultimo_id = max(self.ultimo_id, id_)
+                if not ativa:
+                    self._atual.pop((viatura_id, tipo_id), None)
+                    continue
+                self._atual[(viatura_id, tipo_id)] = (id_, orgao, prazo)
+                entrada = (prazo, viatura_id, tipo_id, id_)
+                heapq.heappush(self._heap, entrada)
+                heapq.heappush(self._por_orgao.setdefault(orgao, []), entrada)
+            
+            # Reconstrói os heaps quando as entradas obsoletas passam a dominar
+            if len(self._heap) > 2 * len(self._atual) + 1024:
+                self._reconstruir()
+    
+    def _reconstruir(self):
+        self._heap = []
+        self._por_orgao = {}
+        for (viatura_id, tipo_id), (id_, orgao, prazo) in self._atual.items():
+            entrada = (prazo, viatura_id, tipo_id, id_)
+            self._heap.append(entrada)
+            self._por_orgao.setdefault(orgao, []).append(entrada)
+        heapq.heapify(self._heap)
+        for heap in self._por_orgao.values():
+            heapq.heapify(heap)
+    
+    def proximos(self, quantidade: Optional[int] = None, ate=None, orgao: Optional[str] = None) -> List[Tuple]:
+        """Retorna (prazo, viatura_id, tipo_id, orgao) em ordem de prazo
+        
+        Custa O((k + obsoletas) log n) para k itens: as entradas válidas são
+        retiradas do topo e devolvidas ao heap ao final.
+        """
+        with self._lock:
+            heap = self._heap if orgao is None else self._por_orgao.get(orgao, [])
+            encontrados = []
+            while heap and (quantidade is None or len(encontrados) < quantidade):
+                if ate is not None and heap[0][0] > ate:
+                    break
+                entrada = heapq.heappop(heap)
+                prazo, viatura_id, tipo_id, id_ = entrada
+                atual = self._atual.get((viatura_id, tipo_id))
+                if atual is None or atual[0] != id_:
+                    continue  # substituída por uma regravação mais recente
+                encontrados.append(entrada)
+            
+            for entrada in encontrados:
+                heapq.heappush(heap, entrada)
+            return [(prazo, viatura_id, tipo_id, self._atual[(viatura_id, tipo_id)][1])
+                    for prazo, viatura_id, tipo_id, _ in encontrados]
+
+
+class ReplicaLeitura:
+    """Réplica em memória das tabelas lidas pelas telas de consulta: viaturas, alertas e tipos
+    
+    Acompanha o banco pela tabela versoes_viatura, em que os gatilhos (criados
+    no primeiro uso da réplica) gravam uma versão crescente a cada alteração
+    de uma viatura ou do estado de alerta dela: basta recarregar as viaturas
+    com versão maior que a última aplicada, inclusive as alteradas por outros
+    processos (servidor de telemetria, importações). As viaturas ativas e os
+    alertas ficam em listas já ordenadas, atualizadas só nas posições das
+    viaturas alteradas.
+    
+    Os alertas sem status ficam pendentes em ordem de reavaliar_em e entram
+    na leitura quando esse instante passa, como na consulta ao banco: a
+    réplica nunca precisa de varrer_alertas (nem do lock de escrita).
+    """
+    
+    # Acima desta quantidade de mudanças, reordenar a lista sai mais barato que bisect
+    MUDANCAS_POR_BISECT = 64
+    
+    def __init__(self):
+        self.versao = 0
+        self.sincronizacoes = 0
+        self.viaturas_recarregadas = 0
+        self._viaturas = {}        # id -> (num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro)
+        self._ativas = []          # num_vtr das viaturas ativas, em ordem
+        self._id_ativa = {}        # num_vtr -> id das viaturas ativas
+        self._alertas = {}         # viatura_id -> (alertas com status, pendentes) da viatura ativa
+        self._ordem_alertas = []   # (proxima_data, km_restantes, num_vtr, modelo, odometro, tipo, proximo_odometro)
+        self._pendentes = []       # (reavaliar_em, alerta no formato de _ordem_alertas) ainda sem status
+        self._tipos = {}           # id -> (nome, intervalo_km, intervalo_dias, descricao)
+        self._tipos_ordenados = []
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._viaturas)
+    
+    def carregar_tipos(self, linhas: Iterable[Tuple]):
+        """Substitui os tipos de manutenção por linhas (id, nome, intervalo_km, intervalo_dias, descricao)"""
+        with self._lock:
+            self._tipos = {id_: tuple(resto) for id_, *resto in linhas}
+            self._tipos_ordenados = sorted(self._tipos.values(), key=lambda tipo: tipo[1])
+    
+    def aplicar(self, versao: int, viatura_ids: Iterable[int], viaturas: Iterable[Tuple], alertas: Iterable[Tuple]):
+        """Substitui o estado das viaturas informadas
+        
+        viaturas são linhas (id, num_vtr, modelo, ano, orgao, odometro_atual,
+        data_cadastro, ativa) e alertas, linhas (viatura_id, tipo_id,
+        proximo_odometro, proxima_data, reavaliar_em, com_status) de
+        estado_alertas. Viaturas sem linha foram removidas.
+        """
+        novas = {linha[0]: linha[1:] for linha in viaturas}
+        novos_alertas = {}
+        for viatura_id, *alerta in alertas:
+            novos_alertas.setdefault(viatura_id, []).append(alerta)
+        
+        with self._lock:
+            ativas_removidas, ativas_incluidas = [], []
+            alertas_removidos, alertas_incluidos = [], []
+            pendentes_removidos, pendentes_incluidos = [], []
+            for viatura_id in viatura_ids:
+                anterior = self._viaturas.pop(viatura_id, None)
+                era_ativa = anterior is not None and self._id_ativa.get(anterior[0]) == viatura_id
+                nova, e_ativa = novas.get(viatura_id), False
+                if nova is not None:
+                    num_vtr, modelo, ano, orgao, odometro, data_cadastro, e_ativa = nova
+                    nova = (num_vtr, sys.intern(modelo), ano, sys.intern(orgao), odometro, data_cadastro)
+                    self._viaturas[viatura_id] = nova
+                
+                # A ordem das ativas só muda com cadastros, desativações e trocas de número
+                if era_ativa and not (e_ativa and anterior[0] == nova[0]):
+                    ativas_removidas.append(anterior[0])
+                    del self._id_ativa[anterior[0]]
+                if e_ativa and not (era_ativa and anterior[0] == nova[0]):
+                    ativas_incluidas.append(nova[0])
+                    self._id_ativa[nova[0]] = viatura_id
+                
+                com_status, pendentes = self._alertas.pop(viatura_id, ((), ()))
+                alertas_removidos.extend(com_status)
+                pendentes_removidos.extend(pendentes)
+                if e_ativa and viatura_id in novos_alertas:
+                    num_vtr, modelo, _, _, odometro, _ = nova
+                    com_status, pendentes = [], []
+                    for tipo_id, proximo_odometro, proxima_data, reavaliar_em, status in novos_alertas[viatura_id]:
+                        linha = (proxima_data, proximo_odometro - odometro, num_vtr, modelo, odometro,
+                                 self._tipos[tipo_id][0], proximo_odometro)
+                        if status:
+                            com_status.append(linha)
+                        else:
+                            pendentes.append((reavaliar_em, linha))
+                    self._alertas[viatura_id] = (tuple(com_status), tuple(pendentes))
+                    alertas_incluidos.extend(com_status)
+                    pendentes_incluidos.extend(pendentes)
+                self.viaturas_recarregadas += 1
+            
+            self._ativas = self._atualizar_ordenada(self._ativas, ativas_removidas, ativas_incluidas)
+            self._ordem_alertas = self._atualizar_ordenada(self._ordem_alertas, alertas_removidos, alertas_incluidos)
+            self._pendentes = self._atualizar_ordenada(self._pendentes, pendentes_removidos, pendentes_incluidos)
+            self.versao = max(self.versao, versao)
+            self.sincronizacoes += 1
+    
+    @classmethod
+    def _atualizar_ordenada(cls, lista: list, removidos: list, incluidos: list) -> list:
+        """Remove e inclui itens de uma lista ordenada: poucas mudanças por bisect, muitas reordenando"""
+        if len(removidos) + len(incluidos) > cls.MUDANCAS_POR_BISECT:
+            removidos = set(removidos)
+            lista = [item for item in lista if item not in removidos] if removidos else lista
+            lista.extend(incluidos)
+            lista.sort()
+            return lista
+        
+        for item in removidos:
+            del lista[bisect.bisect_left(lista, item)]
+        for item in incluidos:
+            bisect.insort(lista, item)
+        return lista
+    
+    def listar_viaturas(self) -> List[Tuple]:
+        """Viaturas ativas em ordem de num_vtr (mesmas colunas de SistemaGerenciamentoFrota.listar_viaturas)"""
+        with self._lock:
+            viaturas, ids = self._viaturas, self._id_ativa
+            return [viaturas[ids[num_vtr]] for num_vtr in self._ativas]
+    
+    def listar_tipos_manutencao(self) -> List[Tuple]:
+        with self._lock:
+            return list(self._tipos_ordenados)
+    
+    def obter_alertas(self, agora: int) -> List[Tuple]:
+        """Alertas das viaturas ativas, com as colunas e a ordem de obter_alertas_manutencao"""
+        with self._lock:
+            ordem = self._ordem_alertas
+            # Pendentes cujo prazo já cruzou o limite de alerta (reavaliar_em <= agora)
+            vencidos = self._pendentes[:bisect.bisect_right(self._pendentes, (agora, (math.inf,)))]
+            if vencidos:
+                ordem = heapq.merge(ordem, sorted(linha for _, linha in vencidos))
+            return [(num_vtr, modelo, odometro, tipo, proximo_odometro, proxima_data, km_restantes,
+                     (proxima_data - agora) / 86400.0)
+                    for proxima_data, km_restantes, num_vtr, modelo, odometro, tipo, proximo_odometro in ordem]
+    
+    def memoria(self) -> dict:
+        """Memória ocupada por estrutura, em bytes (objetos compartilhados contados uma vez)"""
+        vistos = set()
+        
+        def tamanho(objeto) -> int:
+            if id(objeto) in vistos:
+                return 0
+            vistos.add(id(objeto))
+            total = sys.getsizeof(objeto)
+            if isinstance(objeto, dict):
+                total += sum(tamanho(chave) + tamanho(valor) for chave, valor in objeto.items())
+            elif isinstance(objeto, (list, tuple)):
+                total += sum(tamanho(item) for item in objeto)
+            return total
+        
+        with self._lock:
+            estruturas = {
+                "viaturas": tamanho(self._viaturas),
+                "ativas": tamanho(self._ativas) + tamanho(self._id_ativa),
+                "alertas": tamanho(self._alertas) + tamanho(self._ordem_alertas) + tamanho(self._pendentes),
+                "tipos": tamanho(self._tipos) + tamanho(self._tipos_ordenados),
+            }
+            return {
+                "viaturas": len(self._viaturas),
+                "alertas": len(self._ordem_alertas),
+                "bytes": estruturas,
+                "total_bytes": sum(estruturas.values()),
+                "bytes_por_viatura": sum(estruturas.values()) / len(self._viaturas) if self._viaturas else 0.0,
+            }
+
+
+class CacheLimitado:
+    """Cache com capacidade máxima: ao encher, sai o item usado há mais tempo"""
+    
+    def __init__(self, capacidade: int):
+        self.capacidade = capacidade
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self._itens = collections.OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._itens)
+    
+    def obter(self, chave):
+        """Retorna o valor guardado (None se ausente) e conta o acerto ou a falha"""
+        with self._lock:
+            valor = self._itens.get(chave)
+            if valor is None:
+                self.falhas += 1
+            else:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+            return valor
+    
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            if len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+    
+    def invalidar(self, chave=None):
+        """Remove uma chave (ou todas, se None)"""
+        with self._lock:
+            self.invalidacoes += 1
+            if chave is None:
+                self._itens.clear()
+            else:
+                self._itens.pop(chave, None)
+    
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "capacidade": self.capacidade,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else None,
+                "invalidacoes": self.invalidacoes,
+            }
+
 
 class SistemaGerenciamentoFrota:
-    def __init__(self, db_name: str = "frota.db"):
-        """Inicializa o sistema e cria o banco de dados"""
+    def __init__(self, db_name: str = "frota.db", pragmas: Optional[dict] = None, modo_concorrente: bool = False,
+                 instrumentar: bool = False, cache_entre_processos: bool = False, replica_leitura: bool = False):
+        """Inicializa o sistema sem abrir o banco
+        
+        A primeira conexão é aberta na primeira utilização e só então o esquema
+        é verificado (ver init_database). Com modo_concorrente=True, todas as escritas passam por uma única thread
+        escritora que confirma as operações em grupo (ver EscritorEmGrupo).
+        Com instrumentar=True, as estatísticas são coletadas desde o início
+        (ver ativar_instrumentacao). Com cache_entre_processos=True, os caches
+        de viaturas e tipos são esvaziados quando outra conexão grava no banco
+        (ver _validar_caches). Com replica_leitura=True, listar_viaturas,
+        listar_tipos_manutencao e obter_alertas_manutencao (limites padrão) são
+        respondidos por uma réplica em memória (ver ReplicaLeitura).
+        """
         self.db_name = db_name
-        self.init_database()
+        self.pragmas = dict(PRAGMAS_PADRAO)
+        if pragmas:
+            self.pragmas.update(pragmas)
+        
+        # Uma conexão de longa duração por thread, reaproveitada entre as chamadas
+        self._local = threading.local()
+        self._conexoes = []
+        self._lock_conexoes = threading.Lock()
+        self._esquema_verificado = False
+        
+        # Espelho em memória de agenda_vencimentos, carregado na primeira consulta
+        self._agenda = None
+        self._lock_agenda = threading.Lock()
+        
+        # Réplica em memória das consultas de painel, carregada na primeira consulta
+        self.replica_leitura = replica_leitura
+        self._replica = None
+        self._lock_replica = threading.Lock()
+        
+        # Identidade das viaturas e tipos de manutenção, consultados em toda escrita
+        self._cache_viaturas = CacheLimitado(TAMANHO_CACHE_VIATURAS)
+        self._cache_tipos = CacheLimitado(TAMANHO_CACHE_TIPOS)
+        self.cache_entre_processos = cache_entre_processos
+        
+        self.instrumentacao = None
+        if instrumentar:
+            self.ativar_instrumentacao()
+        
+        self.escritor = None
+        if modo_concorrente:
+            self.escritor = EscritorEmGrupo(self)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _conectar(self) -> sqlite3.Connection:
+        """Abre uma nova conexão e aplica os PRAGMAs configurados"""
+        # isolation_level=None: as transações são controladas explicitamente em transacao()
+        conn = sqlite3.connect(self.db_name, isolation_level=None, check_same_thread=False)
+        banco_novo = versao_do_banco(conn) == 0
+        for nome, valor in self.pragmas.items():
+            # auto_vacuum só vale para bancos novos e custa uma leitura do esquema
+            if valor is None or (nome == "auto_vacuum" and not banco_novo):
+                continue
+            conn.execute(f"PRAGMA {nome} = {valor}")
+        if self.instrumentacao is not None:
+            conn.set_trace_callback(self.instrumentacao.registrar_sql)
+        return conn
+    
+    @property
+    def conexao(self) -> sqlite3.Connection:
+        """Conexão da thread atual (aberta na primeira utilização)"""
+        conn = getattr(self._local, "conexao", None)
+        if conn is None:
+            with self._lock_conexoes:
+                # Banco em memória só existe dentro de uma única conexão
+                if self.db_name == ":memory:" and self._conexoes:
+                    conn = self._conexoes[0]
+                else:
+                    conn = self._conectar()
+                    self._conexoes.append(conn)
+            self._local.conexao = conn
+            
+            if not self._esquema_verificado:
+                self._verificar_esquema()
+        return conn
+    
+    def _verificar_esquema(self):
+        """Executa init_database uma única vez, na abertura da primeira conexão"""
+        with self._lock_conexoes:
+            if self._esquema_verificado:
+                return
+            # Marcado antes: init_database usa self.conexao
+            self._esquema_verificado = True
+        try:
+            self.init_database()
+        except BaseException:
+            self._esquema_verificado = False
+            raise
+    
+    @contextmanager
+    def transacao(self):
+        """Executa o bloco em uma transação (ou savepoint, se aninhada)
+        
+        Confirma ao final do bloco e desfaz tudo se ocorrer uma exceção.
+        """
+        conn = self.conexao
+        profundidade = getattr(self._local, "profundidade", 0)
+        savepoint = f"sp_{profundidade}"
+        
+        inicio = time.perf_counter()
+        if profundidade == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        else:
+            conn.execute(f"SAVEPOINT {savepoint}")
+        self._local.profundidade = profundidade + 1
+        confirmada = False
+        
+        try:
+            yield conn.cursor()
+        except BaseException:
+            if profundidade == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        else:
+            if profundidade == 0:
+                conn.execute("COMMIT")
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+            confirmada = True
+        finally:
+            self._local.profundidade = profundidade
+            if profundidade == 0 and self.instrumentacao is not None:
+                self.instrumentacao.registrar_transacao(time.perf_counter() - inicio, confirmada)
+    
+    def submeter(self, metodo: str, *args, **kwargs) -> "Future":
+        """Enfileira uma operação de escrita no modo concorrente e retorna um Future
+        
+        Exemplo: sistema.submeter("atualizar_odometro", "PM-0001", 27000).result()
+        """
+        if self.escritor is None:
+            raise RuntimeError("submeter() requer modo_concorrente=True")
+        return self.escritor.submeter(getattr(self, metodo), *args, **kwargs)
+    
+    def ativar_instrumentacao(self, snapshot: Optional[str] = None, intervalo: Optional[float] = None):
+        """Passa a medir latência e linhas dos métodos, transações e comandos SQL
+        
+        Com `snapshot`, grava as estatísticas nesse arquivo JSON a cada
+        `intervalo` segundos (e ao desativar ou fechar o sistema).
+        """
+        from instrumentacao import INTERVALO_SNAPSHOT, Instrumentacao
+        
+        if self.instrumentacao is None:
+            instrumentacao = Instrumentacao()
+            # Os métodos envolvidos ficam na instância: desativada, a classe segue intacta
+            for nome in dir(type(self)):
+                if nome.startswith("_") or nome in METODOS_NAO_INSTRUMENTADOS:
+                    continue
+                if callable(getattr(type(self), nome)):
+                    setattr(self, nome, instrumentacao.envolver(nome, getattr(self, nome)))
+                    instrumentacao.metodos.append(nome)
+            
+            with self._lock_conexoes:
+                for conn in self._conexoes:
+                    conn.set_trace_callback(instrumentacao.registrar_sql)
+            self.instrumentacao = instrumentacao
+        
+        if snapshot is not None:
+            self.instrumentacao.exportar_periodicamente(snapshot, intervalo or INTERVALO_SNAPSHOT)
+        return self.instrumentacao
+    
+    def desativar_instrumentacao(self):
+        """Remove a instrumentação e retorna as estatísticas finais"""
+        instrumentacao = self.instrumentacao
+        if instrumentacao is None:
+            return {}
+        
+        self.instrumentacao = None
+        instrumentacao.parar_exportacao()
+        for nome in instrumentacao.metodos:
+            delattr(self, nome)
+        with self._lock_conexoes:
+            for conn in self._conexoes:
+                conn.set_trace_callback(None)
+        return instrumentacao.estatisticas()
+    
+    def estatisticas(self, comandos_sql: int = 20) -> dict:
+        """Latência por método, linhas retornadas, transações e comandos SQL mais executados
+        
+        Retorna {} se a instrumentação não estiver ativa.
+        """
+        if self.instrumentacao is None:
+            return {}
+        return self.instrumentacao.estatisticas(comandos_sql)
+    
+    def estatisticas_cache(self) -> dict:
+        """Itens, acertos, falhas e invalidações dos caches de viaturas e de tipos de manutenção"""
+        return {"viaturas": self._cache_viaturas.estatisticas(), "tipos": self._cache_tipos.estatisticas()}
+    
+    def invalidar_caches(self):
+        """Esvazia os caches (necessário após alterar viaturas ou tipos diretamente no banco)
+        
+        A réplica de leitura, se ativa, é recarregada na próxima consulta.
+        """
+        self._cache_viaturas.invalidar()
+        self._cache_tipos.invalidar()
+        with self._lock_replica:
+            self._replica = None
+    
+    def _validar_caches(self):
+        """Esvazia os caches se outra conexão gravou no banco desde a última verificação
+        
+        PRAGMA data_version muda quando outra conexão (de qualquer processo)
+        confirma uma transação; as gravações da própria conexão não contam.
+        """
+        versao = self.conexao.execute("PRAGMA data_version").fetchone()[0]
+        if versao != getattr(self._local, "data_version", None):
+            # A réplica de leitura não é descartada: ela acompanha as outras conexões por versoes_viatura
+            self._cache_viaturas.invalidar()
+            self._cache_tipos.invalidar()
+            self._local.data_version = versao
+    
+    def _viatura_em_cache(self, num_vtr: str) -> Optional[Tuple[int, bool]]:
+        """(id, ativa) da viatura, pelo cache (None se não existir)"""
+        num_vtr = num_vtr.upper()
+        if self.cache_entre_processos:
+            self._validar_caches()
+        viatura = self._cache_viaturas.obter(num_vtr)
+        if viatura is None:
+            linha = self.conexao.execute('SELECT id, ativa FROM viaturas WHERE num_vtr = ?', (num_vtr,)).fetchone()
+            if linha is None:
+                return None  # Ausências não são guardadas: a viatura pode ser cadastrada por outro processo
+            viatura = (linha[0], bool(linha[1]))
+            self._cache_viaturas.guardar(num_vtr, viatura)
+        return viatura
+    
+    def _tipo_em_cache(self, nome: str) -> Optional[Tuple[int, int, int]]:
+        """(id, intervalo_km, intervalo_dias) do tipo de manutenção, pelo cache (None se não existir)"""
+        if self.cache_entre_processos:
+            self._validar_caches()
+        tipo = self._cache_tipos.obter(nome)
+        if tipo is None:
+            tipo = self.conexao.execute(
+                'SELECT id, intervalo_km, intervalo_dias FROM tipos_manutencao WHERE nome = ?', (nome,)
+            ).fetchone()
+            if tipo is not None:
+                self._cache_tipos.guardar(nome, tipo)
+        return tipo
+    
+    def close(self):
+        """Fecha todas as conexões abertas pelo sistema"""
+        if self.escritor is not None:
+            self.escritor.encerrar()
+        if self.instrumentacao is not None:
+            self.instrumentacao.parar_exportacao()
+        with self._lock_conexoes:
+            for conn in self._conexoes:
+                conn.close()
+            self._conexoes.clear()
+            # Conexões de outras threads são descartadas na próxima utilização
+            self._local = threading.local()
     
     def init_database(self):
-        """Cria as tabelas necessárias no banco de dados"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        """Aplica as migrações pendentes (ver migracoes.py) e cria índices e projeções
+        
+        Com o banco já na versão atual, custa apenas a leitura de PRAGMA user_version.
+        """
+        if versao_do_banco(self.conexao) == VERSAO_ESQUEMA:
+            return
+        
+        with self.transacao() as cursor:
+            aplicar_migracoes(cursor)
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_registros_odometro_viatura_data
+                ON registros_odometro (viatura_id, data_registro)
+            ''')
+            # Cobre as varreduras por período (compactação e previsão) sem acessar a tabela
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_registros_odometro_data_cobertura
+                ON registros_odometro (data_registro, viatura_id, odometro)
+            ''')
+            
+            # Também localiza a última manutenção de cada tipo até uma data (estado_em);
+            # substitui o índice (viatura_id, tipo_manutencao_id) das versões anteriores
+            cursor.execute("DROP INDEX IF EXISTS idx_manutencoes_viatura_tipo")
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_manutencoes_viatura_tipo_data
+                ON manutencoes (viatura_id, tipo_manutencao_id, data_realizada)
+            ''')
+            
+            # Paginação por cursor (keyset) das listagens e históricos
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_manutencoes_viatura_data
+                ON manutencoes (viatura_id, data_realizada)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_viaturas_orgao_num
+                ON viaturas (orgao, num_vtr)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_resumo_odometro_viatura_data
+                ON resumo_odometro (viatura_id, ultima_data)
+            ''')
+            # Expurgo das chaves de idempotência fora da janela de retenção
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_leituras_recebidas_data
+                ON leituras_recebidas (data_recebida)
+            ''')
+            
+            # Projeção com a manutenção mais recente de cada (viatura, tipo)
+            self._criar_ultima_manutencao(cursor)
+            
+            # Próximo vencimento de cada (viatura, tipo), mantido junto com os alertas
+            self._criar_agenda_vencimentos(cursor)
+            
+            # Estado de alerta persistente, atualizado a cada evento
+            self._criar_estado_alertas(cursor)
+            
+            # Resumos de uso para os relatórios da frota
+            self._criar_resumos_uso(cursor)
+            
+            # Índices de texto da busca de viaturas
+            self._criar_busca_textual(cursor)
+    
+    def _criar_ultima_manutencao(self, cursor):
+        """Cria a tabela ultima_manutencao e a preenche a partir do histórico"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ultima_manutencao'")
+        existia = cursor.fetchone() is not None
         
-        # Tabela de viaturas
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS viaturas (
+            CREATE TABLE IF NOT EXISTS ultima_manutencao (
+                viatura_id INTEGER NOT NULL,
+                tipo_manutencao_id INTEGER NOT NULL,
+                manutencao_id INTEGER NOT NULL,
+                proximo_odometro INTEGER NOT NULL,
+                proxima_data INTEGER NOT NULL,
+                PRIMARY KEY (viatura_id, tipo_manutencao_id)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Índices cobrindo as consultas de alerta por data e por quilometragem
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_ultima_manutencao_data
+            ON ultima_manutencao (proxima_data, proximo_odometro)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_ultima_manutencao_odometro
+            ON ultima_manutencao (proximo_odometro, proxima_data)
+        ''')
+        
+        # Mantém a projeção atualizada em qualquer inserção de manutenção
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_manutencoes_ultima
+            AFTER INSERT ON manutencoes
+            BEGIN
+                INSERT OR REPLACE INTO ultima_manutencao
+                    (viatura_id, tipo_manutencao_id, manutencao_id, proximo_odometro, proxima_data)
+                VALUES
+                    (NEW.viatura_id, NEW.tipo_manutencao_id, NEW.id, NEW.proximo_odometro, NEW.proxima_data);
+            END
+        ''')
+        
+        # Migração de bancos existentes: preencher com o histórico já registrado
+        if not existia:
+            cursor.execute('''
+                INSERT INTO ultima_manutencao
+                    (viatura_id, tipo_manutencao_id, manutencao_id, proximo_odometro, proxima_data)
+                SELECT m.viatura_id, m.tipo_manutencao_id, m.id, m.proximo_odometro, m.proxima_data
+                FROM manutencoes m
+                JOIN (
+                    SELECT MAX(id) AS id FROM manutencoes
+                    GROUP BY viatura_id, tipo_manutencao_id
+                ) recentes ON recentes.id = m.id
+            ''')
+    
+    def _criar_agenda_vencimentos(self, cursor):
+        """Cria a tabela agenda_vencimentos
+        
+        O prazo é a próxima data da manutenção ou, se a quilometragem já foi
+        atingida antes, o instante em que isso foi constatado. Toda regravação
+        recebe um novo id (AUTOINCREMENT), o que permite acompanhar as mudanças.
+        As linhas de viaturas desativadas são regravadas com ativa = 0, também
+        quando a desativação é feita diretamente no banco (gatilho).
+        """
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('agenda_vencimentos', 'estado_alertas')")
+        existentes = {linha[0] for linha in cursor.fetchall()}
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS agenda_vencimentos (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                num_vtr TEXT UNIQUE NOT NULL,
-                modelo TEXT NOT NULL,
-                ano INTEGER NOT NULL,
+                viatura_id INTEGER NOT NULL,
+                tipo_manutencao_id INTEGER NOT NULL,
+                manutencao_id INTEGER NOT NULL,
                 orgao TEXT NOT NULL,
-                odometro_atual INTEGER DEFAULT 0,
-                data_cadastro TEXT NOT NULL,
-                ativa BOOLEAN DEFAULT 1
+                prazo INTEGER NOT NULL,
+                ativa INTEGER NOT NULL DEFAULT 1,
+                UNIQUE (viatura_id, tipo_manutencao_id)
             )
         ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_agenda_vencimentos_prazo
+            ON agenda_vencimentos (prazo)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_agenda_vencimentos_orgao_prazo
+            ON agenda_vencimentos (orgao, prazo)
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_viaturas_agenda_ativa
+            AFTER UPDATE OF ativa ON viaturas
+            WHEN OLD.ativa IS NOT NEW.ativa
+            BEGIN
+                INSERT OR REPLACE INTO agenda_vencimentos
+                    (viatura_id, tipo_manutencao_id, manutencao_id, orgao, prazo, ativa)
+                SELECT viatura_id, tipo_manutencao_id, manutencao_id, orgao, prazo, NEW.ativa = 1
+                FROM agenda_vencimentos
+                WHERE viatura_id = NEW.id;
+            END
+        ''')
+        
+        # Bancos novos são preenchidos junto com estado_alertas
+        if "agenda_vencimentos" not in existentes and "estado_alertas" in existentes:
+            self._recalcular_alertas(cursor)
+    
+    def _criar_estado_alertas(self, cursor):
+        """Cria a tabela estado_alertas e calcula o estado inicial"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'estado_alertas'")
+        existia = cursor.fetchone() is not None
         
-        # Tabela de registros de odômetro
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS registros_odometro (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TABLE IF NOT EXISTS estado_alertas (
                 viatura_id INTEGER NOT NULL,
-                odometro INTEGER NOT NULL,
-                data_registro TEXT NOT NULL,
-                observacoes TEXT,
-                FOREIGN KEY (viatura_id) REFERENCES viaturas (id)
-            )
+                tipo_manutencao_id INTEGER NOT NULL,
+                status TEXT,
+                km_restantes INTEGER NOT NULL,
+                proximo_odometro INTEGER NOT NULL,
+                proxima_data INTEGER NOT NULL,
+                reavaliar_em INTEGER,
+                PRIMARY KEY (viatura_id, tipo_manutencao_id)
+            ) WITHOUT ROWID
         ''')
         
-        # Tabela de tipos de manutenção
+        # Leitura dos alertas ativos e varredura dos prazos que venceram
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tipos_manutencao (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT UNIQUE NOT NULL,
-                intervalo_km INTEGER NOT NULL,
-                intervalo_dias INTEGER NOT NULL,
-                descricao TEXT
-            )
+            CREATE INDEX IF NOT EXISTS idx_estado_alertas_status
+            ON estado_alertas (status) WHERE status IS NOT NULL
         ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_estado_alertas_reavaliar
+            ON estado_alertas (reavaliar_em) WHERE reavaliar_em IS NOT NULL
+        ''')
+        
+        if not existia:
+            self._recalcular_alertas(cursor)
+    
+    def _criar_resumos_uso(self, cursor):
+        """Cria os resumos de uso da frota e os preenche a partir do histórico
+        
+        uso_viatura e uso_orgao acumulam os km rodados (diferença entre leituras
+        consecutivas) e as leituras por dia e por mês; uso_manutencoes conta as
+        manutenções por trimestre, órgão, modelo e tipo. Crescem com o número de
+        períodos, não com o histórico.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'uso_viatura'")
+        existia = cursor.fetchone() is not None
         
-        # Tabela de manutenções realizadas
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS manutencoes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TABLE IF NOT EXISTS uso_viatura (
+                granularidade TEXT NOT NULL,
+                periodo TEXT NOT NULL,
                 viatura_id INTEGER NOT NULL,
+                km INTEGER NOT NULL,
+                leituras INTEGER NOT NULL,
+                PRIMARY KEY (granularidade, periodo, viatura_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS uso_orgao (
+                granularidade TEXT NOT NULL,
+                periodo TEXT NOT NULL,
+                orgao TEXT NOT NULL,
+                km INTEGER NOT NULL,
+                leituras INTEGER NOT NULL,
+                PRIMARY KEY (granularidade, periodo, orgao)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS uso_manutencoes (
+                trimestre TEXT NOT NULL,
+                orgao TEXT NOT NULL,
+                modelo TEXT NOT NULL,
                 tipo_manutencao_id INTEGER NOT NULL,
-                odometro_realizada INTEGER NOT NULL,
-                data_realizada TEXT NOT NULL,
-                proximo_odometro INTEGER NOT NULL,
-                proxima_data TEXT NOT NULL,
-                observacoes TEXT,
-                FOREIGN KEY (viatura_id) REFERENCES viaturas (id),
-                FOREIGN KEY (tipo_manutencao_id) REFERENCES tipos_manutencao (id)
+                quantidade INTEGER NOT NULL,
+                PRIMARY KEY (trimestre, orgao, modelo, tipo_manutencao_id)
+            ) WITHOUT ROWID
+        ''')
+        
+        # As manutenções são contadas pelo gatilho; os km, por _acumular_uso
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_manutencoes_uso
+            AFTER INSERT ON manutencoes
+            BEGIN
+                INSERT INTO uso_manutencoes (trimestre, orgao, modelo, tipo_manutencao_id, quantidade)
+                SELECT {_trimestre_sql("NEW.data_realizada")}, orgao, modelo, NEW.tipo_manutencao_id, 1
+                FROM viaturas WHERE id = NEW.viatura_id
+                ON CONFLICT (trimestre, orgao, modelo, tipo_manutencao_id) DO UPDATE SET
+                    quantidade = quantidade + 1;
+            END
+        ''')
+        
+        if not existia:
+            self._preencher_resumos_uso(cursor)
+    
+    def _criar_versoes_viatura(self, cursor):
+        """Cria a tabela versoes_viatura e os gatilhos que a mantêm (ver ReplicaLeitura)
+        
+        Uma linha por viatura com a versão da sua última alteração (cadastro,
+        odômetro, desativação ou estado de alerta). A versão é a maior da
+        tabela mais um: as gravações são serializadas pelo lock de escrita,
+        então as versões crescem na ordem dos commits.
+        
+        Criados só quando a réplica é usada pela primeira vez no banco (ver
+        _ativar_versoes_viatura): sem réplica, as escritas não pagam os gatilhos.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS versoes_viatura (
+                viatura_id INTEGER PRIMARY KEY,
+                versao INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_versoes_viatura_versao
+            ON versoes_viatura (versao)
+        ''')
+        
+        for nome, evento, viatura_id in (
+            ("trg_viaturas_versao_inserir", "AFTER INSERT ON viaturas", "NEW.id"),
+            ("trg_viaturas_versao_alterar", "AFTER UPDATE ON viaturas", "NEW.id"),
+            ("trg_viaturas_versao_remover", "AFTER DELETE ON viaturas", "OLD.id"),
+            ("trg_estado_alertas_versao", "AFTER INSERT ON estado_alertas", "NEW.viatura_id"),
+        ):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {nome}
+                {evento}
+                BEGIN
+                    INSERT INTO versoes_viatura (viatura_id, versao)
+                    VALUES ({viatura_id}, (SELECT IFNULL(MAX(versao), 0) + 1 FROM versoes_viatura))
+                    ON CONFLICT (viatura_id) DO UPDATE SET versao = excluded.versao;
+                END
+            ''')
+    
+    def _criar_busca_textual(self, cursor):
+        """Cria os índices FTS5 da busca de viaturas e os gatilhos que os mantêm
+        
+        busca_viaturas indexa modelo e órgão; busca_manutencoes, as observações.
+        Os textos ficam só nas tabelas de origem (external content): os índices
+        guardam apenas os termos, e os gatilhos os acompanham a cada gravação.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'busca_viaturas'")
+        existia = cursor.fetchone() is not None
+        
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS busca_viaturas USING fts5(
+                modelo, orgao, content = 'viaturas', content_rowid = 'id', {OPCOES_FTS}
+            )
+        ''')
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS busca_manutencoes USING fts5(
+                observacoes, content = 'manutencoes', content_rowid = 'id', {OPCOES_FTS}
+            )
+        ''')
+        
+        # Em external content, a remoção informa os valores antigos da linha
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_viaturas_busca_inserir
+            AFTER INSERT ON viaturas
+            BEGIN
+                INSERT INTO busca_viaturas (rowid, modelo, orgao) VALUES (NEW.id, NEW.modelo, NEW.orgao);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_viaturas_busca_alterar
+            AFTER UPDATE OF modelo, orgao ON viaturas
+            BEGIN
+                INSERT INTO busca_viaturas (busca_viaturas, rowid, modelo, orgao)
+                VALUES ('delete', OLD.id, OLD.modelo, OLD.orgao);
+                INSERT INTO busca_viaturas (rowid, modelo, orgao) VALUES (NEW.id, NEW.modelo, NEW.orgao);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_viaturas_busca_remover
+            AFTER DELETE ON viaturas
+            BEGIN
+                INSERT INTO busca_viaturas (busca_viaturas, rowid, modelo, orgao)
+                VALUES ('delete', OLD.id, OLD.modelo, OLD.orgao);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_manutencoes_busca_inserir
+            AFTER INSERT ON manutencoes
+            BEGIN
+                INSERT INTO busca_manutencoes (rowid, observacoes) VALUES (NEW.id, NEW.observacoes);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_manutencoes_busca_alterar
+            AFTER UPDATE OF observacoes ON manutencoes
+            BEGIN
+                INSERT INTO busca_manutencoes (busca_manutencoes, rowid, observacoes)
+                VALUES ('delete', OLD.id, OLD.observacoes);
+                INSERT INTO busca_manutencoes (rowid, observacoes) VALUES (NEW.id, NEW.observacoes);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_manutencoes_busca_remover
+            AFTER DELETE ON manutencoes
+            BEGIN
+                INSERT INTO busca_manutencoes (busca_manutencoes, rowid, observacoes)
+                VALUES ('delete', OLD.id, OLD.observacoes);
+            END
+        ''')
+        
+        # Migração de bancos existentes: indexar o que já está gravado
+        if not existia:
+            cursor.execute("INSERT INTO busca_viaturas (busca_viaturas) VALUES ('rebuild')")
+            cursor.execute("INSERT INTO busca_manutencoes (busca_manutencoes) VALUES ('rebuild')")
+    
+    def _preencher_resumos_uso(self, cursor):
+        """Calcula os resumos de uso a partir de todo o histórico (tabelas vazias)"""
+        # km pela diferença entre leituras consecutivas na ordem de gravação (a
+        # mesma da validação), precedidas pelo primeiro e último odômetro de cada
+        # período já compactado; a primeira leitura de cada viatura é só o ponto de partida
+        cursor.execute('''
+            INSERT INTO uso_viatura (granularidade, periodo, viatura_id, km, leituras)
+            WITH pontos AS (
+                SELECT viatura_id, data_registro AS data, 1 AS fase, id AS ordem, odometro, 1 AS leituras
+                FROM registros_odometro
+                UNION ALL
+                SELECT viatura_id, primeira_data, 0, primeira_data * 2, primeiro_odometro, 0
+                FROM resumo_odometro
+                UNION ALL
+                SELECT viatura_id, ultima_data, 0, ultima_data * 2 + 1, ultimo_odometro, leituras
+                FROM resumo_odometro
+            ),
+            diferencas AS (
+                SELECT viatura_id, date(data, 'unixepoch', 'localtime') AS dia, leituras,
+                       MAX(0, odometro - COALESCE(LAG(odometro) OVER (
+                           PARTITION BY viatura_id ORDER BY fase, ordem), odometro)) AS km
+                FROM pontos
             )
+            SELECT 'dia', dia, viatura_id, SUM(km), SUM(leituras)
+            FROM diferencas
+            GROUP BY dia, viatura_id
+        ''')
+        cursor.execute('''
+            INSERT INTO uso_viatura (granularidade, periodo, viatura_id, km, leituras)
+            SELECT 'mes', substr(periodo, 1, 8) || '01', viatura_id, SUM(km), SUM(leituras)
+            FROM uso_viatura
+            WHERE granularidade = 'dia'
+            GROUP BY substr(periodo, 1, 8), viatura_id
+        ''')
+        cursor.execute('''
+            INSERT INTO uso_orgao (granularidade, periodo, orgao, km, leituras)
+            SELECT u.granularidade, u.periodo, v.orgao, SUM(u.km), SUM(u.leituras)
+            FROM uso_viatura u
+            JOIN viaturas v ON u.viatura_id = v.id
+            GROUP BY u.granularidade, u.periodo, v.orgao
         ''')
+        cursor.execute(f'''
+            INSERT INTO uso_manutencoes (trimestre, orgao, modelo, tipo_manutencao_id, quantidade)
+            SELECT {_trimestre_sql("m.data_realizada")}, v.orgao, v.modelo, m.tipo_manutencao_id, COUNT(*)
+            FROM manutencoes m
+            JOIN viaturas v ON m.viatura_id = v.id
+            GROUP BY 1, 2, 3, 4
+        ''')
+    
+    @_operacao_escrita
+    def recalcular_resumos_uso(self):
+        """Refaz os resumos de uso a partir do histórico
+        
+        Necessário apenas após alterações feitas diretamente no banco.
+        """
+        with self.transacao() as cursor:
+            for tabela in ("uso_viatura", "uso_orgao", "uso_manutencoes"):
+                cursor.execute(f"DELETE FROM {tabela}")
+            self._preencher_resumos_uso(cursor)
+    
+    def _acumular_uso(self, cursor, leituras: Iterable[Tuple]):
+        """Soma as leituras gravadas (viatura_id, orgao, data, km rodados) aos resumos por dia e mês"""
+        por_viatura, por_orgao = {}, {}
+        periodos = {}  # as leituras de um lote costumam compartilhar a mesma data
+        for viatura_id, orgao, data, km in leituras:
+            if data not in periodos:
+                periodos[data] = tuple(zip(("dia", "mes"), periodos_uso(data)))
+            for granularidade, periodo in periodos[data]:
+                for resumos, chave in ((por_viatura, (granularidade, periodo, viatura_id)),
+                                       (por_orgao, (granularidade, periodo, orgao))):
+                    total = resumos.get(chave)
+                    if total is None:
+                        resumos[chave] = [km, 1]
+                    else:
+                        total[0] += km
+                        total[1] += 1
+        
+        for tabela, coluna, resumos in (("uso_viatura", "viatura_id", por_viatura), ("uso_orgao", "orgao", por_orgao)):
+            cursor.executemany(f'''
+                INSERT INTO {tabela} (granularidade, periodo, {coluna}, km, leituras)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (granularidade, periodo, {coluna}) DO UPDATE SET
+                    km = km + excluded.km,
+                    leituras = leituras + excluded.leituras
+            ''', [(*chave, km, quantidade) for chave, (km, quantidade) in resumos.items()])
+    
+    def _recalcular_alertas(self, cursor, viatura_ids: Optional[Iterable[int]] = None):
+        """Recalcula o estado de alerta e a agenda das viaturas informadas (todas, se None)"""
+        # Status pelo limite mais grave atingido e próximo instante em que a
+        # simples passagem do tempo agrava o status
+        status_sql = " ".join(
+            f"WHEN dias <= {dias} OR km <= {km} THEN '{status}'" for status, dias, km in LIMITES_ALERTA
+        )
+        reavaliar_sql = " ".join(
+            f"WHEN dias > {dias} THEN proxima_data - {dias * 86400}"
+            for _, dias, _ in reversed(LIMITES_ALERTA)
+        )
+        consulta = f'''
+            INSERT OR REPLACE INTO estado_alertas
+                (viatura_id, tipo_manutencao_id, status, km_restantes,
+                 proximo_odometro, proxima_data, reavaliar_em)
+            SELECT viatura_id, tipo_manutencao_id, CASE {status_sql} END, km,
+                   proximo_odometro, proxima_data, CASE {reavaliar_sql} END
+            FROM (
+                SELECT u.viatura_id, u.tipo_manutencao_id, u.proximo_odometro, u.proxima_data,
+                       u.proximo_odometro - v.odometro_atual AS km,
+                       (u.proxima_data - ?) / 86400.0 AS dias
+                FROM ultima_manutencao u
+                JOIN viaturas v ON u.viatura_id = v.id
+                {{filtro}}
+            )
+        '''
+        # Só regrava as linhas da agenda que mudaram; com a quilometragem vencida,
+        # o prazo fica no primeiro instante em que isso foi constatado
+        consulta_agenda = '''
+            INSERT OR REPLACE INTO agenda_vencimentos
+                (viatura_id, tipo_manutencao_id, manutencao_id, orgao, prazo, ativa)
+            SELECT viatura_id, tipo_manutencao_id, manutencao_id, orgao, prazo, ativa
+            FROM (
+                SELECT u.viatura_id, u.tipo_manutencao_id, u.manutencao_id, v.orgao, v.ativa = 1 AS ativa,
+                       CASE
+                           WHEN u.proximo_odometro > v.odometro_atual THEN u.proxima_data
+                           WHEN a.manutencao_id = u.manutencao_id THEN MIN(a.prazo, u.proxima_data, ?)
+                           ELSE MIN(u.proxima_data, ?)
+                       END AS prazo,
+                       a.manutencao_id AS manutencao_anterior, a.orgao AS orgao_anterior,
+                       a.prazo AS prazo_anterior, a.ativa AS ativa_anterior
+                FROM ultima_manutencao u
+                JOIN viaturas v ON u.viatura_id = v.id
+                LEFT JOIN agenda_vencimentos a
+                    ON a.viatura_id = u.viatura_id AND a.tipo_manutencao_id = u.tipo_manutencao_id
+                {filtro}
+            )
+            WHERE manutencao_anterior IS NOT manutencao_id
+               OR orgao_anterior IS NOT orgao
+               OR prazo_anterior IS NOT prazo
+               OR ativa_anterior IS NOT ativa
+        '''
+        agora = int(time.time())
+        
+        if viatura_ids is None:
+            cursor.execute(consulta.format(filtro=""), (agora,))
+            cursor.execute(consulta_agenda.format(filtro=""), (agora, agora))
+            return
+        
+        ids = list(viatura_ids)
+        for i in range(0, len(ids), MAX_PARAMETROS_SQL):
+            parte = ids[i:i + MAX_PARAMETROS_SQL]
+            filtro = f"WHERE u.viatura_id IN ({','.join('?' * len(parte))})"
+            cursor.execute(consulta.format(filtro=filtro), [agora] + parte)
+            cursor.execute(consulta_agenda.format(filtro=filtro), [agora, agora] + parte)
+    
+    @_operacao_escrita
+    def recalcular_alertas(self):
+        """Recalcula o estado de alerta de toda a frota
+        
+        Necessário apenas após alterações feitas diretamente no banco.
+        """
+        with self.transacao() as cursor:
+            self._recalcular_alertas(cursor)
+    
+    @_operacao_escrita
+    def varrer_alertas(self) -> int:
+        """Atualiza os alertas cujo prazo cruzou um limite desde o último cálculo
+        
+        Mantém o status gravado em dia; obter_alertas_manutencao já considera os
+        prazos vencidos na leitura. Rodado periodicamente pelo servidor de telemetria.
+        """
+        agora = int(time.time())
+        consulta = 'SELECT DISTINCT viatura_id FROM estado_alertas WHERE reavaliar_em <= ?'
         
-        conn.commit()
-        
-        # Inserir tipos de manutenção padrão se não existirem
-        self._inserir_tipos_manutencao_padrao(cursor)
-        conn.commit()
-        conn.close()
-    
-    def _inserir_tipos_manutencao_padrao(self, cursor):
-        """Insere os tipos de manutenção padrão no sistema"""
-        tipos_padrao = [
-            ("Revisão Geral", 10000, 180, "Revisão completa do veículo"),
-            ("Troca de Óleo", 10000, 365, "Troca de óleo do motor e filtro"),
-            ("Troca de Filtro de Ar", 10000, 365, "Substituição do filtro de ar"),
-            ("Revisão de Freios", 20000, 365, "Verificação e manutenção do sistema de freios"),
-            ("Troca de Pneus", 40000, 1095, "Substituição dos pneus"),
-            ("Troca de Bateria", 60000, 1460, "Substituição da bateria")
-        ]
-        
-        for nome, km, dias, desc in tipos_padrao:
-            cursor.execute('''
-                INSERT OR IGNORE INTO tipos_manutencao (nome, intervalo_km, intervalo_dias, descricao)
-                VALUES (?, ?, ?, ?)
-            ''', (nome, km, dias, desc))
+        # Consulta rápida fora da transação: na maioria das vezes não há nada a fazer
+        if self.conexao.execute(consulta + ' LIMIT 1', (agora,)).fetchone() is None:
+            return 0
+        
+        with self.transacao() as cursor:
+            viatura_ids = [linha[0] for linha in cursor.execute(consulta, (agora,)).fetchall()]
+            self._recalcular_alertas(cursor, viatura_ids)
+        return len(viatura_ids)
     
+    @_operacao_escrita
     def cadastrar_viatura(self, num_vtr: str, modelo: str, ano: int, orgao: str, odometro_inicial: int = 0) -> bool:
         """Cadastra uma nova viatura no sistema"""
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            data_atual = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            cursor.execute('''
-                INSERT INTO viaturas (num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (num_vtr.upper(), modelo, ano, orgao, odometro_inicial, data_atual))
-            
-            viatura_id = cursor.lastrowid
-            
-            # Registrar odômetro inicial
-            if odometro_inicial > 0:
+            with self.transacao() as cursor:
+                data_atual = int(time.time())
+                
                 cursor.execute('''
-                    INSERT INTO registros_odometro (viatura_id, odometro, data_registro, observacoes)
-                    VALUES (?, ?, ?, ?)
-                ''', (viatura_id, odometro_inicial, data_atual, "Odômetro inicial no cadastro"))
-            
-            conn.commit()
-            conn.close()
+                    INSERT INTO viaturas (num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (num_vtr.upper(), modelo, ano, orgao, odometro_inicial, data_atual))
+                
+                viatura_id = cursor.lastrowid
+                
+                # Registrar odômetro inicial
+                if odometro_inicial > 0:
+                    cursor.execute('''
+                        INSERT INTO registros_odometro (viatura_id, odometro, data_registro, observacoes)
+                        VALUES (?, ?, ?, ?)
+                    ''', (viatura_id, odometro_inicial, data_atual, "Odômetro inicial no cadastro"))
+                    self._acumular_uso(cursor, [(viatura_id, orgao, data_atual, 0)])
+            self._cache_viaturas.invalidar(num_vtr.upper())
             return True
         except sqlite3.IntegrityError:
             return False
     
-    def atualizar_odometro(self, num_vtr: str, novo_odometro: int, observacoes: str = "") -> bool:
-        """Atualiza o odômetro de uma viatura"""
-        try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
+    @_operacao_escrita
+    def atualizar_odometro(self, num_vtr: str, novo_odometro: int, observacoes: str = "",
+                           chave: Optional[str] = None) -> "ResultadoLeitura":
+        """Atualiza o odômetro de uma viatura e retorna o ResultadoLeitura
+        
+        A leitura só é gravada se não for menor que o odômetro atual: a
+        verificação está no próprio INSERT do histórico, que devolve o órgão e
+        o odômetro anterior da viatura (nenhuma linha se a leitura foi recusada).
+        Com `chave` (ver chave_de_leitura), a leitura é aplicada uma única vez:
+        repetições dentro da janela de retenção retornam REPETIDA sem alterar nada.
+        """
+        if chave is not None:
+            chave = str(chave)
+            if self._chaves_registradas(self.conexao, [chave]):
+                return ResultadoLeitura.REPETIDA
+        
+        viatura = self._viatura_em_cache(num_vtr)
+        if viatura is None or not viatura[1]:
+            return ResultadoLeitura.VIATURA_NAO_ENCONTRADA
+        viatura_id = viatura[0]
+        
+        with self.transacao() as cursor:
+            # Aplicada por outra conexão desde a verificação acima
+            if chave is not None and self._chaves_registradas(cursor, [chave]):
+                return ResultadoLeitura.REPETIDA
             
-            # Verificar se a viatura existe e obter odômetro atual
-            cursor.execute('SELECT id, odometro_atual FROM viaturas WHERE num_vtr = ? AND ativa = 1', (num_vtr.upper(),))
+            data_atual = int(time.time())
+            
+            # Registrar a leitura só se a viatura estiver ativa (o cache pode estar
+            # desatualizado) e o odômetro não diminuir; os subselects do RETURNING
+            # ainda enxergam a viatura antes do UPDATE abaixo
+            cursor.execute('''
+                INSERT INTO registros_odometro (viatura_id, odometro, data_registro, observacoes)
+                SELECT id, ?, ?, ? FROM viaturas
+                WHERE id = ? AND ativa = 1 AND odometro_atual <= ?
+                RETURNING (SELECT orgao FROM viaturas WHERE id = viatura_id),
+                          (SELECT odometro_atual FROM viaturas WHERE id = viatura_id)
+            ''', (novo_odometro, data_atual, observacoes, viatura_id, novo_odometro))
             resultado = cursor.fetchone()
             
-            if not resultado:
-                conn.close()
-                return False
+            if resultado is None:
+                cursor.execute('SELECT 1 FROM viaturas WHERE id = ? AND ativa = 1', (viatura_id,))
+                if cursor.fetchone() is None:
+                    return ResultadoLeitura.VIATURA_NAO_ENCONTRADA
+                return ResultadoLeitura.DESATUALIZADA  # Odômetro não pode diminuir
             
-            viatura_id, odometro_atual = resultado
+            orgao, odometro_atual = resultado
             
-            if novo_odometro < odometro_atual:
-                conn.close()
-                return False  # Odômetro não pode diminuir
+            cursor.execute('UPDATE viaturas SET odometro_atual = ? WHERE id = ?', (novo_odometro, viatura_id))
             
-            data_atual = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if chave is not None:
+                cursor.execute('INSERT INTO leituras_recebidas (chave, data_recebida) VALUES (?, ?)',
+                               (chave, data_atual))
             
-            # Atualizar odômetro na viatura
-            cursor.execute('''
-                UPDATE viaturas SET odometro_atual = ? WHERE id = ?
-            ''', (novo_odometro, viatura_id))
+            self._acumular_uso(cursor, [(viatura_id, orgao, data_atual, novo_odometro - odometro_atual)])
+            self._recalcular_alertas(cursor, [viatura_id])
+        return ResultadoLeitura.ACEITA
+    
+    @_operacao_escrita
+    def atualizar_odometro_lote(self, leituras: Iterable, tamanho_bloco: int = TAMANHO_BLOCO_LOTE) -> List[Tuple]:
+        """Atualiza o odômetro de várias viaturas em transações por bloco
+        
+        Cada leitura é uma tupla (num_vtr, odometro[, observacoes[, data[, chave]]]), com a
+        data como datetime, texto ISO ou epoch.
+        As leituras de uma mesma viatura são validadas na ordem recebida e
+        nunca podem diminuir. Retorna uma lista (indice, num_vtr, aceita, motivo).
+        Leituras com uma chave já aplicada são aceitas com o motivo
+        "leitura repetida", sem gravar nada (ver chave_de_leitura).
+        """
+        relatorio = []
+        bloco = []
+        
+        for indice, leitura in enumerate(leituras):
+            bloco.append((indice, leitura))
+            if len(bloco) >= tamanho_bloco:
+                relatorio.extend(self._gravar_bloco_odometro(bloco))
+                bloco = []
+        
+        if bloco:
+            relatorio.extend(self._gravar_bloco_odometro(bloco))
+        
+        return relatorio
+    
+    def _gravar_bloco_odometro(self, bloco: List[Tuple]) -> List[Tuple]:
+        """Valida e grava um bloco de leituras em uma única transação"""
+        relatorio = []
+        data_atual = int(time.time())
+        
+        chaves = {indice: str(leitura[4]) for indice, leitura in bloco
+                  if leitura and len(leitura) > 4 and leitura[4] not in (None, "")}
+        if chaves:
+            # Repetições de leituras já aplicadas são confirmadas sem abrir a transação de escrita
+            registradas = self._chaves_registradas(self.conexao, chaves.values())
+            for indice, leitura in bloco:
+                if chaves.get(indice) in registradas:
+                    relatorio.append((indice, str(leitura[0]).upper(), True, "leitura repetida"))
+            bloco = [(indice, leitura) for indice, leitura in bloco if chaves.get(indice) not in registradas]
+            if not bloco:
+                return relatorio
+        
+        with self.transacao() as cursor:
+            # Obter o odômetro atual de todas as viaturas do bloco de uma só vez
+            estado = self._carregar_viaturas_ativas(cursor, (leitura[0] for _, leitura in bloco if leitura))
+            # Chaves aplicadas por outra conexão desde a verificação acima
+            registradas = self._chaves_registradas(cursor, (chaves[i] for i, _ in bloco if i in chaves))
             
-            # Registrar a atualização
-            cursor.execute('''
+            registros = []
+            usos = []
+            novas_chaves = []
+            for indice, leitura in bloco:
+                num_vtr = str(leitura[0]).upper() if leitura else ""
+                chave = chaves.get(indice)
+                if chave is not None and chave in registradas:
+                    relatorio.append((indice, num_vtr, True, "leitura repetida"))
+                    continue
+                try:
+                    odometro = int(leitura[1])
+                except (IndexError, TypeError, ValueError):
+                    relatorio.append((indice, num_vtr, False, "odômetro inválido"))
+                    continue
+                
+                atual = estado.get(num_vtr)
+                if atual is None:
+                    relatorio.append((indice, num_vtr, False, "viatura não encontrada"))
+                    continue
+                if odometro < atual[1]:
+                    relatorio.append((indice, num_vtr, False, "odômetro menor que o atual"))
+                    continue
+                
+                observacoes = leitura[2] if len(leitura) > 2 and leitura[2] is not None else ""
+                try:
+                    data = data_para_epoch(leitura[3]) if len(leitura) > 3 and leitura[3] else data_atual
+                except (TypeError, ValueError):
+                    relatorio.append((indice, num_vtr, False, "data inválida"))
+                    continue
+                
+                usos.append((atual[0], atual[2], data, odometro - atual[1]))
+                atual[1] = odometro
+                registros.append((atual[0], odometro, data, observacoes))
+                relatorio.append((indice, num_vtr, True, None))
+                if chave is not None:
+                    registradas.add(chave)  # Repetições dentro do próprio bloco
+                    novas_chaves.append((chave, data_atual))
+            
+            cursor.executemany('''
                 INSERT INTO registros_odometro (viatura_id, odometro, data_registro, observacoes)
                 VALUES (?, ?, ?, ?)
-            ''', (viatura_id, novo_odometro, data_atual, observacoes))
+            ''', registros)
+            cursor.executemany('INSERT INTO leituras_recebidas (chave, data_recebida) VALUES (?, ?)', novas_chaves)
             
-            conn.commit()
-            conn.close()
-            return True
-        except Exception:
-            return False
+            # Apenas o último odômetro aceito de cada viatura precisa ser gravado
+            alteradas = {r[0] for r in registros}
+            cursor.executemany(
+                'UPDATE viaturas SET odometro_atual = ? WHERE id = ?',
+                [(odometro, viatura_id) for viatura_id, odometro, _ in estado.values() if viatura_id in alteradas]
+            )
+            
+            self._acumular_uso(cursor, usos)
+            self._recalcular_alertas(cursor, alteradas)
+        
+        if chaves:
+            relatorio.sort(key=lambda item: item[0])
+        return relatorio
+    
+    @staticmethod
+    def _chaves_registradas(cursor, chaves: Iterable[str]) -> set:
+        """Chaves de idempotência já gravadas em leituras_recebidas, em consultas por lote"""
+        chaves = list(set(chaves))
+        registradas = set()
+        for i in range(0, len(chaves), MAX_PARAMETROS_SQL):
+            parte = chaves[i:i + MAX_PARAMETROS_SQL]
+            registradas.update(linha[0] for linha in cursor.execute(
+                f'SELECT chave FROM leituras_recebidas WHERE chave IN ({",".join("?" * len(parte))})', parte))
+        return registradas
     
+    @staticmethod
+    def _carregar_viaturas_ativas(cursor, numeros: Iterable) -> dict:
+        """Retorna {num_vtr: [id, odometro_atual, orgao]} das viaturas ativas, em consultas por lote"""
+        numeros = list({str(num_vtr).upper() for num_vtr in numeros})
+        estado = {}
+        for i in range(0, len(numeros), MAX_PARAMETROS_SQL):
+            parte = numeros[i:i + MAX_PARAMETROS_SQL]
+            cursor.execute(f'''
+                SELECT num_vtr, id, odometro_atual, orgao FROM viaturas
+                WHERE ativa = 1 AND num_vtr IN ({",".join("?" * len(parte))})
+            ''', parte)
+            for num_vtr, viatura_id, odometro_atual, orgao in cursor:
+                estado[num_vtr] = [viatura_id, odometro_atual, orgao]
+        return estado
+    
+    @_operacao_escrita
     def registrar_manutencao(self, num_vtr: str, tipo_manutencao: str, data_manutencao: datetime.datetime, observacoes: str = "") -> bool:
         """Registra uma manutenção realizada"""
-        try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            # Obter dados da viatura
-            cursor.execute('SELECT id, odometro_atual FROM viaturas WHERE num_vtr = ? AND ativa = 1', (num_vtr.upper(),))
+        viatura = self._viatura_em_cache(num_vtr)
+        tipo = self._tipo_em_cache(tipo_manutencao)
+        if viatura is None or not viatura[1] or tipo is None:
+            return False
+        viatura_id = viatura[0]
+        tipo_id, intervalo_km, intervalo_dias = tipo
+        
+        with self.transacao() as cursor:
+            # Obter odômetro atual (ativa é conferida de novo: o cache pode estar desatualizado)
+            cursor.execute('SELECT odometro_atual FROM viaturas WHERE id = ? AND ativa = 1', (viatura_id,))
             viatura_resultado = cursor.fetchone()
             
             if not viatura_resultado:
-                conn.close()
                 return False
             
-            viatura_id, odometro_atual = viatura_resultado
-            
-            # Obter dados do tipo de manutenção
-            cursor.execute('SELECT id, intervalo_km, intervalo_dias FROM tipos_manutencao WHERE nome = ?', (tipo_manutencao,))
-            tipo_resultado = cursor.fetchone()
-            
-            if not tipo_resultado:
-                conn.close()
-                return False
-            
-            tipo_id, intervalo_km, intervalo_dias = tipo_resultado
+            odometro_atual = viatura_resultado[0]
             
             # Usar a data recebida como parâmetro
-            data_str = data_manutencao.strftime("%Y-%m-%d %H:%M:%S")
+            data_realizada = data_para_epoch(data_manutencao)
             
             # Calcular próxima manutenção
             proximo_odometro = odometro_atual + intervalo_km
-            proxima_data = data_manutencao + datetime.timedelta(days=intervalo_dias)
-            proxima_data_str = proxima_data.strftime("%Y-%m-%d %H:%M:%S")
+            proxima_data = data_para_epoch(data_manutencao + datetime.timedelta(days=intervalo_dias))
             
             # Registrar manutenção
             cursor.execute('''
                 INSERT INTO manutencoes (viatura_id, tipo_manutencao_id, odometro_realizada, 
                                        data_realizada, proximo_odometro, proxima_data, observacoes)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (viatura_id, tipo_id, odometro_atual, data_str, proximo_odometro, proxima_data_str, observacoes))
+            ''', (viatura_id, tipo_id, odometro_atual, data_realizada, proximo_odometro, proxima_data, observacoes))
             
-            conn.commit()
-            conn.close()
-            return True
-        except Exception:
-            return False
+            self._recalcular_alertas(cursor, [viatura_id])
+        return True
+    
+    @_operacao_escrita
+    def registrar_manutencao_lote(self, manutencoes: Iterable, tamanho_bloco: int = TAMANHO_BLOCO_LOTE) -> List[Tuple]:
+        """Registra várias manutenções (ex.: campanhas de troca de óleo) em transações por bloco
+        
+        Cada item é uma tupla (num_vtr, tipo_manutencao[, data[, observacoes]]),
+        com a data como datetime, texto ISO ou epoch (padrão: agora). Os tipos
+        e os odômetros das viaturas são lidos uma única vez por bloco.
+        Retorna uma lista (indice, num_vtr, aceita, motivo).
+        """
+        relatorio = []
+        bloco = []
+        
+        for indice, manutencao in enumerate(manutencoes):
+            bloco.append((indice, manutencao))
+            if len(bloco) >= tamanho_bloco:
+                relatorio.extend(self._gravar_bloco_manutencoes(bloco))
+                bloco = []
+        
+        if bloco:
+            relatorio.extend(self._gravar_bloco_manutencoes(bloco))
+        
+        return relatorio
+    
+    def _gravar_bloco_manutencoes(self, bloco: List[Tuple]) -> List[Tuple]:
+        """Valida e grava um bloco de manutenções em uma única transação"""
+        relatorio = []
+        data_atual = int(time.time())
+        
+        with self.transacao() as cursor:
+            tipos = {nome: self._tipo_em_cache(nome)
+                     for nome in {item[1] for _, item in bloco if item and len(item) > 1 and isinstance(item[1], str)}}
+            estado = self._carregar_viaturas_ativas(cursor, (item[0] for _, item in bloco if item))
+            
+            registros = []
+            for indice, item in bloco:
+                num_vtr = str(item[0]).upper() if item else ""
+                if len(item or ()) < 2 or not isinstance(item[1], str):
+                    relatorio.append((indice, num_vtr, False, "registro inválido"))
+                    continue
+                
+                viatura = estado.get(num_vtr)
+                if viatura is None:
+                    relatorio.append((indice, num_vtr, False, "viatura não encontrada"))
+                    continue
+                
+                tipo = tipos.get(item[1])
+                if tipo is None:
+                    relatorio.append((indice, num_vtr, False, "tipo de manutenção não encontrado"))
+                    continue
+                
+                try:
+                    data = data_para_epoch(item[2]) if len(item) > 2 and item[2] else data_atual
+                except (TypeError, ValueError):
+                    relatorio.append((indice, num_vtr, False, "data inválida"))
+                    continue
+                
+                viatura_id, odometro_atual, _ = viatura
+                tipo_id, intervalo_km, intervalo_dias = tipo
+                proxima_data = data_para_epoch(epoch_para_data(data) + datetime.timedelta(days=intervalo_dias))
+                observacoes = item[3] if len(item) > 3 and item[3] is not None else ""
+                
+                registros.append((viatura_id, tipo_id, odometro_atual, data,
+                                  odometro_atual + intervalo_km, proxima_data, observacoes))
+                relatorio.append((indice, num_vtr, True, None))
+            
+            cursor.executemany('''
+                INSERT INTO manutencoes (viatura_id, tipo_manutencao_id, odometro_realizada,
+                                         data_realizada, proximo_odometro, proxima_data, observacoes)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', registros)
+            
+            self._recalcular_alertas(cursor, {registro[0] for registro in registros})
+        
+        return relatorio
     
     def listar_viaturas(self) -> List[Tuple]:
         """Lista todas as viaturas ativas"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        if self.replica_leitura:
+            return self._replica_sincronizada().listar_viaturas()
+        
+        cursor = self.conexao.cursor()
         
         cursor.execute('''
             SELECT num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro
@@ -221,62 +1770,437 @@ class SistemaGerenciamentoFrota:
             ORDER BY num_vtr
         ''')
         
-        resultado = cursor.fetchall()
-        conn.close()
-        return resultado
+        return cursor.fetchall()
+    
+    def pagina_viaturas(self, apos: Optional[str] = None, limite: int = TAMANHO_PAGINA,
+                        orgao: Optional[str] = None, ativa: Optional[bool] = True) -> Tuple[List[Tuple], Optional[str]]:
+        """Retorna uma página de viaturas ordenada por num_vtr e o cursor da próxima
+        
+        `apos` é o cursor devolvido pela página anterior (None na primeira);
+        o cursor devolvido é None quando não há mais páginas. ativa=None lista
+        ativas e inativas.
+        """
+        condicoes, parametros = [], []
+        if apos is not None:
+            condicoes.append("num_vtr > ?")
+            parametros.append(apos)
+        if orgao is not None:
+            condicoes.append("orgao = ?")
+            parametros.append(orgao)
+        if ativa is not None:
+            condicoes.append("ativa = ?")
+            parametros.append(1 if ativa else 0)
+        
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        cursor = self.conexao.cursor()
+        cursor.execute(f'''
+            SELECT num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro
+            FROM viaturas
+            {where}
+            ORDER BY num_vtr
+            LIMIT ?
+        ''', parametros + [limite])
+        
+        linhas = cursor.fetchall()
+        return linhas, (linhas[-1][0] if len(linhas) == limite else None)
+    
+    def iterar_viaturas(self, orgao: Optional[str] = None, ativa: Optional[bool] = True,
+                        tamanho_pagina: int = TAMANHO_PAGINA) -> Iterator[Tuple]:
+        """Percorre as viaturas por páginas, sem carregar a tabela inteira"""
+        return self._iterar_paginas(self.pagina_viaturas, tamanho_pagina, orgao=orgao, ativa=ativa)
+    
+    def buscar_por_prefixo(self, prefixo: str, limite: int = TAMANHO_BUSCA,
+                           ativa: Optional[bool] = True) -> List[Tuple]:
+        """Viaturas cujo número começa com o prefixo (ex.: "PM-00"), em ordem de num_vtr
+        
+        Percorre só o trecho do índice de num_vtr que começa com o prefixo.
+        Retorna as mesmas colunas de pagina_viaturas; ativa=None inclui as inativas.
+        """
+        prefixo = prefixo.strip().upper()
+        condicoes, parametros = ["num_vtr >= ?"], [prefixo]
+        if prefixo:
+            # Primeiro texto maior que todos os que começam com o prefixo
+            condicoes.append("num_vtr < ?")
+            parametros.append(prefixo[:-1] + chr(ord(prefixo[-1]) + 1))
+        if ativa is not None:
+            condicoes.append("ativa = ?")
+            parametros.append(1 if ativa else 0)
+        
+        return self.conexao.execute(f'''
+            SELECT num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro
+            FROM viaturas
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY num_vtr
+            LIMIT ?
+        ''', parametros + [limite]).fetchall()
+    
+    def buscar_viaturas(self, texto: str, limite: int = TAMANHO_BUSCA) -> List[Tuple]:
+        """Busca textual nas viaturas ativas: modelo, órgão e observações das manutenções
+        
+        Todas as palavras precisam estar no cadastro da viatura ou em uma mesma
+        observação, sem diferenciar acentos e maiúsculas; a última também casa
+        como início de palavra ("ole" encontra "Óleo"). Retorna (num_vtr,
+        modelo, ano, orgao, relevancia, trecho), da mais para a menos relevante:
+        relevancia é o bm25 do FTS5 (menor é melhor) e trecho é a observação
+        encontrada, com os termos entre [ ] (None quando a viatura foi
+        encontrada pelo modelo ou órgão).
+        """
+        consulta = _expressao_fts(texto)
+        if consulta is None:
+            return []
+        
+        ocorrencias = limite * OCORRENCIAS_POR_RESULTADO
+        cursor = self.conexao.cursor()
+        encontradas = self._buscar_no_indice(cursor, "busca_viaturas", consulta, ocorrencias)
+        
+        notas = self._buscar_no_indice(cursor, "busca_manutencoes", consulta, ocorrencias,
+                                       "snippet(busca_manutencoes, 0, '[', ']', '...', 12)")
+        viatura_da_nota = {}
+        for i in range(0, len(notas), MAX_PARAMETROS_SQL):
+            parte = [nota[0] for nota in notas[i:i + MAX_PARAMETROS_SQL]]
+            cursor.execute(f'''
+                SELECT id, viatura_id FROM manutencoes WHERE id IN ({','.join('?' * len(parte))})
+            ''', parte)
+            viatura_da_nota.update(cursor.fetchall())
+        encontradas.extend((viatura_da_nota[rowid], relevancia, trecho) for rowid, relevancia, trecho in notas)
+        
+        # Melhor ocorrência de cada viatura, da mais para a menos relevante
+        melhores = {}
+        for viatura_id, relevancia, trecho in sorted(encontradas, key=lambda ocorrencia: ocorrencia[1]):
+            melhores.setdefault(viatura_id, (relevancia, trecho))
+        
+        ids = list(melhores)
+        viaturas = {}
+        for i in range(0, len(ids), MAX_PARAMETROS_SQL):
+            parte = ids[i:i + MAX_PARAMETROS_SQL]
+            cursor.execute(f'''
+                SELECT id, num_vtr, modelo, ano, orgao FROM viaturas
+                WHERE id IN ({','.join('?' * len(parte))}) AND ativa = 1
+            ''', parte)
+            viaturas.update((linha[0], linha[1:]) for linha in cursor.fetchall())
+        
+        resultado = [(*viaturas[viatura_id], *melhores[viatura_id]) for viatura_id in ids if viatura_id in viaturas]
+        return resultado[:limite]
+    
+    @staticmethod
+    def _buscar_no_indice(cursor, tabela: str, consulta: str, limite: int, trecho: str = "NULL") -> List[Tuple]:
+        """(rowid, relevancia, trecho) das ocorrências mais relevantes em um índice FTS5
+        
+        O bm25 lê o tamanho de cada linha encontrada: com mais de
+        OCORRENCIAS_RANQUEADAS ocorrências, só as mais recentes (maior rowid)
+        são ranqueadas, e a busca continua levando milissegundos.
+        """
+        corte = cursor.execute(f'''
+            SELECT rowid FROM {tabela}
+            WHERE {tabela} MATCH ?
+            ORDER BY rowid DESC
+            LIMIT 1 OFFSET ?
+        ''', (consulta, OCORRENCIAS_RANQUEADAS - 1)).fetchone()
+        
+        # O FTS5 ordena por rank antes do LIMIT: o trecho só é montado para as linhas retornadas
+        cursor.execute(f'''
+            SELECT rowid, rank, {trecho} FROM {tabela}
+            WHERE {tabela} MATCH ? AND rowid >= ?
+            ORDER BY rank
+            LIMIT ?
+        ''', (consulta, corte[0] if corte else 0, limite))
+        return cursor.fetchall()
+    
+    @staticmethod
+    def _iterar_paginas(pagina, tamanho_pagina: int, *args, **kwargs) -> Iterator[Tuple]:
+        """Gera as linhas de uma função de página até o cursor acabar"""
+        apos = None
+        while True:
+            linhas, apos = pagina(*args, apos=apos, limite=tamanho_pagina, **kwargs)
+            yield from linhas
+            if apos is None:
+                return
     
     def obter_alertas_manutencao(self, dias_antecedencia: int = 30, km_antecedencia: int = 500) -> List[Tuple]:
-        """Obtém alertas de manutenções próximas do vencimento"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        """Obtém alertas de manutenções próximas do vencimento
         
-        data_limite = datetime.datetime.now() + datetime.timedelta(days=dias_antecedencia)
-        data_limite_str = data_limite.strftime("%Y-%m-%d %H:%M:%S")
+        Só lê o banco. Com os limites padrão, os alertas vêm de estado_alertas:
+        os que já têm status e os que entraram no prazo desde o último cálculo
+        (reavaliar_em vencido), ainda não gravados por varrer_alertas.
+        """
+        _, limite_dias, limite_km = LIMITES_ALERTA[-1]
+        if dias_antecedencia != limite_dias or km_antecedencia != limite_km:
+            return self._calcular_alertas_manutencao(dias_antecedencia, km_antecedencia)
+        
+        agora = int(time.time())
+        if self.replica_leitura:
+            return self._replica_sincronizada().obter_alertas(agora)
+        
+        cursor = self.conexao.cursor()
         
         cursor.execute('''
             SELECT v.num_vtr, v.modelo, v.odometro_atual, tm.nome, 
-                   m.proximo_odometro, m.proxima_data,
-                   (m.proximo_odometro - v.odometro_atual) as km_restantes,
-                   julianday(m.proxima_data) - julianday('now') as dias_restantes
-            FROM manutencoes m
-            JOIN viaturas v ON m.viatura_id = v.id
-            JOIN tipos_manutencao tm ON m.tipo_manutencao_id = tm.id
+                   e.proximo_odometro, e.proxima_data,
+                   (e.proximo_odometro - v.odometro_atual) as km_restantes,
+                   (e.proxima_data - :agora) / 86400.0 as dias_restantes
+            FROM (
+                SELECT viatura_id, tipo_manutencao_id, proximo_odometro, proxima_data
+                FROM estado_alertas WHERE status IS NOT NULL
+                UNION ALL
+                SELECT viatura_id, tipo_manutencao_id, proximo_odometro, proxima_data
+                FROM estado_alertas WHERE reavaliar_em <= :agora AND status IS NULL
+            ) e
+            JOIN viaturas v ON e.viatura_id = v.id
+            JOIN tipos_manutencao tm ON e.tipo_manutencao_id = tm.id
+            WHERE v.ativa = 1
+            ORDER BY dias_restantes, km_restantes
+        ''', {"agora": agora})
+        
+        return cursor.fetchall()
+    
+    def _calcular_alertas_manutencao(self, dias_antecedencia: int, km_antecedencia: int) -> List[Tuple]:
+        """Calcula os alertas com limites personalizados a partir de ultima_manutencao"""
+        cursor = self.conexao.cursor()
+        
+        agora = int(time.time())
+        data_limite = agora + dias_antecedencia * 86400
+        
+        cursor.execute('''
+            SELECT v.num_vtr, v.modelo, v.odometro_atual, tm.nome, 
+                   u.proximo_odometro, u.proxima_data,
+                   (u.proximo_odometro - v.odometro_atual) as km_restantes,
+                   (u.proxima_data - ?) / 86400.0 as dias_restantes
+            FROM ultima_manutencao u
+            JOIN viaturas v ON u.viatura_id = v.id
+            JOIN tipos_manutencao tm ON u.tipo_manutencao_id = tm.id
             WHERE v.ativa = 1 
-            AND (m.proxima_data <= ? OR (m.proximo_odometro - v.odometro_atual) <= ?)
-            AND m.id IN (
-                SELECT MAX(id) FROM manutencoes 
-                WHERE viatura_id = m.viatura_id AND tipo_manutencao_id = m.tipo_manutencao_id
-            )
+            AND (u.proxima_data <= ? OR (u.proximo_odometro - v.odometro_atual) <= ?)
             ORDER BY dias_restantes, km_restantes
-        ''', (data_limite_str, km_antecedencia))
+        ''', (agora, data_limite, km_antecedencia))
+        
+        return cursor.fetchall()
+    
+    def estado_em(self, data, num_vtr: Optional[str] = None, orgao: Optional[str] = None) -> List[Tuple]:
+        """Odômetro e status de cada manutenção das viaturas na data informada (auditoria)
+        
+        Considera as viaturas cadastradas até a data (ativas ou não hoje), a
+        última leitura até ela (inclusive das leituras compactadas) e a última
+        manutenção de cada tipo realizada até ela. Retorna (num_vtr, orgao,
+        odometro, manutencao, data_realizada, proximo_odometro, proxima_data,
+        km_restantes, dias_restantes, status) em ordem de viatura; viaturas sem
+        manutenções aparecem uma vez, com os campos da manutenção em None.
+        Cada viatura custa algumas buscas em índices, sem varrer o histórico.
+        """
+        instante = data_para_epoch(data)
+        filtros, parametros = "", {"instante": instante}
+        if num_vtr is not None:
+            filtros += " AND v.num_vtr = :num_vtr"
+            parametros["num_vtr"] = num_vtr.upper()
+        if orgao is not None:
+            filtros += " AND v.orgao = :orgao"
+            parametros["orgao"] = orgao
+        
+        # Dentro de um período compactado só se conhece a primeira leitura antes do instante
+        linhas = self.conexao.execute(f'''
+            WITH frota AS MATERIALIZED (
+                SELECT v.id, v.num_vtr, v.orgao, COALESCE((
+                    SELECT odometro FROM (
+                        SELECT * FROM (
+                            SELECT odometro, data_registro AS data FROM registros_odometro
+                            WHERE viatura_id = v.id AND data_registro <= :instante
+                            ORDER BY data_registro DESC, id DESC LIMIT 1
+                        )
+                        UNION ALL
+                        SELECT * FROM (
+                            SELECT ultimo_odometro, ultima_data FROM resumo_odometro
+                            WHERE viatura_id = v.id AND ultima_data <= :instante
+                            ORDER BY ultima_data DESC LIMIT 1
+                        )
+                        UNION ALL
+                        SELECT * FROM (
+                            SELECT primeiro_odometro, primeira_data FROM resumo_odometro
+                            WHERE viatura_id = v.id AND ultima_data > :instante AND primeira_data <= :instante
+                            ORDER BY ultima_data LIMIT 1
+                        )
+                    )
+                    ORDER BY data DESC LIMIT 1
+                ), 0) AS odometro
+                FROM viaturas v
+                WHERE v.data_cadastro <= :instante{filtros}
+            ),
+            ultimas AS MATERIALIZED (
+                SELECT f.id AS viatura_id, tm.nome, (
+                    SELECT m.id FROM manutencoes m
+                    WHERE m.viatura_id = f.id AND m.tipo_manutencao_id = tm.id AND m.data_realizada <= :instante
+                    ORDER BY m.data_realizada DESC, m.id DESC LIMIT 1
+                ) AS manutencao_id
+                FROM frota f CROSS JOIN tipos_manutencao tm
+            )
+            SELECT f.num_vtr, f.orgao, f.odometro, u.nome, m.data_realizada, m.proximo_odometro, m.proxima_data,
+                   m.proximo_odometro - f.odometro AS km_restantes,
+                   (m.proxima_data - :instante) / 86400.0 AS dias_restantes
+            FROM frota f
+            LEFT JOIN ultimas u ON u.viatura_id = f.id AND u.manutencao_id IS NOT NULL
+            LEFT JOIN manutencoes m ON m.id = u.manutencao_id
+            ORDER BY f.num_vtr, u.nome
+        ''', parametros).fetchall()
+        
+        return [(*linha, None if linha[3] is None else classificar_alerta(linha[7], linha[8]))
+                for linha in linhas]
+    
+    def _agenda_sincronizada(self) -> AgendaVencimentos:
+        """Carrega a agenda em memória ou aplica as linhas regravadas desde a última consulta"""
+        with self._lock_agenda:
+            if self._agenda is None:
+                agenda = AgendaVencimentos()
+            else:
+                agenda = self._agenda
+            
+            # Inclui as escritas feitas por outras conexões e processos
+            cursor = self.conexao.execute('''
+                SELECT id, viatura_id, tipo_manutencao_id, orgao, prazo, ativa
+                FROM agenda_vencimentos
+                WHERE id > ?
+            ''', (agenda.ultimo_id,))
+            agenda.aplicar(cursor)
+            self._agenda = agenda
+            return agenda
+    
+    @_operacao_escrita
+    def _ativar_versoes_viatura(self):
+        """Cria versoes_viatura e seus gatilhos se ainda não existirem no banco"""
+        if self.conexao.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_estado_alertas_versao'"
+        ).fetchone() is not None:
+            return
+        with self.transacao() as cursor:
+            self._criar_versoes_viatura(cursor)
+    
+    def _replica_sincronizada(self) -> ReplicaLeitura:
+        """Carrega a réplica de leitura ou aplica as viaturas alteradas desde a última consulta"""
+        with self._lock_replica:
+            cursor = self.conexao.cursor()
+            if self._replica is None:
+                # Os gatilhos passam a valer para todas as conexões, inclusive de outros processos
+                self._ativar_versoes_viatura()
+                replica = ReplicaLeitura()
+                replica.carregar_tipos(cursor.execute(
+                    'SELECT id, nome, intervalo_km, intervalo_dias, descricao FROM tipos_manutencao'))
+                # A versão vem antes das linhas: o que mudar depois é reaplicado na próxima consulta
+                versao = cursor.execute('SELECT IFNULL(MAX(versao), 0) FROM versoes_viatura').fetchone()[0]
+                viaturas = cursor.execute('''
+                    SELECT id, num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro, ativa FROM viaturas
+                ''').fetchall()
+                alertas = cursor.execute('''
+                    SELECT viatura_id, tipo_manutencao_id, proximo_odometro, proxima_data,
+                           reavaliar_em, status IS NOT NULL
+                    FROM estado_alertas
+                    WHERE status IS NOT NULL OR reavaliar_em IS NOT NULL
+                ''').fetchall()
+                replica.aplicar(versao, [linha[0] for linha in viaturas], viaturas, alertas)
+                self._replica = replica
+                return replica
+            
+            # Inclui as escritas feitas por outras conexões e processos
+            replica = self._replica
+            alteradas = cursor.execute(
+                'SELECT viatura_id, versao FROM versoes_viatura WHERE versao > ?', (replica.versao,)
+            ).fetchall()
+            if not alteradas:
+                return replica
+            
+            ids = [viatura_id for viatura_id, _ in alteradas]
+            viaturas, alertas = [], []
+            for i in range(0, len(ids), MAX_PARAMETROS_SQL):
+                parte = ids[i:i + MAX_PARAMETROS_SQL]
+                marcadores = ",".join("?" * len(parte))
+                viaturas.extend(cursor.execute(f'''
+                    SELECT id, num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro, ativa
+                    FROM viaturas
+                    WHERE id IN ({marcadores})
+                ''', parte))
+                alertas.extend(cursor.execute(f'''
+                    SELECT viatura_id, tipo_manutencao_id, proximo_odometro, proxima_data,
+                           reavaliar_em, status IS NOT NULL
+                    FROM estado_alertas
+                    WHERE viatura_id IN ({marcadores}) AND (status IS NOT NULL OR reavaliar_em IS NOT NULL)
+                ''', parte))
+            replica.aplicar(max(versao for _, versao in alteradas), ids, viaturas, alertas)
+            return replica
+    
+    def estatisticas_replica(self) -> Optional[dict]:
+        """Memória ocupada e sincronizações da réplica de leitura (None se ela estiver desativada)"""
+        if not self.replica_leitura:
+            return None
+        replica = self._replica_sincronizada()
+        estatisticas = replica.memoria()
+        estatisticas.update(versao=replica.versao, sincronizacoes=replica.sincronizacoes,
+                            viaturas_recarregadas=replica.viaturas_recarregadas)
+        return estatisticas
+    
+    def proximos_vencimentos(self, quantidade: Optional[int] = 10, ate: Optional[datetime.datetime] = None,
+                             orgao: Optional[str] = None) -> List[Tuple]:
+        """Próximas manutenções a vencer das viaturas ativas, em ordem de prazo
+        
+        Retorna (num_vtr, orgao, manutencao, prazo). `ate` limita aos prazos até
+        a data informada (com quantidade=None, todos eles) e `orgao` restringe a
+        um órgão. O custo depende da quantidade retornada, não do tamanho da frota.
+        """
+        if quantidade is None and ate is None:
+            raise ValueError("informe a quantidade ou a data limite")
+        
+        limite = data_para_epoch(ate) if ate is not None else None
+        itens = self._agenda_sincronizada().proximos(quantidade, limite, orgao)
+        if not itens:
+            return []
+        
+        cursor = self.conexao.cursor()
+        tipos = dict(cursor.execute('SELECT id, nome FROM tipos_manutencao').fetchall())
+        numeros = {}
+        ids = list({viatura_id for _, viatura_id, _, _ in itens})
+        for i in range(0, len(ids), MAX_PARAMETROS_SQL):
+            parte = ids[i:i + MAX_PARAMETROS_SQL]
+            cursor.execute(f'SELECT id, num_vtr FROM viaturas WHERE id IN ({",".join("?" * len(parte))})', parte)
+            numeros.update(cursor.fetchall())
         
-        resultado = cursor.fetchall()
-        conn.close()
-        return resultado
+        return [(numeros[viatura_id], orgao_item, tipos[tipo_id], prazo)
+                for prazo, viatura_id, tipo_id, orgao_item in itens]
+    
+    def obter_viatura(self, num_vtr: str) -> Optional[Tuple]:
+        """Obtém os dados de uma viatura ativa (None se não existir)"""
+        return self.conexao.execute(
+            'SELECT * FROM viaturas WHERE num_vtr = ? AND ativa = 1', (num_vtr.upper(),)
+        ).fetchone()
     
     def obter_historico_viatura(self, num_vtr: str) -> dict:
         """Obtém o histórico completo de uma viatura"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        cursor = self.conexao.cursor()
         
         # Dados da viatura
-        cursor.execute('SELECT * FROM viaturas WHERE num_vtr = ? AND ativa = 1', (num_vtr.upper(),))
-        dados_viatura = cursor.fetchone()
+        dados_viatura = self.obter_viatura(num_vtr)
         
         if not dados_viatura:
-            conn.close()
             return {}
         
         viatura_id = dados_viatura[0]
         
-        # Histórico de odômetro
+        # Histórico de odômetro (leituras recentes e resumos das compactadas)
         cursor.execute('''
-            SELECT odometro, data_registro, observacoes
-            FROM registros_odometro 
-            WHERE viatura_id = ?
+            SELECT odometro, data_registro, observacoes FROM (
+                SELECT odometro, data_registro, observacoes
+                FROM registros_odometro 
+                WHERE viatura_id = ?
+                ORDER BY data_registro DESC
+                LIMIT 10
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT ultimo_odometro, ultima_data,
+                       'Resumo ' || CASE granularidade WHEN 'dia' THEN 'diário' ELSE 'mensal' END
+                       || ' (' || leituras || ' leituras)'
+                FROM resumo_odometro
+                WHERE viatura_id = ?
+                ORDER BY ultima_data DESC
+                LIMIT 10
+            )
             ORDER BY data_registro DESC
             LIMIT 10
-        ''', (viatura_id,))
+        ''', (viatura_id, viatura_id))
         historico_odometro = cursor.fetchall()
         
         # Histórico de manutenções
@@ -290,23 +2214,335 @@ class SistemaGerenciamentoFrota:
         ''', (viatura_id,))
         historico_manutencoes = cursor.fetchall()
         
-        conn.close()
-        
         return {
             'viatura': dados_viatura,
             'odometro': historico_odometro,
             'manutencoes': historico_manutencoes
         }
     
+    def _id_viatura(self, num_vtr: str) -> Optional[int]:
+        viatura = self._viatura_em_cache(num_vtr)
+        return viatura[0] if viatura else None
+    
+    def pagina_historico_odometro(self, num_vtr: str, apos: Optional[Tuple] = None,
+                                  limite: int = TAMANHO_PAGINA) -> Tuple[List[Tuple], Optional[Tuple]]:
+        """Página do histórico de odômetro, do mais recente para o mais antigo
+        
+        Inclui os resumos das leituras compactadas. Linhas no formato
+        (odometro, data_registro, observacoes); o cursor é (data_registro, id).
+        """
+        viatura_id = self._id_viatura(num_vtr)
+        if viatura_id is None:
+            return [], None
+        
+        filtro_leituras, filtro_resumos = "", ""
+        parametros_leituras, parametros_resumos = [viatura_id], [viatura_id]
+        if apos is not None:
+            data_apos, id_apos = apos
+            filtro_leituras = "AND (data_registro, id) < (?, ?)"
+            parametros_leituras.extend((data_apos, id_apos))
+            # Resumos usam id 0: vêm depois das leituras completas de mesma data
+            filtro_resumos = "AND ultima_data <= ? AND (ultima_data < ? OR ? > 0)"
+            parametros_resumos.extend((data_apos, data_apos, id_apos))
+        
+        cursor = self.conexao.cursor()
+        cursor.execute(f'''
+            SELECT data_registro, id, odometro, observacoes
+            FROM registros_odometro
+            WHERE viatura_id = ? {filtro_leituras}
+            ORDER BY data_registro DESC, id DESC
+            LIMIT ?
+        ''', parametros_leituras + [limite])
+        leituras = cursor.fetchall()
+        
+        cursor.execute(f'''
+            SELECT ultima_data, 0, ultimo_odometro,
+                   'Resumo ' || CASE granularidade WHEN 'dia' THEN 'diário' ELSE 'mensal' END
+                   || ' (' || leituras || ' leituras)'
+            FROM resumo_odometro
+            WHERE viatura_id = ? {filtro_resumos}
+            ORDER BY ultima_data DESC
+            LIMIT ?
+        ''', parametros_resumos + [limite])
+        resumos = cursor.fetchall()
+        
+        linhas = sorted(leituras + resumos, key=lambda linha: (linha[0], linha[1]), reverse=True)[:limite]
+        proximo = (linhas[-1][0], linhas[-1][1]) if len(linhas) == limite else None
+        return [(odometro, data, obs) for data, _, odometro, obs in linhas], proximo
+    
+    def iterar_historico_odometro(self, num_vtr: str, tamanho_pagina: int = TAMANHO_PAGINA) -> Iterator[Tuple]:
+        """Percorre todo o histórico de odômetro de uma viatura por páginas"""
+        return self._iterar_paginas(self.pagina_historico_odometro, tamanho_pagina, num_vtr)
+    
+    def pagina_historico_manutencoes(self, num_vtr: str, apos: Optional[Tuple] = None,
+                                     limite: int = TAMANHO_PAGINA) -> Tuple[List[Tuple], Optional[Tuple]]:
+        """Página das manutenções de uma viatura, da mais recente para a mais antiga
+        
+        Linhas no mesmo formato de obter_historico_viatura; o cursor é (data_realizada, id).
+        """
+        viatura_id = self._id_viatura(num_vtr)
+        if viatura_id is None:
+            return [], None
+        
+        filtro, parametros = "", [viatura_id]
+        if apos is not None:
+            filtro = "AND (m.data_realizada, m.id) < (?, ?)"
+            parametros.extend(apos)
+        
+        cursor = self.conexao.cursor()
+        cursor.execute(f'''
+            SELECT m.data_realizada, m.id, tm.nome, m.odometro_realizada, m.data_realizada,
+                   m.proximo_odometro, m.proxima_data, m.observacoes
+            FROM manutencoes m
+            JOIN tipos_manutencao tm ON m.tipo_manutencao_id = tm.id
+            WHERE m.viatura_id = ? {filtro}
+            ORDER BY m.data_realizada DESC, m.id DESC
+            LIMIT ?
+        ''', parametros + [limite])
+        
+        linhas = cursor.fetchall()
+        proximo = (linhas[-1][0], linhas[-1][1]) if len(linhas) == limite else None
+        return [linha[2:] for linha in linhas], proximo
+    
+    def iterar_historico_manutencoes(self, num_vtr: str, tamanho_pagina: int = TAMANHO_PAGINA) -> Iterator[Tuple]:
+        """Percorre todas as manutenções de uma viatura por páginas"""
+        return self._iterar_paginas(self.pagina_historico_manutencoes, tamanho_pagina, num_vtr)
+    
+    def compactar_registros_odometro(self, dias_retencao: int = DIAS_RETENCAO_ODOMETRO,
+                                     granularidade: str = "dia",
+                                     leituras_por_etapa: int = LEITURAS_POR_ETAPA_COMPACTACAO) -> dict:
+        """Resume as leituras de odômetro mais antigas que a janela de retenção
+        
+        As leituras são agregadas por viatura e por dia ou mês (primeiro, último
+        e maior odômetro) em resumo_odometro e então removidas. O trabalho é
+        feito em etapas curtas, cada uma em sua própria transação (no modo
+        concorrente, enfileirada no escritor entre as demais escritas).
+        
+        Em bancos com auto_vacuum=INCREMENTAL (os criados pelo sistema), cada
+        etapa termina com um PRAGMA incremental_vacuum que devolve as páginas
+        livres ao disco. Bancos anteriores ficam com auto_vacuum=NONE até
+        ativar_vacuum_incremental(): nelas as páginas liberadas só são
+        reaproveitadas pelo próprio banco e o arquivo não diminui. O total
+        "vacuum_incremental" indica o caso e "paginas_livres" o que ficou no arquivo.
+        """
+        if granularidade not in ("dia", "mes"):
+            raise ValueError("granularidade deve ser 'dia' ou 'mes'")
+        
+        limite = int(time.time()) - dias_retencao * 86400
+        totais = {"leituras_compactadas": 0, "resumos": 0, "etapas": 0}
+        incremental = self.conexao.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+        
+        while True:
+            leituras, resumos = self._compactar_etapa(limite, granularidade, leituras_por_etapa, incremental)
+            if not leituras:
+                break
+            totais["leituras_compactadas"] += leituras
+            totais["resumos"] += resumos
+            totais["etapas"] += 1
+        
+        totais["vacuum_incremental"] = incremental
+        totais["paginas_livres"] = self.conexao.execute("PRAGMA freelist_count").fetchone()[0]
+        return totais
+    
+    @_operacao_escrita
+    def _compactar_etapa(self, limite: int, granularidade: str, leituras_por_etapa: int,
+                         incremental: bool) -> Tuple[int, int]:
+        """Resume e remove um lote de leituras antigas; retorna (leituras, resumos)"""
+        with self.transacao() as cursor:
+            cursor.execute('''
+                SELECT id, viatura_id, odometro, data_registro,
+                       date(data_registro, 'unixepoch', 'localtime')
+                FROM registros_odometro
+                WHERE data_registro < ?
+                ORDER BY data_registro, id
+                LIMIT ?
+            ''', (limite, leituras_por_etapa))
+            leituras = cursor.fetchall()
+            
+            if not leituras:
+                return 0, 0
+            
+            # Agregar por (viatura, período); as leituras chegam em ordem cronológica
+            resumos = {}
+            for _, viatura_id, odometro, data, dia in leituras:
+                periodo = dia if granularidade == "dia" else dia[:7] + "-01"
+                resumo = resumos.get((viatura_id, periodo))
+                if resumo is None:
+                    resumos[(viatura_id, periodo)] = [odometro, odometro, odometro, data, data, 1]
+                else:
+                    resumo[1] = odometro
+                    resumo[2] = max(resumo[2], odometro)
+                    resumo[4] = data
+                    resumo[5] += 1
+            
+            # Períodos já resumidos em execuções anteriores são combinados
+            cursor.executemany('''
+                INSERT INTO resumo_odometro
+                    (viatura_id, periodo, granularidade, primeiro_odometro, ultimo_odometro,
+                     maximo_odometro, primeira_data, ultima_data, leituras)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (viatura_id, periodo, granularidade) DO UPDATE SET
+                    primeiro_odometro = CASE WHEN excluded.primeira_data < primeira_data
+                                             THEN excluded.primeiro_odometro ELSE primeiro_odometro END,
+                    primeira_data = MIN(primeira_data, excluded.primeira_data),
+                    ultimo_odometro = CASE WHEN excluded.ultima_data >= ultima_data
+                                           THEN excluded.ultimo_odometro ELSE ultimo_odometro END,
+                    ultima_data = MAX(ultima_data, excluded.ultima_data),
+                    maximo_odometro = MAX(maximo_odometro, excluded.maximo_odometro),
+                    leituras = leituras + excluded.leituras
+            ''', [(viatura_id, periodo, granularidade, *resumo)
+                  for (viatura_id, periodo), resumo in resumos.items()])
+            
+            cursor.executemany('DELETE FROM registros_odometro WHERE id = ?',
+                               [(leitura[0],) for leitura in leituras])
+        
+        # Devolve ao disco parte das páginas liberadas, sem VACUUM completo. O sqlite3 executa
+        # um único passo do PRAGMA, que libera uma página: daí uma execução por página
+        if incremental:
+            livres = self.conexao.execute("PRAGMA freelist_count").fetchone()[0]
+            for _ in range(min(livres, PAGINAS_VACUUM_POR_ETAPA)):
+                self.conexao.execute("PRAGMA incremental_vacuum(1)")
+        return len(leituras), len(resumos)
+    
+    @_operacao_isolada
+    def ativar_vacuum_incremental(self) -> bool:
+        """Passa um banco criado sem auto_vacuum para INCREMENTAL (uma única vez)
+        
+        A mudança só vale com um VACUUM completo, que reescreve o arquivo inteiro
+        e bloqueia as escritas das demais conexões até terminar: rode com o
+        sistema parado. No modo concorrente roda no escritor, fora dos grupos.
+        Retorna False se o banco já estava em INCREMENTAL.
+        """
+        conn = self.conexao
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        # Em WAL o arquivo reescrito só substitui o banco no checkpoint
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return True
+    
+    def expurgar_chaves_leitura(self, dias_retencao: int = DIAS_RETENCAO_CHAVES_LEITURA,
+                                chaves_por_etapa: int = CHAVES_POR_ETAPA_EXPURGO) -> int:
+        """Remove as chaves de idempotência recebidas antes da janela de retenção
+        
+        Repetições que chegarem depois disso são tratadas como leituras novas.
+        Feito em etapas curtas, cada uma em sua própria transação (no modo
+        concorrente, enfileirada no escritor); retorna a quantidade de chaves
+        removidas.
+        """
+        limite = int(time.time()) - dias_retencao * 86400
+        removidas = 0
+        while True:
+            etapa = self._expurgar_etapa(limite, chaves_por_etapa)
+            removidas += etapa
+            if etapa < chaves_por_etapa:
+                return removidas
+    
+    @_operacao_escrita
+    def _expurgar_etapa(self, limite: int, chaves_por_etapa: int) -> int:
+        """Remove até `chaves_por_etapa` chaves anteriores a `limite`"""
+        with self.transacao() as cursor:
+            cursor.execute('''
+                DELETE FROM leituras_recebidas WHERE chave IN (
+                    SELECT chave FROM leituras_recebidas WHERE data_recebida < ? LIMIT ?
+                )
+            ''', (limite, chaves_por_etapa))
+            return cursor.rowcount
+    
     def listar_tipos_manutencao(self) -> List[Tuple]:
         """Lista todos os tipos de manutenção disponíveis"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        if self.replica_leitura:
+            return self._replica_sincronizada().listar_tipos_manutencao()
+        
+        cursor = self.conexao.cursor()
         
         cursor.execute('SELECT nome, intervalo_km, intervalo_dias, descricao FROM tipos_manutencao ORDER BY intervalo_km')
-        resultado = cursor.fetchall()
-        conn.close()
-        return resultado
+        return cursor.fetchall()
+    
+    def relatorio_uso(self, granularidade: str = "mes", por: str = "orgao", orgao: Optional[str] = None,
+                      inicio=None, fim=None) -> List[Tuple]:
+        """Km rodados e leituras por período, lidos só dos resumos de uso
+        
+        por="orgao" retorna (periodo, orgao, km, leituras) e por="viatura",
+        (periodo, num_vtr, orgao, km, leituras), em ordem de período. `inicio`
+        e `fim` (datas, inclusive) limitam os períodos e `orgao` restringe a
+        um órgão. Os períodos são 'AAAA-MM-DD' (o dia ou o 1º dia do mês).
+        """
+        if granularidade not in ("dia", "mes"):
+            raise ValueError("granularidade deve ser 'dia' ou 'mes'")
+        if por not in ("orgao", "viatura"):
+            raise ValueError("por deve ser 'orgao' ou 'viatura'")
+        
+        posicao = 0 if granularidade == "dia" else 1
+        condicoes, parametros = ["u.granularidade = ?"], [granularidade]
+        if inicio is not None:
+            condicoes.append("u.periodo >= ?")
+            parametros.append(periodos_uso(data_para_epoch(inicio))[posicao])
+        if fim is not None:
+            condicoes.append("u.periodo <= ?")
+            parametros.append(periodos_uso(data_para_epoch(fim))[posicao])
+        
+        if por == "orgao":
+            if orgao is not None:
+                condicoes.append("u.orgao = ?")
+                parametros.append(orgao)
+            consulta = f'''
+                SELECT u.periodo, u.orgao, u.km, u.leituras
+                FROM uso_orgao u
+                WHERE {" AND ".join(condicoes)}
+                ORDER BY u.periodo, u.orgao
+            '''
+        else:
+            if orgao is not None:
+                condicoes.append("v.orgao = ?")
+                parametros.append(orgao)
+            consulta = f'''
+                SELECT u.periodo, v.num_vtr, v.orgao, u.km, u.leituras
+                FROM uso_viatura u
+                JOIN viaturas v ON u.viatura_id = v.id
+                WHERE {" AND ".join(condicoes)}
+                ORDER BY u.periodo, v.num_vtr
+            '''
+        
+        return self.conexao.execute(consulta, parametros).fetchall()
+    
+    def relatorio_manutencoes(self, inicio=None, fim=None, orgao: Optional[str] = None) -> List[Tuple]:
+        """Manutenções realizadas por trimestre, modelo e tipo, lidas só dos resumos
+        
+        Retorna (trimestre, modelo, manutencao, quantidade), com o trimestre no
+        formato 'AAAA-Tn'. `inicio` e `fim` (datas) limitam os trimestres.
+        """
+        condicoes, parametros = [], []
+        if inicio is not None:
+            condicoes.append("u.trimestre >= ?")
+            parametros.append(trimestre_de(data_para_epoch(inicio)))
+        if fim is not None:
+            condicoes.append("u.trimestre <= ?")
+            parametros.append(trimestre_de(data_para_epoch(fim)))
+        if orgao is not None:
+            condicoes.append("u.orgao = ?")
+            parametros.append(orgao)
+        
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        return self.conexao.execute(f'''
+            SELECT u.trimestre, u.modelo, tm.nome, SUM(u.quantidade)
+            FROM uso_manutencoes u
+            JOIN tipos_manutencao tm ON u.tipo_manutencao_id = tm.id
+            {where}
+            GROUP BY u.trimestre, u.modelo, tm.nome
+            ORDER BY u.trimestre, u.modelo, tm.nome
+        ''', parametros).fetchall()
+
+# Linhas exibidas por tela nas listagens do menu
+TAMANHO_TELA = 20
+
+# Ícone exibido ao lado de cada status de alerta
+ICONES_STATUS = {
+    "VENCIDO": "🔴",
+    "URGENTE": "🟠",
+    "ATENÇÃO": "🟡",
+}
 
 
 def imprimir_cabecalho():
@@ -329,6 +2565,10 @@ def imprimir_menu():
     print("5. Ver Alertas de Manutenção")
     print("6. Histórico de Viatura")
     print("7. Tipos de Manutenção")
+    print("8. Previsão de Vencimentos")
+    print("9. Estatísticas de Desempenho")
+    print("10. Relatórios de Uso da Frota")
+    print("11. Buscar Viatura")
     print("0. Sair")
     print("=" * 40)
 
@@ -376,13 +2616,42 @@ def cadastrar_viatura_menu(sistema):
         print(f"Erro ao cadastrar viatura. Número {num_vtr} já existe!")
 
 
+def ler_viatura(sistema) -> Optional[str]:
+    """Lê o número da viatura; se não existir, oferece as viaturas que começam com o que foi digitado"""
+    num_vtr = input("Número da viatura (ou o início dele): ").strip().upper()
+    if not num_vtr:
+        print("Número da viatura é obrigatório!")
+        return None
+    if sistema.obter_viatura(num_vtr) is not None:
+        return num_vtr
+    
+    opcoes = sistema.buscar_por_prefixo(num_vtr, TAMANHO_TELA)
+    if not opcoes:
+        print(f"Viatura {num_vtr} não encontrada!")
+        return None
+    
+    for i, (numero, modelo, ano, orgao, _, _) in enumerate(opcoes, 1):
+        print(f"{i:>3}. {numero:<12} {modelo:<20} {orgao}")
+    if len(opcoes) == TAMANHO_TELA:
+        print(f"     (apenas as {TAMANHO_TELA} primeiras: digite mais do número para filtrar)")
+    
+    try:
+        escolha = int(input(f"Escolha a viatura (1-{len(opcoes)}): "))
+        if escolha < 1 or escolha > len(opcoes):
+            print("Opção inválida!")
+            return None
+    except ValueError:
+        print("Opção deve ser um número!")
+        return None
+    return opcoes[escolha - 1][0]
+
+
 def atualizar_odometro_menu(sistema):
     """Menu para atualizar odômetro"""
     print("\n--- ATUALIZAR ODÔMETRO ---")
     
-    num_vtr = input("Número da viatura: ").strip().upper()
+    num_vtr = ler_viatura(sistema)
     if not num_vtr:
-        print("Número da viatura é obrigatório!")
         return
     
     try:
@@ -396,10 +2665,13 @@ def atualizar_odometro_menu(sistema):
     
     observacoes = input("Observações (opcional): ").strip()
     
-    if sistema.atualizar_odometro(num_vtr, novo_odometro, observacoes):
+    resultado = sistema.atualizar_odometro(num_vtr, novo_odometro, observacoes)
+    if resultado:
         print(f"Odômetro da viatura {num_vtr} atualizado para {novo_odometro:,} km!")
+    elif resultado is ResultadoLeitura.DESATUALIZADA:
+        print("Erro ao atualizar odômetro: o novo valor é menor que o odômetro atual!")
     else:
-        print("Erro ao atualizar odômetro. Verifique se o número da viatura existe e o novo valor é válido!")
+        print("Erro ao atualizar odômetro: viatura não encontrada ou inativa!")
 
 
 def registrar_manutencao_menu(sistema):
@@ -422,9 +2694,8 @@ def registrar_manutencao_menu(sistema):
         print("Opção deve ser um número!")
         return
     
-    num_vtr = input("Número da viatura: ").strip().upper()
+    num_vtr = ler_viatura(sistema)
     if not num_vtr:
-        print("Número da viatura é obrigatório!")
         return
     
     observacoes = input("Observações (opcional): ").strip()
@@ -446,22 +2717,40 @@ def registrar_manutencao_menu(sistema):
         print("Erro ao registrar manutenção. Verifique se o número da viatura existe!")
 
 
+def paginar_na_tela(linhas, imprimir, tamanho_tela: int = TAMANHO_TELA) -> int:
+    """Imprime as linhas aos poucos, uma tela por vez; retorna quantas foram exibidas"""
+    exibidas = 0
+    for linha in linhas:
+        if exibidas and exibidas % tamanho_tela == 0:
+            if input("-- Enter para mais, 'q' para parar -- ").strip().lower() == "q":
+                break
+        imprimir(linha)
+        exibidas += 1
+    return exibidas
+
+
 def listar_viaturas_menu(sistema):
     """Menu para listar viaturas"""
     print("\n--- LISTA DE VIATURAS ---")
     
-    viaturas = sistema.listar_viaturas()
+    orgao = input("Filtrar por órgão (Enter para todos): ").strip() or None
     
-    if not viaturas:
+    viaturas = sistema.iterar_viaturas(orgao=orgao, tamanho_pagina=TAMANHO_TELA)
+    primeira = next(viaturas, None)
+    
+    if primeira is None:
         print("Nenhuma viatura cadastrada!")
         return
     
     print(f"\n{'Nº Viatura':<12} {'Modelo':<20} {'Ano':<6} {'Órgão':<20} {'Odômetro':<12} {'Cadastro':<12}")
     print("-" * 84)
     
-    for num_vtr, modelo, ano, orgao, odometro, data_cadastro in viaturas:
-        data_fmt = datetime.datetime.strptime(data_cadastro, "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y")
+    def imprimir(viatura):
+        num_vtr, modelo, ano, orgao, odometro, data_cadastro = viatura
+        data_fmt = epoch_para_data(data_cadastro).strftime("%d/%m/%Y")
         print(f"{num_vtr:<12} {modelo:<20} {ano:<6} {orgao:<20} {odometro:>8,} km  {data_fmt:<12}")
+    
+    paginar_na_tela(itertools.chain([primeira], viaturas), imprimir, TAMANHO_TELA)
 
 
 def ver_alertas_menu(sistema):
@@ -478,12 +2767,8 @@ def ver_alertas_menu(sistema):
     print("-" * 87)
     
     for num_vtr, modelo, odometro_atual, manutencao, proximo_odo, proxima_data, km_rest, dias_rest in alertas:
-        if dias_rest <= 0 or km_rest <= 0:
-            status = "🔴 VENCIDO"
-        elif dias_rest <= 14 or km_rest <= 250:
-            status = "🟠 URGENTE"
-        else:
-            status = "🟡 ATENÇÃO"
+        status = classificar_alerta(km_rest, dias_rest) or "ATENÇÃO"
+        status = f"{ICONES_STATUS[status]} {status}"
         
         km_rest_str = f"{int(km_rest):,}" if km_rest > 0 else "0"
         dias_rest_str = f"{int(dias_rest)}" if dias_rest > 0 else "0"
@@ -495,47 +2780,45 @@ def historico_viatura_menu(sistema):
     """Menu para ver histórico de viatura"""
     print("\n--- HISTÓRICO DE VIATURA ---")
     
-    num_vtr = input("Número da viatura: ").strip().upper()
+    num_vtr = ler_viatura(sistema)
     if not num_vtr:
-        print("Número da viatura é obrigatório!")
         return
     
-    historico = sistema.obter_historico_viatura(num_vtr)
-    
-    if not historico:
-        print(f"Viatura {num_vtr} não encontrada!")
-        return
+    viatura = sistema.obter_viatura(num_vtr)
     
     # Dados da viatura
-    viatura = historico['viatura']
     print(f"\nDADOS DA VIATURA {num_vtr}")
     print(f"Modelo: {viatura[2]}")
     print(f"Ano: {viatura[3]}")
     print(f"Órgão: {viatura[4]}")
     print(f"Odômetro Atual: {viatura[5]:,} km")
     
-    # Histórico de odômetro
-    print(f"\nHISTÓRICO DE ODÔMETRO (últimos 10 registros)")
-    if historico['odometro']:
-        print(f"{'Odômetro':<12} {'Data':<12} {'Observações'}")
-        print("-" * 50)
-        for odometro, data, obs in historico['odometro']:
-            data_fmt = datetime.datetime.strptime(data, "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y")
-            obs_fmt = obs[:30] + "..." if obs and len(obs) > 30 else (obs or "")
-            print(f"{odometro:>8,} km  {data_fmt:<12} {obs_fmt}")
-    else:
+    # Histórico de odômetro (TAMANHO_TELA registros por tela)
+    print(f"\nHISTÓRICO DE ODÔMETRO")
+    print(f"{'Odômetro':<12} {'Data':<12} {'Observações'}")
+    print("-" * 50)
+    
+    def imprimir_odometro(registro):
+        odometro, data, obs = registro
+        data_fmt = epoch_para_data(data).strftime("%d/%m/%Y")
+        obs_fmt = obs[:30] + "..." if obs and len(obs) > 30 else (obs or "")
+        print(f"{odometro:>8,} km  {data_fmt:<12} {obs_fmt}")
+    
+    if not paginar_na_tela(sistema.iterar_historico_odometro(num_vtr, TAMANHO_TELA), imprimir_odometro):
         print("Nenhum registro de odômetro encontrado.")
     
     # Histórico de manutenções
     print(f"\n🔧 HISTÓRICO DE MANUTENÇÕES")
-    if historico['manutencoes']:
-        print(f"{'Manutenção':<20} {'Realizada':<12} {'Próxima':<12} {'Próx. Km':<10}")
-        print("-" * 60)
-        for nome, odo_real, data_real, prox_odo, prox_data, obs in historico['manutencoes']:
-            data_real_fmt = datetime.datetime.strptime(data_real, "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y")
-            prox_data_fmt = datetime.datetime.strptime(prox_data, "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y")
-            print(f"{nome:<20} {data_real_fmt:<12} {prox_data_fmt:<12} {prox_odo:>8,}")
-    else:
+    print(f"{'Manutenção':<20} {'Realizada':<12} {'Próxima':<12} {'Próx. Km':<10}")
+    print("-" * 60)
+    
+    def imprimir_manutencao(manutencao):
+        nome, odo_real, data_real, prox_odo, prox_data, obs = manutencao
+        data_real_fmt = epoch_para_data(data_real).strftime("%d/%m/%Y")
+        prox_data_fmt = epoch_para_data(prox_data).strftime("%d/%m/%Y")
+        print(f"{nome:<20} {data_real_fmt:<12} {prox_data_fmt:<12} {prox_odo:>8,}")
+    
+    if not paginar_na_tela(sistema.iterar_historico_manutencoes(num_vtr, TAMANHO_TELA), imprimir_manutencao):
         print("Nenhuma manutenção registrada.")
 
 
@@ -552,18 +2835,176 @@ def tipos_manutencao_menu(sistema):
         print(f"{nome:<25} {km:>8,} km   {dias:>10} dias    {desc}")
 
 
+def previsao_vencimentos_menu(sistema, previsor):
+    """Menu com as manutenções que devem vencer primeiro pela taxa de uso"""
+    print("\n--- PREVISÃO DE VENCIMENTOS ---")
+    
+    proximos = previsor.prever().mais_proximos(15)
+    if not proximos:
+        print("Nenhuma manutenção registrada!")
+        return
+    
+    cursor = sistema.conexao.cursor()
+    viaturas = dict(cursor.execute(
+        f"SELECT id, num_vtr FROM viaturas WHERE id IN ({','.join('?' * len(proximos))})",
+        [item[0] for item in proximos]).fetchall())
+    tipos = dict(cursor.execute('SELECT id, nome FROM tipos_manutencao').fetchall())
+    
+    print(f"\n{'Nº Viatura':<12} {'Manutenção':<22} {'Km/dia':>8} {'Km Rest.':>10}  {'Previsão':<12}")
+    print("-" * 70)
+    
+    hoje = datetime.datetime.now()
+    for viatura_id, tipo_id, km_por_dia, km_restantes, dias_previstos in proximos:
+        if dias_previstos <= 0:
+            previsao_fmt = "VENCIDA"
+        else:
+            previsao_fmt = (hoje + datetime.timedelta(days=dias_previstos)).strftime("%d/%m/%Y")
+        print(f"{viaturas.get(viatura_id, '?'):<12} {tipos.get(tipo_id, '?'):<22} {km_por_dia:>8.1f} "
+              f"{max(km_restantes, 0):>10,}  {previsao_fmt:<12}")
+
+
+def relatorios_uso_menu(sistema):
+    """Menu com os relatórios de uso da frota (lidos dos resumos, sem percorrer o histórico)"""
+    print("\n--- RELATÓRIOS DE USO DA FROTA ---")
+    print("1. Km por órgão, mês a mês (últimos 12 meses)")
+    print("2. Km por órgão, dia a dia (últimos 30 dias)")
+    print("3. Km por viatura no mês atual")
+    print("4. Manutenções por modelo e trimestre (últimos 12 meses)")
+    opcao = input("Escolha um relatório: ").strip()
+    
+    hoje = datetime.datetime.now()
+    if opcao in ("1", "2"):
+        granularidade, dias = ("mes", 365) if opcao == "1" else ("dia", 30)
+        linhas = sistema.relatorio_uso(granularidade, inicio=hoje - datetime.timedelta(days=dias))
+        cabecalho = f"\n{'Período':<12} {'Órgão':<28} {'Km':>12} {'Leituras':>10}"
+        
+        def imprimir(linha):
+            periodo, orgao, km, leituras = linha
+            print(f"{periodo[:7] if granularidade == 'mes' else periodo:<12} {orgao:<28} {km:>9,} km {leituras:>10,}")
+    elif opcao == "3":
+        linhas = sistema.relatorio_uso("mes", por="viatura", inicio=hoje, fim=hoje)
+        linhas.sort(key=lambda linha: linha[3], reverse=True)
+        cabecalho = f"\n{'Nº Viatura':<12} {'Órgão':<28} {'Km':>12} {'Leituras':>10}"
+        
+        def imprimir(linha):
+            _, num_vtr, orgao, km, leituras = linha
+            print(f"{num_vtr:<12} {orgao:<28} {km:>9,} km {leituras:>10,}")
+    elif opcao == "4":
+        linhas = sistema.relatorio_manutencoes(inicio=hoje - datetime.timedelta(days=365))
+        cabecalho = f"\n{'Trimestre':<10} {'Modelo':<24} {'Manutenção':<24} {'Qtde':>6}"
+        
+        def imprimir(linha):
+            trimestre, modelo, manutencao, quantidade = linha
+            print(f"{trimestre:<10} {modelo:<24} {manutencao:<24} {quantidade:>6,}")
+    else:
+        print("Opção inválida!")
+        return
+    
+    if not linhas:
+        print("Nenhum registro no período!")
+        return
+    
+    print(cabecalho)
+    print("-" * 66)
+    paginar_na_tela(linhas, imprimir, TAMANHO_TELA)
+
+
+def buscar_viatura_menu(sistema):
+    """Menu para buscar viaturas pelo número, modelo, órgão ou observações das manutenções"""
+    print("\n--- BUSCAR VIATURA ---")
+    
+    texto = input("Início do número, modelo, órgão ou palavras das observações: ").strip()
+    if not texto:
+        print("Informe o que buscar!")
+        return
+    
+    # Primeiro as viaturas cujo número começa com o texto, depois as da busca textual
+    encontradas = [(*viatura[:4], "número") for viatura in sistema.buscar_por_prefixo(texto, TAMANHO_TELA)]
+    numeros = {viatura[0] for viatura in encontradas}
+    for num_vtr, modelo, ano, orgao, _, trecho in sistema.buscar_viaturas(texto, TAMANHO_TELA):
+        if num_vtr not in numeros:
+            encontradas.append((num_vtr, modelo, ano, orgao, trecho or "modelo/órgão"))
+    
+    if not encontradas:
+        print("Nenhuma viatura encontrada!")
+        return
+    
+    print(f"\n{'Nº Viatura':<12} {'Modelo':<20} {'Ano':<6} {'Órgão':<20} {'Encontrada em'}")
+    print("-" * 84)
+    for num_vtr, modelo, ano, orgao, onde in encontradas[:TAMANHO_TELA]:
+        print(f"{num_vtr:<12} {modelo:<20} {ano:<6} {orgao:<20} {onde}")
+
+
+def estatisticas_menu(sistema):
+    """Menu com o relatório da instrumentação (latências, transações e SQL)"""
+    print("\n--- ESTATÍSTICAS DE DESEMPENHO ---")
+    
+    for nome, cache in sistema.estatisticas_cache().items():
+        taxa = f"{cache['taxa_acerto']:.1%}" if cache["taxa_acerto"] is not None else "-"
+        print(f"Cache de {nome}: {cache['itens']:,}/{cache['capacidade']:,} itens, "
+              f"{cache['acertos']:,} acertos, {cache['falhas']:,} falhas ({taxa})")
+    replica = sistema.estatisticas_replica()
+    if replica is not None:
+        print(f"Réplica de leitura: {replica['viaturas']:,} viaturas, {replica['alertas']:,} alertas, "
+              f"{replica['total_bytes'] / 1e6:.1f} MB ({replica['bytes_por_viatura']:.0f} bytes por viatura), "
+              f"{replica['sincronizacoes']:,} sincronizações")
+    print()
+    
+    if sistema.instrumentacao is None:
+        if input("Instrumentação desativada. Ativar agora? (s/N): ").strip().lower() == "s":
+            sistema.ativar_instrumentacao()
+            print("Instrumentação ativada: use o sistema e volte a esta opção.")
+        return
+    
+    estatisticas = sistema.estatisticas(10)
+    print(f"Coletadas desde {estatisticas['inicio']}")
+    
+    print(f"\n{'Método':<32} {'Chamadas':>9} {'Média ms':>10} {'p95 ms':>10} {'Máx ms':>10} {'Linhas':>10}")
+    print("-" * 86)
+    metodos = sorted(estatisticas["metodos"].items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    for nome, dados in metodos:
+        print(f"{nome:<32} {dados['chamadas']:>9,} {dados['media_ms']:>10.3f} {dados['p95_ms']:>10.3f} "
+              f"{dados['max_ms']:>10.3f} {dados['linhas']:>10,}")
+    
+    transacoes = estatisticas["transacoes"]
+    if transacoes["chamadas"]:
+        print(f"\nTransações: {transacoes['chamadas']:,} (desfeitas: {transacoes['desfeitas']:,}), "
+              f"média {transacoes['media_ms']:.3f} ms, p95 {transacoes['p95_ms']:.3f} ms, "
+              f"máx {transacoes['max_ms']:.3f} ms")
+    
+    sql = estatisticas["sql"]
+    print(f"\nComandos SQL executados: {sql['comandos']:,} ({sql['distintos']} distintos)")
+    for item in sql["mais_executados"]:
+        comando = item["sql"][:90] + "..." if len(item["sql"]) > 90 else item["sql"]
+        print(f"{item['execucoes']:>9,}  {comando}")
+    
+    caminho = input("\nExportar para JSON (Enter para pular): ").strip()
+    if caminho:
+        sistema.instrumentacao.exportar(caminho)
+        print(f"Estatísticas gravadas em {caminho}")
+
+
 def main():
     """Função principal do sistema"""
     imprimir_cabecalho()
     
     # Inicializar sistema
     try:
-        sistema = SistemaGerenciamentoFrota()
+        # RASTREIA_REPLICA=1 responde as listagens e os alertas por uma réplica em memória
+        sistema = SistemaGerenciamentoFrota(replica_leitura=os.environ.get("RASTREIA_REPLICA") == "1")
+        # Abre o banco já aqui para relatar problemas antes do menu
+        sistema.init_database()
+        
+        # RASTREIA_ESTATISTICAS=arquivo.json ativa a instrumentação com snapshots periódicos
+        snapshot = os.environ.get("RASTREIA_ESTATISTICAS")
+        if snapshot:
+            sistema.ativar_instrumentacao(snapshot)
         print("Sistema inicializado com sucesso!")
     except Exception as e:
         print(f"Erro ao inicializar sistema: {e}")
         return
     
+    previsor = None
     while True:
         imprimir_menu()
         
@@ -587,6 +3028,18 @@ def main():
                 historico_viatura_menu(sistema)
             elif opcao == "7":
                 tipos_manutencao_menu(sistema)
+            elif opcao == "8":
+                # Importado só quando usado: carrega o NumPy, se instalado
+                if previsor is None:
+                    from previsao import PrevisorManutencoes
+                    previsor = PrevisorManutencoes(sistema)
+                previsao_vencimentos_menu(sistema, previsor)
+            elif opcao == "9":
+                estatisticas_menu(sistema)
+            elif opcao == "10":
+                relatorios_uso_menu(sistema)
+            elif opcao == "11":
+                buscar_viatura_menu(sistema)
             else:
                 print("Opção inválida! Tente novamente.")
             
@@ -599,6 +3052,8 @@ def main():
         except Exception as e:
             print(f"\nErro inesperado: {e}")
             input("Pressione Enter para continuar...")
+    
+    sistema.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,272 @@
+"""Migrações do esquema do banco do RASTREIA+
+
+A versão do esquema fica gravada em PRAGMA user_version. Cada migração leva o
+banco da versão anterior para a seguinte e roda dentro da transação aberta por
+init_database, junto com a atualização de user_version. Novas migrações entram
+sempre no fim de MIGRACOES; as existentes não devem ser alteradas.
+
+Apenas as tabelas com dados de origem são migradas. Índices, projeções e
+gatilhos são recriados por init_database no formato atual, mas só quando há
+migração pendente: mudanças neles também exigem uma nova versão (que pode ser
+uma migração vazia).
+"""
+
+from typing import List
+
+
+def _recriar_tabela(cursor, tabela: str, definicao: str, colunas: str):
+    """Recria a tabela com uma nova definição copiando as linhas pela seleção informada"""
+    cursor.execute(f"CREATE TABLE {tabela}_nova {definicao}")
+    cursor.execute(f"INSERT INTO {tabela}_nova SELECT {colunas} FROM {tabela}")
+    cursor.execute(f"DROP TABLE {tabela}")
+    cursor.execute(f"ALTER TABLE {tabela}_nova RENAME TO {tabela}")
+
+
+def _epoch(coluna: str) -> str:
+    """Expressão SQL que converte uma data local em texto para segundos desde 1970"""
+    return f"CAST(strftime('%s', {coluna}, 'utc') AS INTEGER)"
+
+
+def _v1_esquema_inicial(cursor):
+    """Tabelas originais, com as datas em texto (bancos anteriores ao controle de versão)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS viaturas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            num_vtr TEXT UNIQUE NOT NULL,
+            modelo TEXT NOT NULL,
+            ano INTEGER NOT NULL,
+            orgao TEXT NOT NULL,
+            odometro_atual INTEGER DEFAULT 0,
+            data_cadastro TEXT NOT NULL,
+            ativa BOOLEAN DEFAULT 1
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS registros_odometro (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            viatura_id INTEGER NOT NULL,
+            odometro INTEGER NOT NULL,
+            data_registro TEXT NOT NULL,
+            observacoes TEXT,
+            FOREIGN KEY (viatura_id) REFERENCES viaturas (id)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tipos_manutencao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT UNIQUE NOT NULL,
+            intervalo_km INTEGER NOT NULL,
+            intervalo_dias INTEGER NOT NULL,
+            descricao TEXT
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS manutencoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            viatura_id INTEGER NOT NULL,
+            tipo_manutencao_id INTEGER NOT NULL,
+            odometro_realizada INTEGER NOT NULL,
+            data_realizada TEXT NOT NULL,
+            proximo_odometro INTEGER NOT NULL,
+            proxima_data TEXT NOT NULL,
+            observacoes TEXT,
+            FOREIGN KEY (viatura_id) REFERENCES viaturas (id),
+            FOREIGN KEY (tipo_manutencao_id) REFERENCES tipos_manutencao (id)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resumo_odometro (
+            viatura_id INTEGER NOT NULL,
+            periodo TEXT NOT NULL,
+            granularidade TEXT NOT NULL,
+            primeiro_odometro INTEGER NOT NULL,
+            ultimo_odometro INTEGER NOT NULL,
+            maximo_odometro INTEGER NOT NULL,
+            primeira_data TEXT NOT NULL,
+            ultima_data TEXT NOT NULL,
+            leituras INTEGER NOT NULL,
+            PRIMARY KEY (viatura_id, periodo, granularidade),
+            FOREIGN KEY (viatura_id) REFERENCES viaturas (id)
+        ) WITHOUT ROWID
+    ''')
+    
+    tipos_padrao = [
+        ("Revisão Geral", 10000, 180, "Revisão completa do veículo"),
+        ("Troca de Óleo", 10000, 365, "Troca de óleo do motor e filtro"),
+        ("Troca de Filtro de Ar", 10000, 365, "Substituição do filtro de ar"),
+        ("Revisão de Freios", 20000, 365, "Verificação e manutenção do sistema de freios"),
+        ("Troca de Pneus", 40000, 1095, "Substituição dos pneus"),
+        ("Troca de Bateria", 60000, 1460, "Substituição da bateria")
+    ]
+    cursor.executemany('''
+        INSERT OR IGNORE INTO tipos_manutencao (nome, intervalo_km, intervalo_dias, descricao)
+        VALUES (?, ?, ?, ?)
+    ''', tipos_padrao)
+
+
+def _v2_datas_em_epoch(cursor):
+    """Datas passam a ser gravadas como inteiros (segundos desde 1970, UTC)
+    
+    Comparações e ordenações viram comparações de inteiros e a leitura das
+    linhas deixa de depender de strptime/julianday.
+    """
+    # Projeções e estado derivado são recalculados por init_database
+    cursor.execute("DROP TRIGGER IF EXISTS trg_manutencoes_ultima")
+    for tabela in ("ultima_manutencao", "estado_alertas", "agenda_vencimentos"):
+        cursor.execute(f"DROP TABLE IF EXISTS {tabela}")
+    
+    _recriar_tabela(cursor, "viaturas", '''(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            num_vtr TEXT UNIQUE NOT NULL,
+            modelo TEXT NOT NULL,
+            ano INTEGER NOT NULL,
+            orgao TEXT NOT NULL,
+            odometro_atual INTEGER DEFAULT 0,
+            data_cadastro INTEGER NOT NULL,
+            ativa BOOLEAN DEFAULT 1
+        )''',
+        f"id, num_vtr, modelo, ano, orgao, odometro_atual, {_epoch('data_cadastro')}, ativa")
+    
+    _recriar_tabela(cursor, "registros_odometro", '''(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            viatura_id INTEGER NOT NULL,
+            odometro INTEGER NOT NULL,
+            data_registro INTEGER NOT NULL,
+            observacoes TEXT,
+            FOREIGN KEY (viatura_id) REFERENCES viaturas (id)
+        )''',
+        f"id, viatura_id, odometro, {_epoch('data_registro')}, observacoes")
+    
+    _recriar_tabela(cursor, "manutencoes", '''(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            viatura_id INTEGER NOT NULL,
+            tipo_manutencao_id INTEGER NOT NULL,
+            odometro_realizada INTEGER NOT NULL,
+            data_realizada INTEGER NOT NULL,
+            proximo_odometro INTEGER NOT NULL,
+            proxima_data INTEGER NOT NULL,
+            observacoes TEXT,
+            FOREIGN KEY (viatura_id) REFERENCES viaturas (id),
+            FOREIGN KEY (tipo_manutencao_id) REFERENCES tipos_manutencao (id)
+        )''',
+        f"id, viatura_id, tipo_manutencao_id, odometro_realizada, {_epoch('data_realizada')}, "
+        f"proximo_odometro, {_epoch('proxima_data')}, observacoes")
+    
+    _recriar_tabela(cursor, "resumo_odometro", '''(
+            viatura_id INTEGER NOT NULL,
+            periodo TEXT NOT NULL,
+            granularidade TEXT NOT NULL,
+            primeiro_odometro INTEGER NOT NULL,
+            ultimo_odometro INTEGER NOT NULL,
+            maximo_odometro INTEGER NOT NULL,
+            primeira_data INTEGER NOT NULL,
+            ultima_data INTEGER NOT NULL,
+            leituras INTEGER NOT NULL,
+            PRIMARY KEY (viatura_id, periodo, granularidade),
+            FOREIGN KEY (viatura_id) REFERENCES viaturas (id)
+        ) WITHOUT ROWID''',
+        f"viatura_id, periodo, granularidade, primeiro_odometro, ultimo_odometro, maximo_odometro, "
+        f"{_epoch('primeira_data')}, {_epoch('ultima_data')}, leituras")
+
+
+def _v3_resumos_de_uso(cursor):
+    """Resumos de km por viatura/órgão e de manutenções por trimestre
+    
+    Sem mudanças nas tabelas de origem: os resumos são criados e preenchidos
+    com o histórico por init_database.
+    """
+
+
+def _v4_leituras_recebidas(cursor):
+    """Chaves de idempotência das leituras já aplicadas (repetições dos gateways)
+    
+    Uma linha por leitura recebida com chave, mantida pela janela de retenção
+    (ver expurgar_chaves_leitura).
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS leituras_recebidas (
+            chave TEXT PRIMARY KEY,
+            data_recebida INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+
+
+def _v5_indice_manutencoes_por_data(cursor):
+    """Índice (viatura, tipo, data) das manutenções para as consultas de estado em uma data
+    
+    Sem mudanças nas tabelas: o índice é criado por init_database.
+    """
+
+
+def _v6_busca_textual(cursor):
+    """Índices FTS5 de modelo, órgão e observações das manutenções para a busca de viaturas
+    
+    Sem mudanças nas tabelas de origem: os índices e seus gatilhos são criados
+    e preenchidos por init_database.
+    """
+
+
+def _v7_versoes_viatura(cursor):
+    """Versão da última alteração de cada viatura, acompanhada pela réplica de leitura
+    
+    Sem mudanças nas tabelas de origem: a tabela e os gatilhos são criados
+    quando a réplica de leitura é usada pela primeira vez no banco.
+    """
+
+
+def _v8_agenda_sem_viaturas_inativas(cursor):
+    """Agenda de vencimentos passa a marcar as linhas das viaturas desativadas
+    
+    Sem mudanças nas tabelas de origem: a agenda é recriada no formato atual e
+    preenchida por init_database.
+    """
+    cursor.execute("DROP TABLE IF EXISTS agenda_vencimentos")
+
+
+def _v9_busca_acompanha_observacoes(cursor):
+    """Índice das observações passa a acompanhar alterações, não só inclusões e remoções
+    
+    O gatilho é criado por init_database; o índice existente é reconstruído,
+    pois pode guardar termos de observações já alteradas.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'busca_manutencoes'")
+    if cursor.fetchone() is not None:
+        cursor.execute("INSERT INTO busca_manutencoes (busca_manutencoes) VALUES ('rebuild')")
+
+
+# Em ordem: a posição (a partir de 1) é o número da versão
+MIGRACOES = (
+    _v1_esquema_inicial,
+    _v2_datas_em_epoch,
+    _v3_resumos_de_uso,
+    _v4_leituras_recebidas,
+    _v5_indice_manutencoes_por_data,
+    _v6_busca_textual,
+    _v7_versoes_viatura,
+    _v8_agenda_sem_viaturas_inativas,
+    _v9_busca_acompanha_observacoes,
+)
+
+VERSAO_ESQUEMA = len(MIGRACOES)
+
+
+def versao_do_banco(cursor) -> int:
+    return cursor.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migracoes(cursor) -> List[int]:
+    """Aplica as migrações pendentes e retorna as versões aplicadas"""
+    versao = versao_do_banco(cursor)
+    if versao > VERSAO_ESQUEMA:
+        raise RuntimeError(f"Banco na versão {versao}, mais nova que a suportada ({VERSAO_ESQUEMA})")
+    
+    aplicadas = []
+    for numero in range(versao + 1, VERSAO_ESQUEMA + 1):
+        MIGRACOES[numero - 1](cursor)
+        cursor.execute(f"PRAGMA user_version = {numero}")
+        aplicadas.append(numero)
+    return aplicadas
@@ -0,0 +1,188 @@
+"""
+Previsão de vencimento das manutenções pela taxa de uso de cada viatura
+Sistema de Gerenciamento de Frota - Planejamento
+
+A taxa de uso (km/dia) de cada viatura é estimada por regressão linear das
+leituras de odômetro de uma janela recente, calculada para a frota inteira de
+uma só vez. Com ela, cada par (viatura, tipo de manutenção) recebe a data em
+que deve atingir o próximo odômetro; o vencimento previsto é o que ocorrer
+primeiro entre essa data e a próxima data programada.
+
+NumPy é opcional: sem ele o cálculo é feito em Python puro (mais lento).
+"""
+
+import datetime
+import math
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional
+    np = None
+
+from main import SistemaGerenciamentoFrota
+
+# Janela de leituras usada para estimar a taxa de uso
+JANELA_PREVISAO_DIAS = 90
+
+
+class ResultadoPrevisao:
+    """Previsões de toda a frota, uma posição por (viatura, tipo de manutenção)
+    
+    Os atributos são arrays NumPy (ou listas, sem NumPy) alinhados:
+    viatura_id, tipo_manutencao_id, km_por_dia, km_restantes, dias_prazo
+    (até a próxima data programada), dias_km (até atingir o próximo odômetro,
+    infinito se a viatura não roda) e dias_previstos (o menor dos dois).
+    """
+    
+    def __init__(self, viatura_id, tipo_manutencao_id, km_por_dia, km_restantes, dias_prazo, dias_km,
+                 dias_previstos, calculado_em: datetime.datetime):
+        self.viatura_id = viatura_id
+        self.tipo_manutencao_id = tipo_manutencao_id
+        self.km_por_dia = km_por_dia
+        self.km_restantes = km_restantes
+        self.dias_prazo = dias_prazo
+        self.dias_km = dias_km
+        self.dias_previstos = dias_previstos
+        self.calculado_em = calculado_em
+    
+    def __len__(self) -> int:
+        return len(self.viatura_id)
+    
+    def mais_proximos(self, quantidade: int = 20) -> List[Tuple]:
+        """Retorna (viatura_id, tipo_id, km_por_dia, km_restantes, dias_previstos) dos próximos vencimentos"""
+        if np is not None and isinstance(self.dias_previstos, np.ndarray):
+            quantidade = min(quantidade, len(self))
+            if quantidade == 0:
+                return []
+            indices = np.argpartition(self.dias_previstos, quantidade - 1)[:quantidade]
+            indices = indices[np.argsort(self.dias_previstos[indices], kind="stable")]
+        else:
+            indices = sorted(range(len(self)), key=self.dias_previstos.__getitem__)[:quantidade]
+        
+        return [(int(self.viatura_id[i]), int(self.tipo_manutencao_id[i]), float(self.km_por_dia[i]),
+                 int(self.km_restantes[i]), float(self.dias_previstos[i])) for i in indices]
+
+
+class PrevisorManutencoes:
+    """Calcula e guarda em cache as previsões de vencimento da frota"""
+    
+    def __init__(self, sistema: SistemaGerenciamentoFrota, janela_dias: int = JANELA_PREVISAO_DIAS):
+        self.sistema = sistema
+        self.janela_dias = janela_dias
+        self._versao = None
+        self._resultado = None
+    
+    def _versao_dados(self) -> tuple:
+        """Muda sempre que chega uma leitura ou manutenção (ou muda o dia)"""
+        ultima_leitura, ultima_manutencao = self.sistema.conexao.execute(
+            'SELECT (SELECT MAX(id) FROM registros_odometro), (SELECT MAX(id) FROM manutencoes)'
+        ).fetchone()
+        return ultima_leitura, ultima_manutencao, datetime.date.today()
+    
+    def prever(self) -> ResultadoPrevisao:
+        """Retorna as previsões, recalculando apenas se houve novas leituras ou manutenções"""
+        versao = self._versao_dados()
+        if self._resultado is None or versao != self._versao:
+            self._resultado = self._calcular()
+            self._versao = versao
+        return self._resultado
+    
+    def invalidar(self):
+        self._resultado = None
+    
+    def _carregar(self):
+        """Lê as leituras da janela e os pares (viatura, tipo) a prever"""
+        agora = datetime.datetime.now()
+        agora_epoch = int(agora.timestamp())
+        inicio = agora_epoch - self.janela_dias * 86400
+        cursor = self.sistema.conexao.cursor()
+        
+        # Leituras completas e resumos das compactadas, em dias relativos a agora
+        leituras = cursor.execute('''
+            SELECT viatura_id, (data_registro - ?) / 86400.0, odometro
+            FROM registros_odometro WHERE data_registro >= ?
+            UNION ALL
+            SELECT viatura_id, (ultima_data - ?) / 86400.0, ultimo_odometro
+            FROM resumo_odometro WHERE ultima_data >= ?
+        ''', (agora_epoch, inicio, agora_epoch, inicio)).fetchall()
+        
+        pares = cursor.execute('''
+            SELECT u.viatura_id, u.tipo_manutencao_id, u.proximo_odometro - v.odometro_atual,
+                   (u.proxima_data - ?) / 86400.0
+            FROM ultima_manutencao u
+            JOIN viaturas v ON u.viatura_id = v.id
+            WHERE v.ativa = 1
+        ''', (agora_epoch,)).fetchall()
+        
+        return leituras, pares, agora
+    
+    def _calcular(self) -> ResultadoPrevisao:
+        leituras, pares, agora = self._carregar()
+        if np is None:
+            return self._calcular_python(leituras, pares, agora)
+        return self._calcular_numpy(leituras, pares, agora)
+    
+    @staticmethod
+    def _calcular_numpy(leituras, pares, agora) -> ResultadoPrevisao:
+        matriz_leituras = np.array(leituras, dtype=np.float64).reshape(-1, 3)
+        ids = matriz_leituras[:, 0].astype(np.int64)
+        x = matriz_leituras[:, 1]
+        y = matriz_leituras[:, 2]
+        
+        matriz_pares = np.array(pares, dtype=np.float64).reshape(-1, 4)
+        viatura_id = matriz_pares[:, 0].astype(np.int64)
+        tipo_id = matriz_pares[:, 1].astype(np.int64)
+        km_restantes = matriz_pares[:, 2]
+        dias_prazo = matriz_pares[:, 3]
+        
+        # Mínimos quadrados por viatura com somas agrupadas (uma passada para a frota toda)
+        tamanho = int(max(ids.max(initial=0), viatura_id.max(initial=0))) + 1
+        n = np.bincount(ids, minlength=tamanho).astype(np.float64)
+        sx = np.bincount(ids, x, tamanho)
+        sy = np.bincount(ids, y, tamanho)
+        sxx = np.bincount(ids, x * x, tamanho)
+        sxy = np.bincount(ids, x * y, tamanho)
+        denominador = n * sxx - sx * sx
+        with np.errstate(divide="ignore", invalid="ignore"):
+            taxa = np.where((n >= 2) & (denominador > 1e-9), (n * sxy - sx * sy) / denominador, 0.0)
+        taxa = np.maximum(taxa, 0.0)
+        
+        km_por_dia = taxa[viatura_id]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dias_km = np.where(km_restantes <= 0, 0.0,
+                               np.where(km_por_dia > 0, km_restantes / km_por_dia, np.inf))
+        dias_previstos = np.minimum(dias_prazo, dias_km)
+        
+        return ResultadoPrevisao(viatura_id, tipo_id, km_por_dia, km_restantes, dias_prazo, dias_km,
+                                 dias_previstos, agora)
+    
+    @staticmethod
+    def _calcular_python(leituras, pares, agora) -> ResultadoPrevisao:
+        """Mesmo cálculo de _calcular, sem NumPy"""
+        somas = {}
+        for viatura_id, x, y in leituras:
+            s = somas.setdefault(viatura_id, [0, 0.0, 0.0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += x
+            s[2] += y
+            s[3] += x * x
+            s[4] += x * y
+        
+        taxas = {}
+        for viatura_id, (n, sx, sy, sxx, sxy) in somas.items():
+            denominador = n * sxx - sx * sx
+            taxas[viatura_id] = max((n * sxy - sx * sy) / denominador, 0.0) if n >= 2 and denominador > 1e-9 else 0.0
+        
+        colunas = ([], [], [], [], [], [], [])
+        for viatura_id, tipo_id, km_restantes, dias_prazo in pares:
+            km_por_dia = taxas.get(viatura_id, 0.0)
+            if km_restantes <= 0:
+                dias_km = 0.0
+            else:
+                dias_km = km_restantes / km_por_dia if km_por_dia > 0 else math.inf
+            for coluna, valor in zip(colunas, (viatura_id, tipo_id, km_por_dia, km_restantes,
+                                               dias_prazo, dias_km, min(dias_prazo, dias_km))):
+                coluna.append(valor)
+        
+        return ResultadoPrevisao(*colunas, agora)
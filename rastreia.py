@@ -0,0 +1,322 @@
+"""
+Modo de comandos do RASTREIA+ (sem menus interativos)
+Sistema de Gerenciamento de Frota - Automação e integrações
+
+Cada operação vira um subcomando, com saída em JSON (padrão) ou CSV:
+    python rastreia.py cadastrar PM-0001 --modelo "Hilux SW4" --ano 2022 --orgao "Polícia Militar" --odometro 1500
+    python rastreia.py odometro PM-0001 27000 --observacoes "Abastecimento"
+    python rastreia.py manutencao PM-0001 "Troca de Óleo" --data 2024-05-01
+    python rastreia.py alertas --formato csv
+    python rastreia.py historico PM-0001
+    python rastreia.py listar --orgao "Polícia Militar"
+    python rastreia.py estado 2024-01-31 [--viatura PM-0001 | --orgao "Polícia Militar"]
+    python rastreia.py buscar "vazamento oleo" [--limite 20]
+    python rastreia.py buscar PM-00 --prefixo
+
+Lotes: um comando por linha, com a mesma sintaxe (linhas em branco e
+iniciadas por # são ignoradas). Todos rodam em um único processo e conexão,
+com até --por-transacao comandos por transação; cada linha gera um
+resultado em JSONL (ou uma linha CSV com o status):
+    python rastreia.py lote comandos.txt [--por-transacao 500]
+
+O código de saída é 0 quando a operação (ou todas as do lote) foi aceita,
+1 quando alguma foi recusada ou tinha dados inválidos e 2 para erros de sintaxe.
+"""
+
+import argparse
+import contextlib
+import csv
+import datetime
+import heapq
+import json
+import shlex
+import sys
+import time
+
+from main import (
+    OPERACOES_POR_COMMIT,
+    TAMANHO_BUSCA,
+    SistemaGerenciamentoFrota,
+    classificar_alerta,
+    data_para_epoch,
+    epoch_para_data,
+)
+
+CAMPOS_OPERACAO = ("num_vtr", "ok", "motivo")
+CAMPOS_VIATURA = ("num_vtr", "modelo", "ano", "orgao", "odometro", "data_cadastro")
+CAMPOS_ALERTA = ("num_vtr", "modelo", "odometro_atual", "manutencao", "proximo_odometro",
+                 "proxima_data", "km_restantes", "dias_restantes", "status")
+CAMPOS_HISTORICO = ("evento", "data", "odometro", "manutencao", "proximo_odometro", "proxima_data", "observacoes")
+CAMPOS_ESTADO = ("num_vtr", "orgao", "odometro", "manutencao", "data_realizada", "proximo_odometro",
+                 "proxima_data", "km_restantes", "dias_restantes", "status")
+CAMPOS_BUSCA = ("num_vtr", "modelo", "ano", "orgao", "relevancia", "trecho")
+CAMPOS_LOTE = ("linha", "comando", "ok", "motivo")
+
+
+class AnalisadorDeLinha(argparse.ArgumentParser):
+    """Parser das linhas de um lote: erros de sintaxe viram exceções em vez de encerrar o processo
+    
+    --help e demais ações que encerram o parser também viram exceção, e nada
+    é impresso: a saída do lote contém apenas o resultado de cada linha.
+    """
+    
+    def error(self, message):
+        raise ValueError(message)
+    
+    def exit(self, status=0, message=None):
+        raise ValueError(message.strip() if message else "ajuda e versão não estão disponíveis no lote")
+    
+    def _print_message(self, message, file=None):
+        pass
+
+
+def formatar_data(segundos: int) -> str:
+    return epoch_para_data(segundos).isoformat(" ")
+
+
+def cadastrar(sistema, args):
+    if args.ano < 1990 or args.ano > datetime.datetime.now().year + 1:
+        raise ValueError("ano inválido")
+    if args.odometro < 0:
+        raise ValueError("odômetro não pode ser negativo")
+    ok = sistema.cadastrar_viatura(args.num_vtr.upper(), args.modelo, args.ano, args.orgao, args.odometro)
+    motivo = None if ok else "número já cadastrado"
+    return ok, {"num_vtr": args.num_vtr.upper(), "ok": ok, "motivo": motivo}, motivo
+
+
+def odometro(sistema, args):
+    if args.odometro < 0:
+        raise ValueError("odômetro não pode ser negativo")
+    resultado = sistema.atualizar_odometro(args.num_vtr, args.odometro, args.observacoes, args.chave)
+    ok = bool(resultado)
+    motivo = None if ok else resultado.value
+    return ok, {"num_vtr": args.num_vtr.upper(), "ok": ok, "motivo": motivo}, motivo
+
+
+def manutencao(sistema, args):
+    data = epoch_para_data(data_para_epoch(args.data)) if args.data else datetime.datetime.now()
+    ok = sistema.registrar_manutencao(args.num_vtr, args.tipo, data, args.observacoes)
+    motivo = None if ok else "viatura ou tipo de manutenção não encontrado"
+    return ok, {"num_vtr": args.num_vtr.upper(), "ok": ok, "motivo": motivo}, motivo
+
+
+def alertas(sistema, args):
+    linhas = []
+    for alerta in sistema.obter_alertas_manutencao(args.dias, args.km):
+        item = dict(zip(CAMPOS_ALERTA, alerta))
+        item["proxima_data"] = formatar_data(item["proxima_data"])
+        item["status"] = classificar_alerta(item["km_restantes"], item["dias_restantes"]) or "ATENÇÃO"
+        linhas.append(item)
+    return True, linhas, None
+
+
+def historico(sistema, args):
+    if sistema.obter_viatura(args.num_vtr) is None:
+        return False, [], "viatura não encontrada"
+    
+    # Os dois históricos vêm do mais recente para o mais antigo
+    leituras = ((data, "odometro", odometro, None, None, None, observacoes)
+                for odometro, data, observacoes in sistema.iterar_historico_odometro(args.num_vtr))
+    manutencoes = ((data, "manutencao", odometro, nome, proximo_odometro, formatar_data(proxima_data), observacoes)
+                   for nome, odometro, data, proximo_odometro, proxima_data, observacoes
+                   in sistema.iterar_historico_manutencoes(args.num_vtr))
+    
+    linhas = []
+    for data, evento, *resto in heapq.merge(leituras, manutencoes, key=lambda item: item[0], reverse=True):
+        linhas.append(dict(zip(CAMPOS_HISTORICO, (evento, formatar_data(data), *resto))))
+    return True, linhas, None
+
+
+def listar(sistema, args):
+    linhas = []
+    for viatura in sistema.iterar_viaturas(orgao=args.orgao):
+        item = dict(zip(CAMPOS_VIATURA, viatura))
+        item["data_cadastro"] = formatar_data(item["data_cadastro"])
+        linhas.append(item)
+    return True, linhas, None
+
+
+def estado(sistema, args):
+    linhas = []
+    for linha in sistema.estado_em(args.data, args.viatura, args.orgao):
+        item = dict(zip(CAMPOS_ESTADO, linha))
+        for campo in ("data_realizada", "proxima_data"):
+            if item[campo] is not None:
+                item[campo] = formatar_data(item[campo])
+        linhas.append(item)
+    return True, linhas, None
+
+
+def buscar(sistema, args):
+    if args.prefixo:
+        encontradas = [(*viatura[:4], None, None) for viatura in sistema.buscar_por_prefixo(args.texto, args.limite)]
+    else:
+        encontradas = sistema.buscar_viaturas(args.texto, args.limite)
+    return True, [dict(zip(CAMPOS_BUSCA, linha)) for linha in encontradas], None
+
+
+def criar_parser(classe=argparse.ArgumentParser, opcoes_gerais: bool = True) -> argparse.ArgumentParser:
+    """Parser dos subcomandos (as linhas de um lote não têm as opções gerais nem o comando lote)"""
+    gerais = argparse.ArgumentParser(add_help=False)
+    if opcoes_gerais:
+        gerais.add_argument("--db", default="frota.db", help="banco de dados (padrão: frota.db)")
+        gerais.add_argument("--particoes", metavar="DIRETORIO",
+                            help="usa a frota particionada por órgão deste diretório no lugar de --db")
+        gerais.add_argument("--formato", choices=["json", "csv"], default="json", help="formato da saída")
+    
+    parser = classe(prog="rastreia", description="Operações do RASTREIA+ sem menus interativos")
+    comandos = parser.add_subparsers(dest="comando", required=True, metavar="comando")
+    
+    comando = comandos.add_parser("cadastrar", parents=[gerais], help="cadastra uma viatura")
+    comando.add_argument("num_vtr")
+    comando.add_argument("--modelo", required=True)
+    comando.add_argument("--ano", type=int, required=True)
+    comando.add_argument("--orgao", required=True)
+    comando.add_argument("--odometro", type=int, default=0, help="odômetro atual (padrão: 0)")
+    comando.set_defaults(executar=cadastrar, campos=CAMPOS_OPERACAO)
+    
+    comando = comandos.add_parser("odometro", parents=[gerais], help="registra uma leitura de odômetro")
+    comando.add_argument("num_vtr")
+    comando.add_argument("odometro", type=int)
+    comando.add_argument("--observacoes", default="")
+    comando.add_argument("--chave", help="chave de idempotência (reenvios não duplicam a leitura)")
+    comando.set_defaults(executar=odometro, campos=CAMPOS_OPERACAO)
+    
+    comando = comandos.add_parser("manutencao", parents=[gerais], help="registra uma manutenção realizada")
+    comando.add_argument("num_vtr")
+    comando.add_argument("tipo", help="nome do tipo de manutenção (ex.: \"Troca de Óleo\")")
+    comando.add_argument("--data", help="data ISO da manutenção (padrão: agora)")
+    comando.add_argument("--observacoes", default="")
+    comando.set_defaults(executar=manutencao, campos=CAMPOS_OPERACAO)
+    
+    comando = comandos.add_parser("alertas", parents=[gerais], help="alertas de manutenção")
+    comando.add_argument("--dias", type=int, default=30, help="antecedência em dias (padrão: 30)")
+    comando.add_argument("--km", type=int, default=500, help="antecedência em km (padrão: 500)")
+    comando.set_defaults(executar=alertas, campos=CAMPOS_ALERTA)
+    
+    comando = comandos.add_parser("historico", parents=[gerais], help="leituras e manutenções de uma viatura")
+    comando.add_argument("num_vtr")
+    comando.set_defaults(executar=historico, campos=CAMPOS_HISTORICO)
+    
+    comando = comandos.add_parser("listar", parents=[gerais], help="viaturas ativas")
+    comando.add_argument("--orgao")
+    comando.set_defaults(executar=listar, campos=CAMPOS_VIATURA)
+    
+    comando = comandos.add_parser("estado", parents=[gerais], help="odômetro e alertas da frota em uma data passada")
+    comando.add_argument("data", help="data ISO (ex.: 2024-01-31 ou \"2024-01-31 18:00\")")
+    comando.add_argument("--viatura", help="apenas esta viatura")
+    comando.add_argument("--orgao", help="apenas as viaturas deste órgão")
+    comando.set_defaults(executar=estado, campos=CAMPOS_ESTADO)
+    
+    comando = comandos.add_parser("buscar", parents=[gerais],
+                                  help="busca viaturas por modelo, órgão e observações das manutenções")
+    comando.add_argument("texto", help="palavras (ou inícios de palavras) a buscar")
+    comando.add_argument("--prefixo", action="store_true", help="busca pelo início do número da viatura")
+    comando.add_argument("--limite", type=int, default=TAMANHO_BUSCA,
+                         help=f"máximo de viaturas retornadas (padrão: {TAMANHO_BUSCA})")
+    comando.set_defaults(executar=buscar, campos=CAMPOS_BUSCA)
+    
+    if opcoes_gerais:
+        comando = comandos.add_parser("lote", parents=[gerais], help="executa os comandos de um arquivo")
+        comando.add_argument("arquivo", help="um comando por linha ('-' para entrada padrão)")
+        comando.add_argument("--por-transacao", type=int, default=OPERACOES_POR_COMMIT,
+                             help=f"comandos confirmados em cada transação (padrão: {OPERACOES_POR_COMMIT})")
+    return parser
+
+
+def escrever(saida, formato: str, campos, resultado):
+    """Escreve um objeto ou uma lista de objetos em JSON ou CSV (com cabeçalho)"""
+    if formato == "json":
+        json.dump(resultado, saida, ensure_ascii=False)
+        saida.write("\n")
+        return
+    escritor = csv.DictWriter(saida, campos)
+    escritor.writeheader()
+    escritor.writerows([resultado] if isinstance(resultado, dict) else resultado)
+
+
+def ler_comandos(arquivo):
+    """Gera (número da linha, argumentos) das linhas com comandos"""
+    for numero, linha in enumerate(arquivo, 1):
+        texto = linha.strip()
+        if texto and not texto.startswith("#"):
+            yield numero, texto
+
+
+def executar_lote(sistema, arquivo, formato: str, por_transacao: int, saida) -> int:
+    """Executa os comandos do arquivo e retorna quantos foram recusados
+    
+    Cada comando roda em um savepoint dentro da transação do grupo: qualquer
+    erro (sintaxe, argumentos, banco) desfaz só o comando, que é relatado
+    com o erro como motivo e o lote segue.
+    """
+    parser = criar_parser(AnalisadorDeLinha, opcoes_gerais=False)
+    escritor = csv.writer(saida) if formato == "csv" else None
+    if escritor:
+        escritor.writerow(CAMPOS_LOTE)
+    
+    # A frota particionada não tem transação única: cada comando confirma na sua partição
+    escopo = sistema.transacao if isinstance(sistema, SistemaGerenciamentoFrota) else contextlib.nullcontext
+    comandos = ler_comandos(arquivo)
+    recusados = 0
+    
+    while True:
+        grupo = [item for _, item in zip(range(por_transacao), comandos)]
+        if not grupo:
+            return recusados
+        
+        with escopo():
+            for numero, texto in grupo:
+                nome, resultado = texto.split()[0], None
+                try:
+                    with escopo():  # Savepoint do comando, desfeito se ele falhar
+                        args = parser.parse_args(shlex.split(texto))
+                        ok, resultado, motivo = args.executar(sistema, args)
+                except Exception as erro:
+                    ok, motivo = False, str(erro) or type(erro).__name__
+                
+                recusados += not ok
+                if escritor:
+                    escritor.writerow((numero, nome, ok, motivo))
+                else:
+                    json.dump({"linha": numero, "comando": nome, "ok": ok, "motivo": motivo, "resultado": resultado},
+                              saida, ensure_ascii=False)
+                    saida.write("\n")
+
+
+def main(argv=None) -> int:
+    args = criar_parser().parse_args(argv)
+    
+    if args.particoes:
+        from frota_particionada import SistemaParticionado
+        sistema = SistemaParticionado(args.particoes)
+    else:
+        sistema = SistemaGerenciamentoFrota(args.db)
+    
+    with sistema:
+        if args.comando == "lote":
+            arquivo = sys.stdin if args.arquivo == "-" else open(args.arquivo, encoding="utf-8")
+            try:
+                inicio = time.perf_counter()
+                recusados = executar_lote(sistema, arquivo, args.formato, max(1, args.por_transacao), sys.stdout)
+                duracao = time.perf_counter() - inicio
+            finally:
+                if arquivo is not sys.stdin:
+                    arquivo.close()
+            print(f"Lote executado em {duracao:.2f}s ({recusados:,} comandos recusados)", file=sys.stderr)
+            return 1 if recusados else 0
+        
+        try:
+            ok, resultado, motivo = args.executar(sistema, args)
+        except ValueError as erro:
+            print(f"rastreia: {erro}", file=sys.stderr)
+            return 1
+    
+    escrever(sys.stdout, args.formato, args.campos, resultado)
+    if motivo:
+        print(f"rastreia: {motivo}", file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
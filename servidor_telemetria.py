@@ -0,0 +1,313 @@
+"""
+Servidor de telemetria do RASTREIA+ (HTTP, asyncio)
+Sistema de Gerenciamento de Frota - Integração com gateways das viaturas
+
+Endpoints:
+    POST /leituras   corpo JSON (objeto ou lista) ou JSONL com
+                     {"num_vtr": "PM-0001", "odometro": 27000, "observacoes": "...", "data": "..."}
+                     e, para reenvios seguros, "chave" ou "dispositivo" e "sequencia"
+    GET  /alertas    alertas de manutenção atuais (obter_alertas_manutencao)
+    GET  /status     contadores do servidor
+
+As leituras recebidas ficam em uma fila limitada (quando cheia, as conexões
+deixam de ser lidas até haver espaço) e são gravadas em lotes por
+atualizar_odometro_lote. Cada requisição recebe o resultado das suas leituras
+depois que o lote foi confirmado no banco. Leituras com chave já aplicadas
+(reenvios após um timeout) são confirmadas como "repetidas" sem nova gravação.
+
+Com --replica, GET /alertas é respondido por uma réplica em memória,
+mantida em dia pelas versões das viaturas alteradas (ver ReplicaLeitura).
+
+Uso:
+    python servidor_telemetria.py [--host 127.0.0.1] [--porta 8080] [--db frota.db | --particoes DIRETORIO] [--replica]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from main import SistemaGerenciamentoFrota, chave_de_leitura, epoch_para_data
+
+# Requisições aguardando gravação (acima disso os clientes esperam)
+TAMANHO_FILA = 20000
+
+# Máximo de leituras gravadas por lote
+LEITURAS_POR_LOTE = 20000
+
+# Tamanho máximo do corpo de uma requisição
+TAMANHO_MAXIMO_CORPO = 1024 * 1024
+
+# Intervalo entre os expurgos das chaves de idempotência vencidas, em segundos
+INTERVALO_EXPURGO = 3600
+
+# Intervalo entre as varreduras dos alertas cujo prazo cruzou um limite, em segundos
+INTERVALO_VARREDURA = 300
+
+MENSAGENS_HTTP = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+class ServidorTelemetria:
+    """Recebe leituras por HTTP e as grava em lotes no SistemaGerenciamentoFrota"""
+    
+    def __init__(self, sistema: SistemaGerenciamentoFrota, tamanho_fila: int = TAMANHO_FILA,
+                 leituras_por_lote: int = LEITURAS_POR_LOTE):
+        self.sistema = sistema
+        self.leituras_por_lote = leituras_por_lote
+        self.fila = asyncio.Queue(maxsize=tamanho_fila)
+        self.contadores = {"requisicoes": 0, "leituras": 0, "aceitas": 0, "repetidas": 0, "rejeitadas": 0,
+                           "lotes": 0}
+        
+        # Um único executor de escrita mantém os lotes em ordem; leituras usam outras threads
+        self._executor_escrita = ThreadPoolExecutor(max_workers=1, thread_name_prefix="telemetria-escrita")
+        self._executor_leitura = ThreadPoolExecutor(max_workers=2, thread_name_prefix="telemetria-leitura")
+        self._tarefa_gravacao = None
+        self._tarefa_expurgo = None
+        self._tarefa_varredura = None
+    
+    async def iniciar(self, host: str, porta: int) -> asyncio.AbstractServer:
+        self._tarefa_gravacao = asyncio.create_task(self._gravar_lotes())
+        self._tarefa_expurgo = asyncio.create_task(self._expurgar_chaves())
+        self._tarefa_varredura = asyncio.create_task(self._varrer_alertas())
+        return await asyncio.start_server(self._atender, host, porta, backlog=4096)
+    
+    async def encerrar(self):
+        for tarefa in (self._tarefa_gravacao, self._tarefa_expurgo, self._tarefa_varredura):
+            if tarefa:
+                tarefa.cancel()
+        self._executor_escrita.shutdown()
+        self._executor_leitura.shutdown()
+    
+    async def _gravar_lotes(self):
+        """Agrupa as requisições pendentes e grava cada grupo em um lote"""
+        loop = asyncio.get_running_loop()
+        while True:
+            pedidos = [await self.fila.get()]
+            total = len(pedidos[0][0])
+            
+            # O que chegou durante a gravação anterior entra no mesmo lote
+            while total < self.leituras_por_lote and not self.fila.empty():
+                pedido = self.fila.get_nowait()
+                pedidos.append(pedido)
+                total += len(pedido[0])
+            
+            leituras = [leitura for pedido in pedidos for leitura in pedido[0]]
+            try:
+                relatorio = await loop.run_in_executor(
+                    self._executor_escrita, self.sistema.atualizar_odometro_lote, leituras)
+            except Exception as erro:
+                for _, future in pedidos:
+                    if not future.done():
+                        future.set_exception(erro)
+                continue
+            
+            self.contadores["lotes"] += 1
+            inicio = 0
+            for quantidade, future in ((len(pedido[0]), pedido[1]) for pedido in pedidos):
+                # Índices relativos às leituras da própria requisição, não ao lote combinado
+                parte = [(indice - inicio, num_vtr, aceita, motivo)
+                         for indice, num_vtr, aceita, motivo in relatorio[inicio:inicio + quantidade]]
+                inicio += quantidade
+                if not future.done():
+                    future.set_result(parte)
+    
+    async def _expurgar_chaves(self):
+        """Remove periodicamente as chaves de idempotência fora da janela de retenção"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # No executor de escrita, entre os lotes, para não disputar o lock do banco
+                await loop.run_in_executor(self._executor_escrita, self.sistema.expurgar_chaves_leitura)
+            except Exception as erro:
+                # Uma falha (ex.: banco bloqueado) não interrompe os próximos expurgos
+                print(f"Falha no expurgo das chaves de leitura: {erro}", file=sys.stderr, flush=True)
+            await asyncio.sleep(INTERVALO_EXPURGO)
+    
+    async def _varrer_alertas(self):
+        """Grava periodicamente o status dos alertas cujo prazo cruzou um limite"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # Também no executor de escrita: GET /alertas só lê o banco
+                await loop.run_in_executor(self._executor_escrita, self.sistema.varrer_alertas)
+            except Exception as erro:
+                print(f"Falha na varredura dos alertas: {erro}", file=sys.stderr, flush=True)
+            await asyncio.sleep(INTERVALO_VARREDURA)
+    
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atende as requisições de uma conexão (HTTP/1.1 com keep-alive)"""
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                try:
+                    metodo, caminho, versao = linha.decode("latin-1").split()
+                except ValueError:
+                    await self._responder(writer, 400, {"erro": "requisição inválida"}, False)
+                    break
+                
+                cabecalhos = {}
+                while True:
+                    linha = await reader.readline()
+                    if linha in (b"\r\n", b"\n", b""):
+                        break
+                    nome, _, valor = linha.decode("latin-1").partition(":")
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                
+                manter = (cabecalhos.get("connection", "").lower() != "close"
+                          and versao.upper() == "HTTP/1.1")
+                try:
+                    tamanho = int(cabecalhos.get("content-length", 0) or 0)
+                    if tamanho < 0:
+                        raise ValueError(tamanho)
+                except ValueError:
+                    await self._responder(writer, 400, {"erro": "Content-Length inválido"}, False)
+                    break
+                if tamanho > TAMANHO_MAXIMO_CORPO:
+                    await self._responder(writer, 413, {"erro": "corpo muito grande"}, False)
+                    break
+                corpo = await reader.readexactly(tamanho) if tamanho else b""
+                
+                self.contadores["requisicoes"] += 1
+                status, resposta = await self._rotear(metodo.upper(), caminho.split("?")[0], corpo)
+                await self._responder(writer, status, resposta, manter)
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _rotear(self, metodo: str, caminho: str, corpo: bytes):
+        loop = asyncio.get_running_loop()
+        
+        if caminho == "/leituras":
+            if metodo != "POST":
+                return 405, {"erro": "use POST"}
+            try:
+                leituras = self._decodificar_leituras(corpo)
+            except ValueError as erro:
+                return 400, {"erro": f"corpo inválido: {erro}"}
+            
+            future = loop.create_future()
+            await self.fila.put((leituras, future))  # Espera aqui quando a fila está cheia
+            try:
+                relatorio = await future
+            except Exception as erro:
+                return 500, {"erro": f"falha ao gravar as leituras: {erro}"}
+            
+            rejeitadas = [{"indice": indice, "num_vtr": num_vtr, "motivo": motivo}
+                          for indice, num_vtr, aceita, motivo in relatorio if not aceita]
+            repetidas = sum(1 for _, _, aceita, motivo in relatorio if aceita and motivo)
+            self.contadores["leituras"] += len(relatorio)
+            self.contadores["rejeitadas"] += len(rejeitadas)
+            self.contadores["repetidas"] += repetidas
+            self.contadores["aceitas"] += len(relatorio) - len(rejeitadas)
+            return 200, {"aceitas": len(relatorio) - len(rejeitadas), "repetidas": repetidas,
+                         "rejeitadas": rejeitadas}
+        
+        if caminho == "/alertas":
+            if metodo != "GET":
+                return 405, {"erro": "use GET"}
+            alertas = await loop.run_in_executor(self._executor_leitura, self.sistema.obter_alertas_manutencao)
+            campos = ("num_vtr", "modelo", "odometro_atual", "manutencao", "proximo_odometro",
+                      "proxima_data", "km_restantes", "dias_restantes")
+            itens = [dict(zip(campos, alerta)) for alerta in alertas]
+            for item in itens:
+                item["proxima_data"] = epoch_para_data(item["proxima_data"]).isoformat(" ")
+            return 200, itens
+        
+        if caminho == "/status":
+            return 200, {**self.contadores, "fila": self.fila.qsize()}
+        
+        return 404, {"erro": "caminho não encontrado"}
+    
+    @staticmethod
+    def _decodificar_leituras(corpo: bytes) -> list:
+        """Aceita um objeto JSON (mesmo em várias linhas), uma lista JSON ou JSONL"""
+        texto = corpo.decode("utf-8").strip()
+        if not texto:
+            return []
+        try:
+            itens = json.loads(texto)
+        except json.JSONDecodeError:
+            # Mais de um documento: JSONL, um objeto por linha
+            itens = [json.loads(linha) for linha in texto.splitlines() if linha.strip()]
+        if not isinstance(itens, list):
+            itens = [itens]
+        for indice, item in enumerate(itens):
+            if not isinstance(item, dict):
+                raise ValueError(f"a leitura {indice} não é um objeto JSON")
+        return [(item.get("num_vtr"), item.get("odometro"), item.get("observacoes"), item.get("data"),
+                 chave_de_leitura(item.get("chave"), item.get("dispositivo"), item.get("sequencia")))
+                for item in itens]
+    
+    @staticmethod
+    async def _responder(writer: asyncio.StreamWriter, status: int, corpo, manter: bool):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        cabecalho = (f"HTTP/1.1 {status} {MENSAGENS_HTTP.get(status, '')}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(dados)}\r\n"
+                     f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n")
+        writer.write(cabecalho.encode("latin-1") + dados)
+        await writer.drain()
+
+
+def aumentar_limite_arquivos():
+    """Eleva o limite de descritores abertos para suportar milhares de conexões
+    
+    O módulo resource só existe em sistemas Unix; no Windows o limite fica como está.
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    
+    suave, rigido = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if suave < rigido:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (rigido, rigido))
+
+
+async def executar(host: str, porta: int, db_name: str, particoes: Optional[str] = None, replica: bool = False):
+    if particoes:
+        from frota_particionada import SistemaParticionado
+        sistema, origem = SistemaParticionado(particoes, replica_leitura=replica), f"partições: {particoes}"
+    else:
+        sistema, origem = SistemaGerenciamentoFrota(db_name, replica_leitura=replica), f"banco: {db_name}"
+    
+    with sistema:
+        servidor_telemetria = ServidorTelemetria(sistema)
+        servidor = await servidor_telemetria.iniciar(host, porta)
+        print(f"Servidor de telemetria em http://{host}:{porta} ({origem})", flush=True)
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            await servidor_telemetria.encerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de telemetria do RASTREIA+")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--db", default="frota.db", help="banco de dados (padrão: frota.db)")
+    parser.add_argument("--particoes", metavar="DIRETORIO",
+                        help="usa a frota particionada por órgão deste diretório no lugar de --db")
+    parser.add_argument("--replica", action="store_true", help="responde os alertas por uma réplica em memória")
+    args = parser.parse_args()
+    
+    aumentar_limite_arquivos()
+    try:
+        asyncio.run(executar(args.host, args.porta, args.db, args.particoes, args.replica))
+    except KeyboardInterrupt:
+        print("\nServidor encerrado.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Testes de proximos_vencimentos e da agenda em memória"""
+
+import datetime
+import os
+import tempfile
+import unittest
+
+from main import SistemaGerenciamentoFrota
+
+
+class TestAgendaVencimentos(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.diretorio.name, "frota.db")
+        self.sistema = SistemaGerenciamentoFrota(self.db_name)
+        # PM-1 vence antes de PM-2
+        for num_vtr, dias in (("PM-1", 100), ("PM-2", 0)):
+            self.sistema.cadastrar_viatura(num_vtr, "Gol", 2020, "PM", 1000)
+            self.sistema.registrar_manutencao(num_vtr, "Troca de Óleo",
+                                              datetime.datetime.now() - datetime.timedelta(days=dias))
+    
+    def tearDown(self):
+        self.sistema.close()
+        self.diretorio.cleanup()
+    
+    def viaturas_na_agenda(self, sistema=None):
+        ate = datetime.datetime(2100, 1, 1)
+        return sorted({item[0] for item in (sistema or self.sistema).proximos_vencimentos(None, ate)})
+    
+    def test_viatura_desativada_sai_da_agenda(self):
+        self.assertEqual(self.viaturas_na_agenda(), ["PM-1", "PM-2"])
+        
+        # Desativação feita diretamente no banco, por outra conexão: a agenda já carregada acompanha
+        with SistemaGerenciamentoFrota(self.db_name) as outro:
+            with outro.transacao() as cursor:
+                cursor.execute("UPDATE viaturas SET ativa = 0 WHERE num_vtr = 'PM-1'")
+        self.assertEqual(self.viaturas_na_agenda(), ["PM-2"])
+        with SistemaGerenciamentoFrota(self.db_name) as novo:
+            self.assertEqual(self.viaturas_na_agenda(novo), ["PM-2"])
+        
+        # O recálculo completo mantém a viatura fora; reativada, ela volta
+        self.sistema.recalcular_alertas()
+        self.assertEqual(self.viaturas_na_agenda(), ["PM-2"])
+        with self.sistema.transacao() as cursor:
+            cursor.execute("UPDATE viaturas SET ativa = 1 WHERE num_vtr = 'PM-1'")
+        self.assertEqual(self.viaturas_na_agenda(), ["PM-1", "PM-2"])
+    
+    def test_quantidade_conta_so_viaturas_ativas(self):
+        self.assertEqual(self.sistema.proximos_vencimentos(1)[0][0], "PM-1")
+        with self.sistema.transacao() as cursor:
+            cursor.execute("UPDATE viaturas SET ativa = 0 WHERE num_vtr = 'PM-1'")
+        self.assertEqual([item[0] for item in self.sistema.proximos_vencimentos(1)], ["PM-2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Testes de obter_alertas_manutencao"""
+
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from main import SistemaGerenciamentoFrota
+
+
+class TestAlertas(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.diretorio.name, "frota.db")
+        self.sistema = SistemaGerenciamentoFrota(self.db_name, pragmas={"busy_timeout": 100})
+        self.sistema.cadastrar_viatura("PM-1", "Gol", 2020, "PM", 1000)
+        self.sistema.cadastrar_viatura("PM-2", "Gol", 2020, "PM", 1000)
+        intervalo_dias = self.sistema.conexao.execute(
+            "SELECT intervalo_dias FROM tipos_manutencao WHERE nome = 'Troca de Óleo'").fetchone()[0]
+        self.sistema.registrar_manutencao("PM-1", "Troca de Óleo",
+                                          datetime.datetime.now() - datetime.timedelta(days=intervalo_dias - 10))
+        self.sistema.registrar_manutencao("PM-2", "Troca de Óleo", datetime.datetime.now())
+        
+        # Como se o alerta de PM-1 tivesse sido calculado antes de entrar no prazo de 30 dias
+        with self.sistema.transacao() as cursor:
+            cursor.execute('''
+                UPDATE estado_alertas SET status = NULL, reavaliar_em = proxima_data - 30 * 86400
+                WHERE viatura_id = (SELECT id FROM viaturas WHERE num_vtr = 'PM-1')
+            ''')
+    
+    def tearDown(self):
+        self.sistema.close()
+        self.diretorio.cleanup()
+    
+    def test_prazo_vencido_entra_na_leitura_sem_gravar(self):
+        # Outra conexão segura o lock de escrita: a leitura não pode precisar dele
+        bloqueio = sqlite3.connect(self.db_name, isolation_level=None)
+        bloqueio.execute("BEGIN IMMEDIATE")
+        try:
+            alertas = self.sistema.obter_alertas_manutencao()
+        finally:
+            bloqueio.execute("ROLLBACK")
+            bloqueio.close()
+        self.assertEqual([alerta[0] for alerta in alertas], ["PM-1"])
+        
+        self.assertEqual(self.sistema.varrer_alertas(), 1)
+        self.assertEqual([alerta[:7] for alerta in self.sistema.obter_alertas_manutencao()],
+                         [alerta[:7] for alerta in alertas])
+    
+    def test_replica_avalia_prazos_em_memoria(self):
+        with SistemaGerenciamentoFrota(self.db_name, pragmas={"busy_timeout": 100},
+                                       replica_leitura=True) as replica:
+            # O primeiro uso cria os gatilhos de versoes_viatura; as leituras seguintes não gravam
+            replica.listar_viaturas()
+            bloqueio = sqlite3.connect(self.db_name, isolation_level=None)
+            bloqueio.execute("BEGIN IMMEDIATE")
+            try:
+                alertas = replica.obter_alertas_manutencao()
+            finally:
+                bloqueio.execute("ROLLBACK")
+                bloqueio.close()
+            esperados = self.sistema.obter_alertas_manutencao()
+            self.assertEqual([alerta[:7] for alerta in alertas], [alerta[:7] for alerta in esperados])
+            self.assertEqual([alerta[0] for alerta in alertas], ["PM-1"])
+    
+    def test_gatilhos_de_versao_so_com_replica(self):
+        gatilhos = "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%versao%'"
+        self.sistema.atualizar_odometro("PM-1", 2000)
+        self.assertEqual(self.sistema.conexao.execute(gatilhos).fetchone()[0], 0)
+        
+        with SistemaGerenciamentoFrota(self.db_name, replica_leitura=True,
+                                       cache_entre_processos=True) as replica:
+            self.assertEqual(len(replica.listar_viaturas()), 2)
+            self.assertEqual(self.sistema.conexao.execute(gatilhos).fetchone()[0], 4)
+            carregada = replica._replica
+            
+            # Escritas de outra conexão chegam pela versão, sem recarregar a réplica inteira
+            self.sistema.atualizar_odometro("PM-1", 3000)
+            replica.atualizar_odometro("PM-1", 4000)
+            self.assertEqual(replica.listar_viaturas()[0][4], 4000)
+            self.sistema.cadastrar_viatura("PM-3", "Gol", 2020, "PM", 100)
+            self.assertEqual([viatura[0] for viatura in replica.listar_viaturas()], ["PM-1", "PM-2", "PM-3"])
+            self.assertIs(replica._replica, carregada)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Testes do backup online"""
+
+import datetime
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import backup_banco
+from main import SistemaGerenciamentoFrota
+
+
+class TestBackup(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.diretorio.name, "frota.db")
+        self.destino = os.path.join(self.diretorio.name, "backups")
+        with SistemaGerenciamentoFrota(self.db_name) as sistema:
+            sistema.cadastrar_viatura("PM-1", "Gol", 2020, "PM", 100)
+    
+    def tearDown(self):
+        self.diretorio.cleanup()
+    
+    def test_origem_inexistente_nao_cria_banco(self):
+        origem = os.path.join(self.diretorio.name, "nao_existe.db")
+        with self.assertRaises(FileNotFoundError):
+            backup_banco.copiar_banco(origem, os.path.join(self.diretorio.name, "copia.db"))
+        self.assertFalse(os.path.exists(origem))
+    
+    def test_snapshots_no_mesmo_segundo_nao_se_sobrescrevem(self):
+        instante = datetime.datetime(2026, 1, 2, 3, 4, 5)
+        with mock.patch.object(backup_banco.datetime, "datetime", wraps=datetime.datetime) as relogio:
+            relogio.now.return_value = instante
+            caminhos = [backup_banco.fazer_snapshot(self.destino, self.db_name, manter=2) for _ in range(3)]
+        
+        nomes = [os.path.basename(caminho) for caminho in caminhos]
+        self.assertEqual(nomes, ["frota-20260102-030405.db", "frota-20260102-030405-2.db",
+                                 "frota-20260102-030405-3.db"])
+        # A retenção remove o mais antigo, não o de nome menor
+        self.assertEqual(backup_banco.listar_snapshots(self.destino, "frota"), caminhos[1:])
+
+
+if __name__ == "__main__":
+    unittest.main()
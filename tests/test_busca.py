@@ -0,0 +1,73 @@
+"""Testes da busca de viaturas por prefixo e por texto (FTS5)"""
+
+import datetime
+import os
+import tempfile
+import unittest
+
+from main import SistemaGerenciamentoFrota
+
+
+class TestBusca(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.sistema = SistemaGerenciamentoFrota(os.path.join(self.diretorio.name, "frota.db"))
+        self.sistema.cadastrar_viatura("PM-1", "Hilux", 2020, "Polícia Militar")
+        self.sistema.cadastrar_viatura("PM-2", "Gol", 2020, "Polícia Militar")
+        self.sistema.cadastrar_viatura("CB-1", "Ranger", 2021, "Bombeiros")
+        self.sistema.registrar_manutencao("PM-2", "Troca de Óleo", datetime.datetime.now(), "vazamento de óleo no cárter")
+    
+    def tearDown(self):
+        self.sistema.close()
+        self.diretorio.cleanup()
+    
+    def encontradas(self, texto: str) -> list:
+        return sorted(viatura[0] for viatura in self.sistema.buscar_viaturas(texto))
+    
+    def executar(self, sql: str, parametros=()):
+        with self.sistema.transacao() as cursor:
+            cursor.execute(sql, parametros)
+    
+    def conferir_indices(self):
+        # Em external content, o integrity-check compara o índice com a tabela de origem
+        for indice in ("busca_viaturas", "busca_manutencoes"):
+            self.executar(f"INSERT INTO {indice} ({indice}, rank) VALUES ('integrity-check', 1)")
+    
+    def test_busca_por_modelo_orgao_e_observacao(self):
+        self.assertEqual(self.encontradas("hilux"), ["PM-1"])
+        self.assertEqual(self.encontradas("policia"), ["PM-1", "PM-2"])
+        self.assertEqual(self.encontradas("vazamento ole"), ["PM-2"])
+        trecho = self.sistema.buscar_viaturas("carter")[0][5]
+        self.assertIn("[cárter]", trecho)
+        self.assertEqual([viatura[0] for viatura in self.sistema.buscar_por_prefixo("pm-")], ["PM-1", "PM-2"])
+    
+    def test_indice_acompanha_alteracao_e_remocao_de_viaturas(self):
+        self.executar("UPDATE viaturas SET modelo = 'Trailblazer', orgao = 'Polícia Civil' WHERE num_vtr = 'PM-1'")
+        self.assertEqual(self.encontradas("hilux"), [])
+        self.assertEqual(self.encontradas("trailblazer civil"), ["PM-1"])
+        self.assertEqual(self.encontradas("militar"), ["PM-2"])
+        
+        self.executar("DELETE FROM viaturas WHERE num_vtr = 'CB-1'")
+        self.assertEqual(self.encontradas("ranger"), [])
+        self.assertEqual(self.encontradas("bombeiros"), [])
+        self.conferir_indices()
+    
+    def test_indice_acompanha_alteracao_e_remocao_de_observacoes(self):
+        self.executar("UPDATE manutencoes SET observacoes = 'ruído na suspensão'")
+        self.assertEqual(self.encontradas("vazamento"), [])
+        self.assertEqual(self.encontradas("suspensao"), ["PM-2"])
+        self.conferir_indices()
+        
+        self.executar("DELETE FROM manutencoes")
+        self.assertEqual(self.encontradas("suspensao"), [])
+        self.conferir_indices()
+    
+    def test_viatura_desativada_fora_da_busca(self):
+        self.executar("UPDATE viaturas SET ativa = 0 WHERE num_vtr = 'PM-1'")
+        self.assertEqual(self.encontradas("policia"), ["PM-2"])
+        self.assertEqual([viatura[0] for viatura in self.sistema.buscar_por_prefixo("PM")], ["PM-2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
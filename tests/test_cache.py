@@ -0,0 +1,75 @@
+"""Testes dos caches de viaturas e tipos de manutenção"""
+
+import datetime
+import os
+import tempfile
+import unittest
+
+from main import CacheLimitado, SistemaGerenciamentoFrota
+
+
+class TestCacheLimitado(unittest.TestCase):
+    
+    def test_sai_o_item_usado_ha_mais_tempo(self):
+        cache = CacheLimitado(2)
+        cache.guardar("a", 1)
+        cache.guardar("b", 2)
+        self.assertEqual(cache.obter("a"), 1)
+        cache.guardar("c", 3)
+        self.assertIsNone(cache.obter("b"))
+        self.assertEqual((cache.obter("a"), cache.obter("c")), (1, 3))
+        
+        cache.invalidar("a")
+        self.assertIsNone(cache.obter("a"))
+        estatisticas = cache.estatisticas()
+        self.assertEqual((estatisticas["itens"], estatisticas["acertos"], estatisticas["falhas"]), (1, 3, 2))
+
+
+class TestCacheEntreProcessos(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.diretorio.name, "frota.db")
+        self.sistema = SistemaGerenciamentoFrota(self.db_name, cache_entre_processos=True)
+        self.sistema.cadastrar_viatura("PM-1", "Gol", 2020, "PM", 1000)
+        self.assertTrue(self.sistema.atualizar_odometro("PM-1", 2000))
+    
+    def tearDown(self):
+        self.sistema.close()
+        self.diretorio.cleanup()
+    
+    def odometros(self):
+        return dict(self.sistema.conexao.execute("SELECT num_vtr, odometro_atual FROM viaturas"))
+    
+    def test_escrita_de_outra_conexao_invalida_o_cache(self):
+        # Outro processo renumera a viatura e cadastra outra com o número antigo
+        with SistemaGerenciamentoFrota(self.db_name) as outro:
+            with outro.transacao() as cursor:
+                cursor.execute("UPDATE viaturas SET num_vtr = 'PM-9' WHERE num_vtr = 'PM-1'")
+            outro.cadastrar_viatura("PM-1", "Gol", 2021, "PM", 100)
+        
+        # Com o id guardado antes, a leitura iria para PM-9
+        self.assertTrue(self.sistema.atualizar_odometro("PM-1", 3000))
+        self.assertEqual(self.odometros(), {"PM-9": 2000, "PM-1": 3000})
+    
+    def test_tipo_alterado_por_outra_conexao(self):
+        self.sistema.registrar_manutencao("PM-1", "Troca de Óleo", datetime.datetime.now())
+        with SistemaGerenciamentoFrota(self.db_name) as outro:
+            with outro.transacao() as cursor:
+                cursor.execute("UPDATE tipos_manutencao SET intervalo_km = 7000 WHERE nome = 'Troca de Óleo'")
+        
+        self.sistema.registrar_manutencao("PM-1", "Troca de Óleo", datetime.datetime.now())
+        proximos = self.sistema.conexao.execute("SELECT proximo_odometro FROM manutencoes ORDER BY id").fetchall()
+        self.assertEqual(proximos, [(12000,), (9000,)])
+    
+    def test_escritas_da_propria_conexao_mantem_o_cache(self):
+        invalidacoes = self.sistema.estatisticas_cache()["viaturas"]["invalidacoes"]
+        for odometro in (3000, 4000, 5000):
+            self.assertTrue(self.sistema.atualizar_odometro("PM-1", odometro))
+        estatisticas = self.sistema.estatisticas_cache()["viaturas"]
+        self.assertEqual(estatisticas["invalidacoes"], invalidacoes)
+        self.assertGreaterEqual(estatisticas["acertos"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Testes da compactação do histórico de odômetro"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from main import SistemaGerenciamentoFrota
+
+
+class TestCompactacao(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.diretorio.name, "frota.db")
+        with SistemaGerenciamentoFrota(self.db_name) as sistema:
+            sistema.cadastrar_viatura("A1", "Gol", 2020, "PM")
+            antigo = int(time.time()) - 400 * 86400
+            sistema.atualizar_odometro_lote([("A1", i, "x" * 200, antigo + i) for i in range(1, 5001)])
+        
+        # Banco anterior ao vacuum incremental
+        conn = sqlite3.connect(self.db_name)
+        conn.execute("PRAGMA auto_vacuum = NONE")
+        conn.execute("VACUUM")
+        conn.close()
+    
+    def tearDown(self):
+        self.diretorio.cleanup()
+    
+    def test_banco_sem_auto_vacuum_informa_paginas_livres(self):
+        with SistemaGerenciamentoFrota(self.db_name) as sistema:
+            totais = sistema.compactar_registros_odometro(dias_retencao=90)
+            self.assertEqual(totais["leituras_compactadas"], 5000)
+            self.assertFalse(totais["vacuum_incremental"])
+            self.assertGreater(totais["paginas_livres"], 0)
+            
+            tamanho = os.path.getsize(self.db_name)
+            self.assertTrue(sistema.ativar_vacuum_incremental())
+            self.assertFalse(sistema.ativar_vacuum_incremental())
+            self.assertLess(os.path.getsize(self.db_name), tamanho)
+            
+            totais = sistema.compactar_registros_odometro(dias_retencao=90)
+            self.assertTrue(totais["vacuum_incremental"])
+            self.assertEqual(totais["paginas_livres"], 0)
+    
+    def test_banco_incremental_devolve_as_paginas_liberadas(self):
+        db_name = os.path.join(self.diretorio.name, "novo.db")
+        with SistemaGerenciamentoFrota(db_name) as sistema:
+            sistema.cadastrar_viatura("A1", "Gol", 2020, "PM")
+            antigo = int(time.time()) - 400 * 86400
+            sistema.atualizar_odometro_lote([("A1", i, "x" * 200, antigo + i) for i in range(1, 5001)])
+            
+            totais = sistema.compactar_registros_odometro(dias_retencao=90)
+            self.assertTrue(totais["vacuum_incremental"])
+            self.assertEqual(totais["paginas_livres"], 0)
+    
+    def test_modo_concorrente_escreve_so_pelo_escritor(self):
+        with SistemaGerenciamentoFrota(self.db_name, modo_concorrente=True) as sistema:
+            sistema.atualizar_odometro_lote([("A1", 10000 + i, "", None, f"k{i}") for i in range(10)])
+            threads = []
+            transacao = sistema.transacao
+            
+            def registrar_thread():
+                threads.append(threading.current_thread().name)
+                return transacao()
+            
+            sistema.transacao = registrar_thread
+            totais = sistema.compactar_registros_odometro(dias_retencao=90, leituras_por_etapa=1000)
+            self.assertEqual(totais["etapas"], 5)
+            self.assertTrue(sistema.ativar_vacuum_incremental())
+            self.assertEqual(sistema.expurgar_chaves_leitura(dias_retencao=-1, chaves_por_etapa=3), 10)
+            self.assertTrue(threads)
+            self.assertEqual(set(threads), {"rastreia-escritor"})
+
+
+if __name__ == "__main__":
+    unittest.main()
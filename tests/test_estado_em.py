@@ -0,0 +1,74 @@
+"""Testes de estado_em (estado da frota em uma data passada)"""
+
+import datetime
+import os
+import tempfile
+import unittest
+
+from main import SistemaGerenciamentoFrota, data_para_epoch
+
+
+class TestEstadoEm(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.sistema = SistemaGerenciamentoFrota(os.path.join(self.diretorio.name, "frota.db"))
+        self.inicio = datetime.datetime.now().replace(microsecond=0) - datetime.timedelta(days=400)
+        
+        # PM-1 cadastrada no início e PM-2 cem dias depois
+        for num_vtr, dias in (("PM-1", 0), ("PM-2", 100)):
+            self.sistema.cadastrar_viatura(num_vtr, "Gol", 2020, "PM", 1000)
+            with self.sistema.transacao() as cursor:
+                cadastro = data_para_epoch(self.dia(dias))
+                cursor.execute("UPDATE viaturas SET data_cadastro = ? WHERE num_vtr = ?", (cadastro, num_vtr))
+                cursor.execute("UPDATE registros_odometro SET data_registro = ? WHERE viatura_id = "
+                               "(SELECT id FROM viaturas WHERE num_vtr = ?)", (cadastro, num_vtr))
+        
+        self.sistema.atualizar_odometro_lote([("PM-1", 2000, "", self.dia(10)), ("PM-1", 3000, "", self.dia(50))])
+        self.sistema.registrar_manutencao("PM-1", "Troca de Óleo", self.dia(20))
+        self.sistema.registrar_manutencao("PM-1", "Troca de Óleo", self.dia(60))
+        self.sistema.registrar_manutencao("PM-1", "Revisão Geral", self.dia(60))
+    
+    def tearDown(self):
+        self.sistema.close()
+        self.diretorio.cleanup()
+    
+    def dia(self, dias: int) -> datetime.datetime:
+        return self.inicio + datetime.timedelta(days=dias)
+    
+    def resumo(self, dias: int):
+        """(num_vtr, odometro, manutencao, data_realizada) de cada linha na data"""
+        return [(linha[0], linha[2], linha[3], linha[4]) for linha in self.sistema.estado_em(self.dia(dias))]
+    
+    def test_reconstroi_odometro_e_ultima_manutencao_na_data(self):
+        self.assertEqual(self.resumo(-1), [])
+        self.assertEqual(self.resumo(5), [("PM-1", 1000, None, None)])
+        self.assertEqual(self.resumo(30), [("PM-1", 2000, "Troca de Óleo", data_para_epoch(self.dia(20)))])
+        self.assertEqual(self.resumo(120), [
+            ("PM-1", 3000, "Revisão Geral", data_para_epoch(self.dia(60))),
+            ("PM-1", 3000, "Troca de Óleo", data_para_epoch(self.dia(60))),
+            ("PM-2", 1000, None, None),
+        ])
+    
+    def test_prazos_e_status_relativos_a_data(self):
+        # Registrada com o odômetro da época do registro (3000): próxima troca aos 13000 km
+        linha = self.sistema.estado_em(self.dia(30), num_vtr="pm-1")[0]
+        self.assertEqual(linha[5:10], (13000, data_para_epoch(self.dia(385)), 11000, 355.0, None))
+        
+        # Revisão Geral (180 dias) feita no dia 60: vence no dia 240
+        for dias, status in ((200, None), (220, "ATENÇÃO"), (230, "URGENTE"), (380, "VENCIDO")):
+            with self.subTest(dias=dias):
+                revisao = self.sistema.estado_em(self.dia(dias), num_vtr="PM-1")[0]
+                self.assertEqual(revisao[3], "Revisão Geral")
+                self.assertEqual(revisao[9], status)
+    
+    def test_leituras_compactadas_continuam_na_reconstrucao(self):
+        datas = (5, 10, 30, 55, 120, 399)
+        antes = {dias: self.resumo(dias) for dias in datas}
+        totais = self.sistema.compactar_registros_odometro(dias_retencao=0)
+        self.assertGreater(totais["leituras_compactadas"], 0)
+        self.assertEqual({dias: self.resumo(dias) for dias in datas}, antes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Testes do roteador da frota particionada por órgão"""
+
+import datetime
+import glob
+import os
+import tempfile
+import unittest
+
+from frota_particionada import SistemaParticionado
+from main import SistemaGerenciamentoFrota
+
+ORGAOS = ("PM", "Bombeiros", "Polícia Civil")
+
+
+class TestFrotaParticionada(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.sistema = SistemaParticionado(self.diretorio.name)
+    
+    def tearDown(self):
+        self.sistema.close()
+        self.diretorio.cleanup()
+    
+    def test_numero_repetido_nao_cria_particao(self):
+        self.assertTrue(self.sistema.cadastrar_viatura("A1", "Gol", 2020, "PM"))
+        self.assertFalse(self.sistema.cadastrar_viatura("a1", "Gol", 2020, "Bombeiros"))
+        self.assertEqual(glob.glob(os.path.join(self.diretorio.name, "*.db")),
+                         [os.path.join(self.diretorio.name, "pm.db")])
+        self.assertEqual(list(self.sistema.particoes), ["pm"])
+    
+    
+    def test_consultas_da_frota_na_ordem_do_banco_unico(self):
+        # A mesma frota no banco único e nas partições, com os números intercalados entre os órgãos
+        with SistemaGerenciamentoFrota(os.path.join(self.diretorio.name, "unico.sqlite")) as unico:
+            agora = datetime.datetime.now()
+            for numero in range(30):
+                num_vtr, orgao = f"VTR-{numero:02d}", ORGAOS[numero % 3]
+                realizada = agora - datetime.timedelta(days=340 + numero)
+                for sistema in (unico, self.sistema):
+                    sistema.cadastrar_viatura(num_vtr, f"Modelo {numero % 4}", 2020, orgao, 1000)
+                    sistema.registrar_manutencao(num_vtr, "Troca de Óleo", realizada)
+            
+            leituras = [(f"VTR-{numero % 30:02d}", 1000 + numero * 10) for numero in range(90)]
+            leituras[5] = ("XX-99", 10)
+            leituras[7] = ("VTR-07", "abc")
+            self.assertEqual(self.sistema.atualizar_odometro_lote(leituras), unico.atualizar_odometro_lote(leituras))
+            
+            self.assertEqual(sorted(self.sistema.particoes), ["bombeiros", "pm", "policia_civil"])
+            self.assertEqual(self.sistema.listar_viaturas(), unico.listar_viaturas())
+            self.assertEqual(list(self.sistema.iterar_viaturas(tamanho_pagina=7)), unico.listar_viaturas())
+            self.assertEqual(self.sistema.pagina_viaturas("VTR-10", 5), unico.pagina_viaturas("VTR-10", 5))
+            self.assertEqual(self.sistema.buscar_por_prefixo("VTR-1", 4), unico.buscar_por_prefixo("VTR-1", 4))
+            
+            alertas = self.sistema.obter_alertas_manutencao()
+            self.assertEqual(len(alertas), 30)
+            self.assertEqual(alertas, unico.obter_alertas_manutencao())
+            self.assertEqual(self.sistema.proximos_vencimentos(8), unico.proximos_vencimentos(8))
+            self.assertEqual(self.sistema.proximos_vencimentos(None, agora + datetime.timedelta(days=30)),
+                             unico.proximos_vencimentos(None, agora + datetime.timedelta(days=30)))
+            self.assertEqual(self.sistema.estado_em(agora), unico.estado_em(agora))
+            self.assertEqual(self.sistema.estado_em(agora, orgao="Bombeiros"),
+                             unico.estado_em(agora, orgao="Bombeiros"))
+    
+    def test_particoes_de_outro_processo_sao_descobertas(self):
+        self.sistema.cadastrar_viatura("A1", "Gol", 2020, "PM")
+        with SistemaParticionado(self.diretorio.name) as outro:
+            outro.cadastrar_viatura("B1", "Gol", 2020, "Bombeiros")
+        self.assertEqual([viatura[0] for viatura in self.sistema.listar_viaturas()], ["A1", "B1"])
+        self.assertFalse(self.sistema.cadastrar_viatura("B1", "Gol", 2020, "PM"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+"""Testes da leitura dos arquivos JSONL de importação"""
+
+import io
+import unittest
+
+import importar_leituras
+import importar_manutencoes
+
+
+class TestLerJsonl(unittest.TestCase):
+    
+    LINHAS = '{"num_vtr": "PM-1", "odometro": 10}\nnull\n[1]\n"x"\n{quebrado\n\n{"num_vtr": "PM-2"}\n'
+    
+    def test_linhas_que_nao_sao_objetos_sao_rejeitadas(self):
+        for modulo in (importar_leituras, importar_manutencoes):
+            with self.subTest(modulo=modulo.__name__):
+                itens = list(modulo.ler_jsonl(io.StringIO(self.LINHAS)))
+                self.assertEqual(len(itens), 6)
+                self.assertEqual(itens[1:5], [()] * 4)
+                self.assertEqual(itens[0][0], "PM-1")
+                self.assertEqual(itens[5][0], "PM-2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+"""Testes de registrar_manutencao_lote"""
+
+import os
+import tempfile
+import unittest
+
+from frota_particionada import SistemaParticionado
+from main import SistemaGerenciamentoFrota
+
+
+class TestManutencaoLote(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.sistema = SistemaGerenciamentoFrota(os.path.join(self.diretorio.name, "frota.db"))
+        self.sistema.cadastrar_viatura("A1", "Gol", 2020, "PM")
+    
+    def tearDown(self):
+        self.sistema.close()
+        self.diretorio.cleanup()
+    
+    def test_registro_invalido_nao_impede_os_demais(self):
+        for invalido in (None, ("A1",), ("A1", ["Troca de Óleo"])):
+            with self.subTest(invalido=invalido):
+                relatorio = self.sistema.registrar_manutencao_lote([invalido, ("A1", "Troca de Óleo")])
+                self.assertFalse(relatorio[0][2])
+                self.assertEqual(relatorio[0][3], "registro inválido")
+                self.assertEqual(relatorio[1], (1, "A1", True, None))
+    
+    def test_frota_particionada_reporta_igual(self):
+        with SistemaParticionado(os.path.join(self.diretorio.name, "particoes")) as particionado:
+            particionado.cadastrar_viatura("A1", "Gol", 2020, "PM")
+            lote = [None, ("A1",), ("X9", "Troca de Óleo"), ("A1", "Troca de Óleo")]
+            self.assertEqual(particionado.registrar_manutencao_lote(lote),
+                             self.sistema.registrar_manutencao_lote(lote))
+    
+    def test_tipo_desconhecido_continua_reportado(self):
+        relatorio = self.sistema.registrar_manutencao_lote([("A1", "Inexistente")])
+        self.assertEqual(relatorio, [(0, "A1", False, "tipo de manutenção não encontrado")])
+
+
+if __name__ == "__main__":
+    unittest.main()
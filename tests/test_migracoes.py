@@ -0,0 +1,88 @@
+"""Testes das migrações do esquema (bancos anteriores ao controle de versão até a atual)"""
+
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from main import SistemaGerenciamentoFrota, data_para_epoch
+from migracoes import MIGRACOES, VERSAO_ESQUEMA, _v1_esquema_inicial
+
+
+class TestMigracoes(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.diretorio.name, "frota.db")
+        
+        # Banco como o das versões sem controle de versão: datas em texto e user_version = 0
+        conn = sqlite3.connect(self.db_name)
+        _v1_esquema_inicial(conn.cursor())
+        tipo_id = conn.execute("SELECT id FROM tipos_manutencao WHERE nome = 'Troca de Óleo'").fetchone()[0]
+        conn.execute("INSERT INTO viaturas (num_vtr, modelo, ano, orgao, odometro_atual, data_cadastro) "
+                     "VALUES ('PM-1', 'Gol', 2020, 'PM', 15000, '2023-01-10 08:00:00')")
+        conn.executemany("INSERT INTO registros_odometro (viatura_id, odometro, data_registro, observacoes) "
+                         "VALUES (1, ?, ?, '')", [(12000, "2023-03-01 09:15:00"), (15000, "2023-06-01 17:45:30")])
+        conn.execute("INSERT INTO manutencoes (viatura_id, tipo_manutencao_id, odometro_realizada, data_realizada, "
+                     "proximo_odometro, proxima_data, observacoes) "
+                     "VALUES (1, ?, 12000, '2023-03-01 09:15:00', 17000, '2023-09-01 09:15:00', 'troca')", (tipo_id,))
+        conn.execute("INSERT INTO resumo_odometro VALUES (1, '2023-02-01', 'mes', 10000, 11000, 11000, "
+                     "'2023-02-01 10:00:00', '2023-02-20 10:00:00', 2)")
+        conn.commit()
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], 0)
+        conn.close()
+    
+    def tearDown(self):
+        self.diretorio.cleanup()
+    
+    def test_migra_da_v1_ate_a_atual(self):
+        with SistemaGerenciamentoFrota(self.db_name) as sistema:
+            conn = sistema.conexao
+            self.assertEqual(VERSAO_ESQUEMA, len(MIGRACOES))
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], VERSAO_ESQUEMA)
+            
+            # v2: datas em texto (hora local) viram segundos desde 1970
+            self.assertEqual(conn.execute("SELECT data_cadastro FROM viaturas").fetchone()[0],
+                             data_para_epoch(datetime.datetime(2023, 1, 10, 8, 0)))
+            self.assertEqual(conn.execute("SELECT data_registro FROM registros_odometro ORDER BY id").fetchall(),
+                             [(data_para_epoch(datetime.datetime(2023, 3, 1, 9, 15)),),
+                              (data_para_epoch(datetime.datetime(2023, 6, 1, 17, 45, 30)),)])
+            self.assertEqual(conn.execute("SELECT data_realizada, proxima_data FROM manutencoes").fetchone(),
+                             (data_para_epoch(datetime.datetime(2023, 3, 1, 9, 15)),
+                              data_para_epoch(datetime.datetime(2023, 9, 1, 9, 15))))
+            self.assertEqual(conn.execute("SELECT primeira_data, ultima_data FROM resumo_odometro").fetchone(),
+                             (data_para_epoch(datetime.datetime(2023, 2, 1, 10, 0)),
+                              data_para_epoch(datetime.datetime(2023, 2, 20, 10, 0))))
+            for tabela, coluna in (("viaturas", "data_cadastro"), ("registros_odometro", "data_registro"),
+                                   ("manutencoes", "proxima_data"), ("resumo_odometro", "ultima_data")):
+                self.assertEqual(conn.execute(f"SELECT DISTINCT typeof({coluna}) FROM {tabela}").fetchall(),
+                                 [("integer",)], tabela)
+            
+            # Projeções recriadas a partir dos dados migrados
+            alertas = sistema.obter_alertas_manutencao()
+            self.assertEqual([(alerta[0], alerta[3]) for alerta in alertas], [("PM-1", "Troca de Óleo")])
+            self.assertEqual(sistema.proximos_vencimentos(1)[0][:3], ("PM-1", "PM", "Troca de Óleo"))
+            self.assertEqual([viatura[0] for viatura in sistema.buscar_viaturas("gol")], ["PM-1"])
+            
+            # As datas migradas continuam utilizáveis pelas escritas
+            self.assertTrue(sistema.atualizar_odometro("PM-1", 16000))
+        
+        # Na versão atual, abrir de novo não reaplica nada
+        with SistemaGerenciamentoFrota(self.db_name) as sistema:
+            self.assertEqual(sistema.conexao.execute("SELECT COUNT(*) FROM registros_odometro").fetchone()[0], 3)
+    
+    def test_banco_mais_novo_que_o_suportado(self):
+        conn = sqlite3.connect(self.db_name)
+        conn.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA + 1}")
+        conn.close()
+        sistema = SistemaGerenciamentoFrota(self.db_name)
+        try:
+            with self.assertRaises(RuntimeError):
+                sistema.conexao
+        finally:
+            sistema.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
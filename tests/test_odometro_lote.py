@@ -0,0 +1,30 @@
+"""Testes de atualizar_odometro_lote"""
+
+import os
+import tempfile
+import unittest
+
+from main import SistemaGerenciamentoFrota
+
+
+class TestOdometroLote(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.sistema = SistemaGerenciamentoFrota(os.path.join(self.diretorio.name, "frota.db"))
+        self.sistema.cadastrar_viatura("A1", "Gol", 2020, "PM")
+    
+    def tearDown(self):
+        self.sistema.close()
+        self.diretorio.cleanup()
+    
+    def test_leitura_vazia_nao_impede_as_demais(self):
+        for lote in ([None, ("A1", 20)], [None, ("A1", 20, "", None, "k1")]):
+            with self.subTest(lote=lote):
+                relatorio = self.sistema.atualizar_odometro_lote(lote)
+                self.assertEqual(relatorio[0], (0, "", False, "odômetro inválido"))
+                self.assertEqual(relatorio[1], (1, "A1", True, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Testes do modo lote do rastreia.py"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from main import SistemaGerenciamentoFrota
+from rastreia import executar_lote
+
+
+class TestLote(unittest.TestCase):
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.sistema = SistemaGerenciamentoFrota(os.path.join(self.diretorio.name, "frota.db"))
+        self.sistema.cadastrar_viatura("PM-1", "Gol", 2020, "PM", 100)
+    
+    def tearDown(self):
+        self.sistema.close()
+        self.diretorio.cleanup()
+    
+    def test_erro_inesperado_desfaz_so_o_comando(self):
+        atualizar = self.sistema.atualizar_odometro
+        
+        def atualizar_e_falhar(num_vtr, odometro, *args):
+            atualizar(num_vtr, odometro, *args)
+            if odometro == 300:
+                raise RuntimeError("falha inesperada")
+            return True
+        
+        self.sistema.atualizar_odometro = atualizar_e_falhar
+        arquivo = io.StringIO("odometro PM-1 200\nodometro PM-1 300\nodometro PM-1 abc\ncadastrar PM-2 "
+                              "--modelo Gol --ano 2021 --orgao PM\n")
+        saida = io.StringIO()
+        
+        recusados = executar_lote(self.sistema, arquivo, "json", 100, saida)
+        
+        linhas = [json.loads(linha) for linha in saida.getvalue().splitlines()]
+        self.assertEqual(recusados, 2)
+        self.assertEqual([linha["ok"] for linha in linhas], [True, False, False, True])
+        self.assertEqual(linhas[1]["motivo"], "falha inesperada")
+        
+        # A leitura de 300 foi desfeita; as demais linhas do grupo foram confirmadas
+        odometro = self.sistema.conexao.execute(
+            "SELECT odometro_atual FROM viaturas WHERE num_vtr = 'PM-1'").fetchone()[0]
+        self.assertEqual(odometro, 200)
+        self.assertEqual(len(self.sistema.listar_viaturas()), 2)
+    
+    def test_help_recusa_so_a_linha(self):
+        arquivo = io.StringIO("odometro PM-1 200\nodometro --help\n--help\nodometro PM-1 300\n")
+        saida, terminal = io.StringIO(), io.StringIO()
+        
+        with contextlib.redirect_stdout(terminal):
+            recusados = executar_lote(self.sistema, arquivo, "json", 100, saida)
+        
+        linhas = [json.loads(linha) for linha in saida.getvalue().splitlines()]
+        self.assertEqual(recusados, 2)
+        self.assertEqual([linha["ok"] for linha in linhas], [True, False, False, True])
+        self.assertEqual(terminal.getvalue(), "")
+        odometro = self.sistema.conexao.execute(
+            "SELECT odometro_atual FROM viaturas WHERE num_vtr = 'PM-1'").fetchone()[0]
+        self.assertEqual(odometro, 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
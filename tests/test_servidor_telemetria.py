@@ -0,0 +1,143 @@
+"""Testes do servidor de telemetria: lotes combinados e respostas de erro"""
+
+import asyncio
+import importlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from main import SistemaGerenciamentoFrota
+from servidor_telemetria import ServidorTelemetria
+
+
+async def requisitar(porta: int, metodo: str, caminho: str, corpo: bytes = b"", cabecalhos: str = None):
+    """Envia uma requisição HTTP/1.0 e retorna (status, corpo JSON)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+    if cabecalhos is None:
+        cabecalhos = f"Content-Length: {len(corpo)}\r\n"
+    writer.write(f"{metodo} {caminho} HTTP/1.0\r\n{cabecalhos}\r\n".encode("latin-1") + corpo)
+    await writer.drain()
+    resposta = await reader.read()
+    writer.close()
+    cabecalho, _, dados = resposta.partition(b"\r\n\r\n")
+    return int(cabecalho.split()[1]), json.loads(dados)
+
+
+class TestServidorTelemetria(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.sistema = SistemaGerenciamentoFrota(os.path.join(self.diretorio.name, "frota.db"))
+        for numero in range(3):
+            self.sistema.cadastrar_viatura(f"PM-{numero}", "Gol", 2020, "PM", 100)
+        
+        # Sem a tarefa de gravação: cada teste decide quando os lotes começam a ser gravados
+        self.servidor_telemetria = ServidorTelemetria(self.sistema)
+        self.servidor = await asyncio.start_server(self.servidor_telemetria._atender, "127.0.0.1", 0)
+        self.porta = self.servidor.sockets[0].getsockname()[1]
+    
+    async def asyncTearDown(self):
+        self.servidor.close()
+        await self.servidor.wait_closed()
+        await self.servidor_telemetria.encerrar()
+        self.sistema.close()
+        self.diretorio.cleanup()
+    
+    async def aguardar_fila(self, quantidade: int):
+        await self.aguardar(lambda: self.servidor_telemetria.fila.qsize() >= quantidade)
+    
+    @staticmethod
+    async def aguardar(condicao):
+        while not condicao():
+            await asyncio.sleep(0.01)
+    
+    async def test_indices_relativos_a_cada_requisicao(self):
+        # Três requisições de duas leituras cada, a segunda recusada, gravadas em um único lote
+        corpos = [json.dumps([{"num_vtr": f"PM-{numero}", "odometro": 200},
+                              {"num_vtr": f"PM-{numero}", "odometro": 150}]).encode() for numero in range(3)]
+        respostas = [asyncio.create_task(requisitar(self.porta, "POST", "/leituras", corpo)) for corpo in corpos]
+        await self.aguardar_fila(3)
+        self.servidor_telemetria._tarefa_gravacao = asyncio.create_task(self.servidor_telemetria._gravar_lotes())
+        
+        for status, resposta in await asyncio.gather(*respostas):
+            self.assertEqual(status, 200)
+            self.assertEqual(resposta["aceitas"], 1)
+            self.assertEqual([rejeitada["indice"] for rejeitada in resposta["rejeitadas"]], [1])
+        self.assertEqual(self.servidor_telemetria.contadores["lotes"], 1)
+    
+    async def test_falha_na_gravacao_responde_500(self):
+        def falhar(leituras):
+            raise RuntimeError("disco cheio")
+        
+        self.sistema.atualizar_odometro_lote = falhar
+        self.servidor_telemetria._tarefa_gravacao = asyncio.create_task(self.servidor_telemetria._gravar_lotes())
+        status, resposta = await requisitar(self.porta, "POST", "/leituras",
+                                            b'{"num_vtr": "PM-0", "odometro": 200}')
+        self.assertEqual(status, 500)
+        self.assertIn("disco cheio", resposta["erro"])
+    
+    async def test_content_length_invalido_responde_400(self):
+        for valor in ("abc", "-5"):
+            status, _ = await requisitar(self.porta, "POST", "/leituras", b"{}", f"Content-Length: {valor}\r\n")
+            self.assertEqual(status, 400)
+    
+    async def test_falha_nas_tarefas_periodicas_nao_as_interrompe(self):
+        chamadas = {"expurgo": 0, "varredura": 0}
+        
+        def falhar_uma_vez(nome):
+            def executar():
+                chamadas[nome] += 1
+                if chamadas[nome] == 1:
+                    raise sqlite3.OperationalError("database is locked")
+            return executar
+        
+        self.sistema.expurgar_chaves_leitura = falhar_uma_vez("expurgo")
+        self.sistema.varrer_alertas = falhar_uma_vez("varredura")
+        with mock.patch("servidor_telemetria.INTERVALO_EXPURGO", 0), \
+                mock.patch("servidor_telemetria.INTERVALO_VARREDURA", 0), \
+                mock.patch("sys.stderr", io.StringIO()) as saida:
+            tarefas = [asyncio.create_task(self.servidor_telemetria._expurgar_chaves()),
+                       asyncio.create_task(self.servidor_telemetria._varrer_alertas())]
+            try:
+                await asyncio.wait_for(self.aguardar(lambda: min(chamadas.values()) >= 3), 5)
+            finally:
+                for tarefa in tarefas:
+                    tarefa.cancel()
+        self.assertIn("database is locked", saida.getvalue())
+
+
+
+class TestDecodificarLeituras(unittest.TestCase):
+    
+    def test_formatos_aceitos(self):
+        objeto = json.dumps({"num_vtr": "PM-0", "odometro": 200}, indent=2)
+        for corpo, quantidade in ((objeto, 1), (f"[{objeto}, {objeto}]", 2),
+                                  ('{"num_vtr": "PM-0"}\n{"num_vtr": "PM-1"}\n', 2), ("", 0)):
+            with self.subTest(corpo=corpo):
+                leituras = ServidorTelemetria._decodificar_leituras(corpo.encode())
+                self.assertEqual(len(leituras), quantidade)
+    
+    def test_itens_que_nao_sao_objetos(self):
+        for corpo in ("null", "[1]", '"x"', '{"num_vtr": "PM-0"}\n[1]'):
+            with self.subTest(corpo=corpo):
+                with self.assertRaises(ValueError):
+                    ServidorTelemetria._decodificar_leituras(corpo.encode())
+
+
+class TestSemModuloResource(unittest.TestCase):
+    
+    def test_importa_e_inicia_sem_resource(self):
+        # Como no Windows, onde o módulo resource não existe
+        with mock.patch.dict(sys.modules, {"resource": None}):
+            modulo = importlib.reload(sys.modules["servidor_telemetria"])
+            modulo.aumentar_limite_arquivos()
+        importlib.reload(modulo)
+
+
+if __name__ == "__main__":
+    unittest.main()